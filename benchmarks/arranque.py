@@ -0,0 +1,114 @@
+'''
+Tiempo de arranque en frío de los puntos de entrada, medido con
+`python -X importtime`.
+
+Ejecuta la sentencia (por defecto `from calcu_areas import calcular_area`)
+en intérpretes nuevos, suma el tiempo de importación de los módulos de
+primer nivel y comprueba que no se cargan módulos prohibidos (Rich y NumPy
+solo deben importarse al mostrar algo o al calcular en lote).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.arranque --limite-ms 60 --salida arranque.json
+    python -m benchmarks.arranque --base arranque.json
+'''
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+LINEA_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+def importar(sentencia: str) -> Dict:
+    '''
+    Ejecuta la sentencia en un intérprete nuevo con -X importtime.
+
+    :return: Tiempo total de importación (µs), tiempo real del proceso (s)
+             y {módulo: tiempo acumulado en µs} de todos los módulos cargados
+    '''
+    t0 = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', sentencia],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    segundos = time.perf_counter() - t0
+
+    modulos, total = {}, 0
+    for linea in proceso.stderr.splitlines():
+        coincidencia = LINEA_IMPORTTIME.match(linea)
+        if coincidencia is None:
+            continue
+        _, acumulado, sangria, modulo = coincidencia.groups()
+        modulos[modulo] = int(acumulado)
+        if not sangria:     # módulo de primer nivel: su acumulado incluye a sus dependencias
+            total += int(acumulado)
+    return {'importacion_us': total, 'proceso_segundos': segundos, 'modulos': modulos}
+
+
+def ejecutar(sentencia: str, repeticiones: int=7, prohibidos: List[str]=('rich', 'numpy'), top: int=10) -> Dict:
+    '''
+    Mide la sentencia 'repeticiones' veces (más una de calentamiento) y la
+    compara con un intérprete vacío. Retorna medianas en milisegundos.
+    '''
+    importar(sentencia)     # calentamiento: .pyc y caché del sistema de archivos
+    medidas = [importar(sentencia) for _ in range(repeticiones)]
+    vacio = [importar('pass') for _ in range(repeticiones)]
+
+    ultima = medidas[-1]['modulos']
+    cargados = [p for p in prohibidos if any(m == p or m.startswith(p + '.') for m in ultima)]
+    mas_lentos = sorted(ultima, key=ultima.get, reverse=True)[:top]
+
+    importacion = statistics.median(m['importacion_us'] for m in medidas) - \
+        statistics.median(m['importacion_us'] for m in vacio)
+    return {
+        'sentencia': sentencia,
+        'python': sys.version.split()[0],
+        'repeticiones': repeticiones,
+        'importacion_ms': round(importacion / 1000, 2),
+        'proceso_ms': round(statistics.median(m['proceso_segundos'] for m in medidas) * 1000, 2),
+        'interprete_vacio_ms': round(statistics.median(m['proceso_segundos'] for m in vacio) * 1000, 2),
+        'modulos_cargados': len(ultima),
+        'mas_lentos_ms': {m: round(ultima[m] / 1000, 2) for m in mas_lentos},
+        'prohibidos_cargados': cargados
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Tiempo de arranque en frío (python -X importtime)')
+    parser.add_argument('--sentencia', default='from calcu_areas import calcular_area')
+    parser.add_argument('--repeticiones', type=int, default=7)
+    parser.add_argument('--prohibidos', nargs='*', default=['rich', 'numpy'], help='Módulos que no deben importarse')
+    parser.add_argument('--limite-ms', type=float, default=None, help='Falla si la importación tarda más')
+    parser.add_argument('--base', type=Path, default=None, help='Resultado anterior con el que comparar')
+    parser.add_argument('--umbral', type=float, default=0.2, help='Empeoramiento tolerado frente a --base (0.2 = 20 %%)')
+    parser.add_argument('--salida', type=Path, default=None, help='Guardar el resultado en este archivo JSON')
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(args.sentencia, args.repeticiones, args.prohibidos)
+    fallos = [f'se importa {m}' for m in resultado['prohibidos_cargados']]
+    if args.limite_ms is not None and resultado['importacion_ms'] > args.limite_ms:
+        fallos.append(f'importación {resultado["importacion_ms"]} ms > {args.limite_ms} ms')
+    if args.base is not None:
+        with args.base.open('r', encoding='utf-8') as f:
+            base = json.load(f)
+        resultado['base_ms'] = base['importacion_ms']
+        if resultado['importacion_ms'] > base['importacion_ms'] * (1 + args.umbral):
+            fallos.append(f'importación {resultado["importacion_ms"]} ms frente a {base["importacion_ms"]} ms de la base')
+    resultado['fallos'] = fallos
+
+    texto = json.dumps(resultado, indent=4, ensure_ascii=False)
+    if args.salida is not None:
+        args.salida.write_text(texto, encoding='utf-8')
+    print(texto)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+'''
+Prueba de carga de escritores concurrentes sobre un mismo historial.
+
+Lanza N procesos que añaden registros a la vez con guardar_registros y
+comprueba al final que el historial se puede leer entero, que no falta ni
+sobra ningún registro y que las estadísticas incrementales cuadran.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.concurrencia --escritores 8 --registros 500 --formato json
+'''
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils_json import guardar_registros, iterar_historial, obtener_estadisticas, ruta_estadisticas  # noqa: E402
+
+
+EXTENSIONES = {'json': '.json', 'jsonl': '.jsonl', 'sqlite': '.db'}
+
+
+def escritor(ruta: str, id_escritor: int, registros: int, lote: int, inicio) -> None:
+    ''' Proceso escritor: espera la señal de salida y escribe sus registros por lotes '''
+    inicio.wait()
+    for primero in range(0, registros, lote):
+        guardar_registros([
+            {
+                'fecha': '01/01/2024 00:00:00',
+                'figura': 'cuadrado',
+                'area': float(id_escritor * registros + i),
+                'parametros': {'escritor': id_escritor, 'n': i}
+            }
+            for i in range(primero, min(primero + lote, registros))
+        ], Path(ruta))
+
+
+def ejecutar(escritores: int, registros: int, formato: str, lote: int=1) -> dict:
+    '''
+    Ejecuta la prueba y devuelve el resultado como diccionario.
+
+    :param escritores: Número de procesos escritores
+    :param registros: Registros por escritor
+    :param formato: 'json', 'jsonl' o 'sqlite'
+    :param lote: Registros por llamada a guardar_registros
+    '''
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = Path(directorio) / f'historial{EXTENSIONES[formato]}'
+        inicio = multiprocessing.Event()
+        procesos = [
+            multiprocessing.Process(target=escritor, args=(str(ruta), i, registros, lote, inicio))
+            for i in range(escritores)
+        ]
+        for p in procesos:
+            p.start()
+
+        t0 = time.perf_counter()
+        inicio.set()
+        for p in procesos:
+            p.join()
+        segundos = time.perf_counter() - t0
+
+        vistos = {}
+        for dato in iterar_historial(ruta):
+            clave = (dato['parametros']['escritor'], dato['parametros']['n'])
+            vistos[clave] = vistos.get(clave, 0) + 1
+
+        esperados = {(e, n) for e in range(escritores) for n in range(registros)}
+        perdidos = len(esperados - set(vistos))
+        duplicados = sum(c - 1 for c in vistos.values() if c > 1)
+
+        # Si las estadísticas persistidas no cuadrasen, se reconstruirían;
+        # se compara el archivo .stats tal como quedó tras las escrituras
+        with ruta_estadisticas(ruta).open('r', encoding='utf-8') as f:
+            total_stats = json.load(f)['estadisticas']['total_registros']
+
+        return {
+            'formato': formato,
+            'escritores': escritores,
+            'registros_por_escritor': registros,
+            'lote': lote,
+            'segundos': round(segundos, 4),
+            'appends_por_segundo': round(escritores * registros / segundos, 1),
+            'registros_leidos': sum(vistos.values()),
+            'perdidos': perdidos,
+            'duplicados': duplicados,
+            'estadisticas_cuadran': total_stats == len(esperados) == obtener_estadisticas(ruta).total_registros,
+            'correcto': perdidos == 0 and duplicados == 0 and total_stats == len(esperados)
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Prueba de escritores concurrentes sobre el historial')
+    parser.add_argument('--escritores', type=int, default=4)
+    parser.add_argument('--registros', type=int, default=250, help='Registros por escritor')
+    parser.add_argument('--formato', choices=sorted(EXTENSIONES), default='json')
+    parser.add_argument('--lote', type=int, default=1, help='Registros por llamada a guardar_registros')
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(args.escritores, args.registros, args.formato, args.lote)
+    print(json.dumps(resultado, indent=4))
+    return 0 if resultado['correcto'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,357 @@
+'''
+Banco de pruebas de rendimiento de los caminos críticos: cálculo, escritura
+y lectura del historial, estadísticas y búsquedas.
+
+Genera historiales sintéticos (de 1k a 10M registros) con el mismo formato
+que escribe la aplicación y mide llamadas por segundo, percentiles de
+latencia, tiempo de carga, memoria pico y latencia de estadísticas y
+búsquedas. El resultado es un JSON que se puede guardar y comparar con una
+ejecución anterior.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.rendimiento --tamanos 1000 100000 --formatos json jsonl --salida base.json
+    python -m benchmarks.rendimiento --tamanos 1000 100000 --formatos json jsonl --base base.json
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import utils_json  # noqa: E402
+from calcu_areas import FIGURAS, TIPOS_NUMERICOS, calcular_area, calcular_area_sin_registro  # noqa: E402
+from historial_columnar import FORMATO_FECHA  # noqa: E402
+
+
+EXTENSIONES = {'json': '.json', 'jsonl': '.jsonl', 'sqlite': '.db'}
+
+
+####################################
+###### HISTORIALES SINTÉTICOS ######
+####################################
+
+def _muestras(semilla: int, cantidad: int=1024) -> List[Dict]:
+    ''' Registros válidos (figura, área y parámetros reales) para combinar al generar '''
+    azar = random.Random(semilla)
+    # Solo figuras de parámetros numéricos (el polígono va por vértices)
+    figuras = [n for n, f in FIGURAS.items() if all(tipo in TIPOS_NUMERICOS for _, _, tipo in f.params)]
+    muestras = []
+    while len(muestras) < cantidad:
+        figura = azar.choice(figuras)
+        parametros = {nombre: round(azar.uniform(0.5, 100), 2) for nombre in FIGURAS[figura].nombres_params}
+        area = calcular_area_sin_registro(figura, **parametros)
+        if not isinstance(area, str):
+            muestras.append({'figura': figura, 'area': area, 'parametros': parametros})
+    return muestras
+
+
+def registros_sinteticos(n: int, semilla: int=0) -> Iterator[Dict]:
+    '''
+    Produce n registros con fechas crecientes (uno cada ~30 s desde el
+    1/1/2024) tomados de un conjunto de cálculos válidos. Reproducible:
+    la misma semilla da el mismo historial.
+    '''
+    azar = random.Random(semilla)
+    muestras = _muestras(semilla)
+    momento = datetime(2024, 1, 1)
+    fecha, epoch = momento.strftime(FORMATO_FECHA), int(momento.timestamp())
+    for i in range(n):
+        if i % 4 == 0:
+            momento += timedelta(seconds=azar.randint(1, 120))
+            fecha, epoch = momento.strftime(FORMATO_FECHA), int(momento.timestamp())
+        muestra = muestras[azar.randrange(len(muestras))]
+        yield {'fecha': fecha, 'epoch': epoch, 'figura': muestra['figura'], 'area': muestra['area'], 'parametros': muestra['parametros']}
+
+
+def generar_historial(ruta: Path, n: int, semilla: int=0, tam_lote: int=10000) -> None:
+    '''
+    Escribe un historial sintético de n registros en el formato que indica
+    la extensión. JSON y JSON Lines se escriben en streaming con la misma
+    disposición que guardar_registros; SQLite, por lotes.
+    '''
+    registros = registros_sinteticos(n, semilla)
+    if utils_json.es_sqlite(ruta):
+        lote = []
+        for dato in registros:
+            lote.append(dato)
+            if len(lote) >= tam_lote:
+                utils_json.guardar_sqlite_lote(lote, ruta)
+                lote = []
+        if lote:
+            utils_json.guardar_sqlite_lote(lote, ruta)
+        return
+
+    with ruta.open('w', encoding='utf-8') as f:
+        if utils_json.es_jsonl(ruta):
+            for dato in registros:
+                f.write(json.dumps(dato, ensure_ascii=False, separators=(',', ':')) + '\n')
+            return
+        f.write('[\n')
+        for i, dato in enumerate(registros):
+            if i:
+                f.write('\n,\n')
+            f.write('\n'.join('    ' + linea for linea in json.dumps(dato, ensure_ascii=False, indent=4).split('\n')))
+        f.write('\n]')
+
+
+######################
+###### MEDICIÓN ######
+######################
+
+def percentiles(tiempos: List[float]) -> Dict:
+    ''' Media y percentiles 50/90/99/máximo, en microsegundos '''
+    ordenados = sorted(tiempos)
+
+    def p(q: float) -> float:
+        return round(ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] * 1e6, 2)
+
+    return {
+        'muestras': len(ordenados),
+        'media_us': round(sum(ordenados) / len(ordenados) * 1e6, 2),
+        'p50_us': p(0.50),
+        'p90_us': p(0.90),
+        'p99_us': p(0.99),
+        'max_us': round(ordenados[-1] * 1e6, 2)
+    }
+
+
+def cronometrar(funcion: Callable[[], object], repeticiones: int) -> Dict:
+    ''' Latencia de cada llamada (percentiles) '''
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return percentiles(tiempos)
+
+
+def por_segundo(funcion: Callable[[], object], segundos: float=0.3) -> float:
+    ''' Llamadas por segundo, duplicando las iteraciones hasta medir al menos 'segundos' '''
+    iteraciones = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(iteraciones):
+            funcion()
+        transcurrido = time.perf_counter() - t0
+        if transcurrido >= segundos:
+            return round(iteraciones / transcurrido, 1)
+        iteraciones *= 2
+
+
+def una_vez(funcion: Callable[[], object], preparar: Callable[[], object]=lambda: None) -> Dict:
+    '''
+    Tiempo y memoria pico de una sola llamada en frío. Se ejecuta dos veces
+    (con 'preparar' antes de cada una) porque tracemalloc ralentiza lo que
+    mide: la primera da el tiempo y la segunda la memoria.
+    '''
+    preparar()
+    t0 = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - t0
+
+    preparar()
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'segundos': round(segundos, 6), 'memoria_pico_bytes': pico}
+
+
+def medir_calculo(repeticiones: int) -> Dict:
+    ''' calcular_area sin y con registro en el historial, y el cálculo en lote '''
+    resultado = {
+        'calcular_area_sin_registro_por_segundo': por_segundo(lambda: calcular_area_sin_registro('circulo', radio=3.5)),
+    }
+
+    with tempfile.TemporaryDirectory() as directorio:
+        anterior = os.getcwd()
+        os.chdir(directorio)     # calcular_area escribe en el historial por defecto (relativo)
+        try:
+            resultado['calcular_area_por_segundo'] = por_segundo(lambda: calcular_area('circulo', radio=3.5))
+            resultado['calcular_area_latencia'] = cronometrar(lambda: calcular_area('rectangulo', base=2, altura=3), repeticiones)
+        finally:
+            utils_json.flush()
+            os.chdir(anterior)
+
+    try:
+        import numpy as np
+        from calcu_areas import calcular_areas_lote
+    except ImportError:
+        return resultado
+    radios = np.random.default_rng(0).uniform(0.5, 100, 1_000_000)
+    t0 = time.perf_counter()
+    calcular_areas_lote('circulo', radio=radios)
+    resultado['calcular_areas_lote_filas_por_segundo'] = round(len(radios) / (time.perf_counter() - t0), 1)
+    return resultado
+
+
+def medir_historial(formato: str, n: int, semilla: int, repeticiones: int) -> Dict:
+    ''' Carga, escritura, estadísticas y búsquedas sobre un historial sintético de n registros '''
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = Path(directorio) / f'historial{EXTENSIONES[formato]}'
+        t0 = time.perf_counter()
+        generar_historial(ruta, n, semilla)
+        resultado = {
+            'formato': formato,
+            'registros': n,
+            'generacion_segundos': round(time.perf_counter() - t0, 3),
+            'tamano_bytes': ruta.stat().st_size
+        }
+
+        # Carga completa: en frío (sin caché) y con CacheJSON
+        resultado['cargar_json_frio'] = una_vez(lambda: utils_json.cargar_json(ruta), utils_json.vaciar_caches)
+        resultado['cargar_json_cache'] = cronometrar(lambda: utils_json.cargar_json(ruta), repeticiones)
+        utils_json.vaciar_caches()
+
+        # Estadísticas: reconstrucción completa y acierto del caché LRU
+        def sin_estadisticas():
+            utils_json.descartar_estadisticas(ruta)
+            utils_json.vaciar_caches()
+
+        resultado['estadisticas_reconstruccion'] = una_vez(
+            lambda: utils_json.calcular_estadisticas_cached(utils_json.version_historial(ruta)), sin_estadisticas
+        )
+        resultado['estadisticas_cache'] = cronometrar(
+            lambda: utils_json.calcular_estadisticas_cached(utils_json.version_historial(ruta)), repeticiones
+        )
+
+        # Búsquedas: primera (construye el índice) y siguientes
+        def sin_indice():
+            if formato != 'sqlite':
+                utils_json.descartar_indice(ruta)
+
+        figura = next(iter(FIGURAS))
+        resultado['buscar_figura_primera'] = una_vez(lambda: utils_json.buscar_registros(figura, ruta), sin_indice)
+        resultado['buscar_figura'] = cronometrar(lambda: utils_json.buscar_registros(figura, ruta), repeticiones)
+        resultado['consultar_rango_area'] = cronometrar(
+            lambda: utils_json.consultar_historial(figura, area_min=100, area_max=200, ruta=ruta), repeticiones
+        )
+        resultado['ultimos_10'] = cronometrar(lambda: utils_json.ultimos_registros(10, ruta), repeticiones)
+        resultado['pagina_central'] = cronometrar(lambda: utils_json.leer_pagina(n // 2, 20, ruta), repeticiones)
+
+        # Escrituras de un registro (incluye estadísticas e índice)
+        nuevos = list(registros_sinteticos(repeticiones, semilla + 1))
+        pendientes = iter(nuevos)
+        resultado['guardar_registro'] = cronometrar(lambda: utils_json.guardar_registro(next(pendientes), ruta), repeticiones)
+        resultado['guardar_registro_por_segundo'] = round(1e6 / resultado['guardar_registro']['media_us'], 1)
+
+        utils_json._cache_global.invalidar()
+        utils_json.descartar_estadisticas(ruta)
+        utils_json.vaciar_caches()
+        return resultado
+
+
+def ejecutar(tamanos: List[int], formatos: List[str], semilla: int=0, repeticiones: int=200) -> Dict:
+    '''
+    Ejecuta todas las pruebas y devuelve el resultado como diccionario.
+
+    :param tamanos: Número de registros de cada historial sintético
+    :param formatos: 'json', 'jsonl' y/o 'sqlite'
+    :param semilla: Semilla de los datos sintéticos
+    :param repeticiones: Llamadas medidas en cada prueba de latencia
+    '''
+    try:
+        import numpy
+        version_numpy = numpy.__version__
+    except ImportError:
+        version_numpy = None
+
+    return {
+        'entorno': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'procesador': platform.processor() or platform.machine(),
+            'numpy': version_numpy,
+            'fecha': datetime.now().isoformat(timespec='seconds')
+        },
+        'parametros': {'tamanos': tamanos, 'formatos': formatos, 'semilla': semilla, 'repeticiones': repeticiones},
+        'calculo': medir_calculo(repeticiones),
+        'historial': [medir_historial(f, n, semilla, repeticiones) for n in tamanos for f in formatos]
+    }
+
+
+##################################
+###### COMPARACIÓN CON BASE ######
+##################################
+
+def _metricas(resultado: Dict) -> Dict[str, float]:
+    ''' Métricas numéricas comparables, con una clave plana por métrica '''
+    planas = {}
+
+    def recorrer(valor, clave):
+        if isinstance(valor, dict):
+            for k, v in valor.items():
+                if k not in ('muestras', 'registros', 'tamano_bytes', 'generacion_segundos'):
+                    recorrer(v, f'{clave}.{k}' if clave else k)
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            planas[clave] = float(valor)
+
+    recorrer(resultado.get('calculo', {}), 'calculo')
+    for prueba in resultado.get('historial', []):
+        recorrer({k: v for k, v in prueba.items() if k != 'formato'}, f'{prueba["formato"]}.{prueba["registros"]}')
+    return planas
+
+
+# Métricas que deciden una regresión: p99 y máximo se informan pero son
+# demasiado ruidosos, y por debajo de MINIMO_US el ruido supera la diferencia
+METRICAS_ESTABLES = ('_por_segundo', 'media_us', 'p50_us', 'segundos', 'memoria_pico_bytes')
+MINIMO_US = 20
+
+
+def comparar(actual: Dict, base: Dict, umbral: float=0.2) -> Dict:
+    '''
+    Compara dos resultados. Las métricas '_por_segundo' mejoran al subir y
+    el resto (tiempos, memoria) al bajar. Se marca como regresión cualquier
+    métrica estable que empeore más que 'umbral' (0.2 = 20 %).
+    '''
+    nuevas, anteriores = _metricas(actual), _metricas(base)
+    cambios, regresiones = {}, []
+    for clave in sorted(nuevas.keys() & anteriores.keys()):
+        if not anteriores[clave]:
+            continue
+        razon = nuevas[clave] / anteriores[clave]
+        cambios[clave] = round(razon, 3)
+        if not clave.endswith(METRICAS_ESTABLES):
+            continue
+        if clave.endswith('_us') and max(nuevas[clave], anteriores[clave]) < MINIMO_US:
+            continue
+        peor = razon < 1 - umbral if clave.endswith('_por_segundo') else razon > 1 + umbral
+        if peor:
+            regresiones.append(clave)
+    return {'umbral': umbral, 'razon_actual_entre_base': cambios, 'regresiones': regresiones}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Banco de pruebas de rendimiento de la calculadora de áreas')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000], help='Registros de cada historial (hasta 10M)')
+    parser.add_argument('--formatos', nargs='+', choices=sorted(EXTENSIONES), default=['json', 'jsonl', 'sqlite'])
+    parser.add_argument('--repeticiones', type=int, default=200, help='Llamadas medidas en cada prueba de latencia')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', type=Path, default=None, help='Guardar el resultado en este archivo JSON')
+    parser.add_argument('--base', type=Path, default=None, help='Resultado anterior con el que comparar')
+    parser.add_argument('--umbral', type=float, default=0.2, help='Empeoramiento tolerado al comparar (0.2 = 20 %%)')
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(args.tamanos, args.formatos, args.semilla, args.repeticiones)
+    if args.base is not None:
+        with args.base.open('r', encoding='utf-8') as f:
+            resultado['comparacion'] = comparar(resultado, json.load(f), args.umbral)
+
+    texto = json.dumps(resultado, indent=4, ensure_ascii=False)
+    if args.salida is not None:
+        args.salida.write_text(texto, encoding='utf-8')
+    print(texto)
+    return 1 if resultado.get('comparacion', {}).get('regresiones') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+
+from metricas import registrar_indicador
+
+
+class InfoCache(NamedTuple):
+    ''' Mismos campos que functools.lru_cache().cache_info() '''
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class CacheResultados:
+    '''
+    Caché LRU con caducidad (TTL) para los resultados de calcular_area.
+
+    La clave es la figura más sus parámetros normalizados (nombres ordenados
+    y valores como float), así que calcular_area('cuadrado', lado=2) y
+    calcular_area('cuadrado', lado=2.0) comparten entrada.
+
+    registrar_aciertos decide si un acierto se sigue guardando en el
+    historial (True: el historial sigue siendo el registro completo de
+    cálculos) o no (False: los aciertos no tocan el disco).
+    '''
+
+    def __init__(self, max_entradas: int=1024, ttl: Optional[float]=None, registrar_aciertos: bool=True):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.registrar_aciertos = registrar_aciertos
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos: OrderedDict = OrderedDict()    # clave -> (resultado, instante)
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def clave(figura: str, parametros: Dict[str, Any]) -> Optional[Hashable]:
+        '''
+        Clave normalizada; None si algún valor no es int o float (no se cachea).
+        No se convierten textos ni bool: lado='2' debe fallar igual con y sin caché.
+        '''
+        normalizados = []
+        for nombre, valor in parametros.items():
+            if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                return None
+            normalizados.append((nombre, float(valor)))
+        return figura, tuple(sorted(normalizados))
+
+
+    def obtener(self, clave: Hashable) -> Optional[Any]:
+        ''' Resultado guardado o None (cuenta el acierto o el fallo) '''
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None and self.ttl is not None and time.monotonic() - entrada[1] > self.ttl:
+                del self._datos[clave]
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+
+    def guardar(self, clave: Hashable, resultado: Any) -> None:
+        ''' Guarda un resultado y descarta el menos usado si se supera el tamaño '''
+        with self._lock:
+            self._datos[clave] = (resultado, time.monotonic())
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+
+    def limpiar(self) -> None:
+        ''' Vacía el caché y reinicia los contadores '''
+        with self._lock:
+            self._datos.clear()
+            self.aciertos = 0
+            self.fallos = 0
+
+
+    def cache_info(self) -> InfoCache:
+        ''' Aciertos, fallos y tamaño, como lru_cache '''
+        return InfoCache(self.aciertos, self.fallos, self.max_entradas, len(self._datos))
+
+
+# Caché de resultados en uso (None = memoización desactivada)
+_cache_resultados: Optional[CacheResultados] = None
+
+
+def activar_memoizacion(max_entradas: int=1024, ttl: Optional[float]=None, registrar_aciertos: bool=True) -> CacheResultados:
+    '''
+    Activa la memoización de calcular_area.
+
+    :param max_entradas: Número máximo de resultados guardados (LRU)
+    :param ttl: Segundos de validez de cada resultado (None = sin caducidad)
+    :param registrar_aciertos: Si los aciertos se guardan igualmente en el historial
+    '''
+    global _cache_resultados
+    _cache_resultados = CacheResultados(max_entradas, ttl, registrar_aciertos)
+    return _cache_resultados
+
+
+def desactivar_memoizacion() -> None:
+    ''' Desactiva la memoización y libera los resultados guardados '''
+    global _cache_resultados
+    _cache_resultados = None
+
+
+def cache_resultados() -> Optional[CacheResultados]:
+    ''' Caché de resultados activo, o None '''
+    return _cache_resultados
+
+
+def _indicadores() -> Dict[str, float]:
+    ''' Contadores de la memoización para el volcado de métricas '''
+    if _cache_resultados is None:
+        return {}
+    info = _cache_resultados.cache_info()
+    consultas = info.hits + info.misses
+    return {
+        'cache_resultados_aciertos': info.hits,
+        'cache_resultados_fallos': info.misses,
+        'cache_resultados_tasa_aciertos': info.hits / consultas if consultas else 0.0,
+        'cache_resultados_entradas': info.currsize
+    }
+
+
+registrar_indicador('cache_resultados', _indicadores)
+
+
+# CALCU_AREAS_MEMO=1 activa la memoización al importar; CALCU_AREAS_MEMO_MAX,
+# CALCU_AREAS_MEMO_TTL (segundos) y CALCU_AREAS_MEMO_REGISTRAR=0 la ajustan
+if os.environ.get('CALCU_AREAS_MEMO') == '1':
+    activar_memoizacion(
+        max_entradas=int(os.environ.get('CALCU_AREAS_MEMO_MAX', 1024)),
+        ttl=float(os.environ['CALCU_AREAS_MEMO_TTL']) if os.environ.get('CALCU_AREAS_MEMO_TTL') else None,
+        registrar_aciertos=os.environ.get('CALCU_AREAS_MEMO_REGISTRAR', '1') != '0'
+    )
@@ -1,6 +1,420 @@
 import math
-from typing import Union, Dict, List
-from utils_json import registrar_resultado, mostrar_estadisticas_resumidas
+import time
+from types import MappingProxyType
+from typing import Union, Dict, List, Mapping, NamedTuple, Any, Callable, Tuple, Optional, Sequence
+from utils_json import registrar_resultado
+from cache_resultados import cache_resultados
+import metricas
+
+
+###########################
+#### FÓRMULAS DE ÁREAS ####
+###########################
+
+# Fórmulas puras, sin validación. Sirven igual para escalares que para arrays
+# de NumPy, por eso las comparte el cálculo individual y el cálculo en lote.
+
+def area_rectangulo(base: float, altura: float) -> float:
+    ''' Calcula el ára del rectángulo '''
+    return base * altura
+
+
+def area_triangulo(base: float, altura: float) -> float:
+    ''' Calcula el área de un triángulo '''
+    return (base * altura) / 2
+
+
+def area_circulo(radio: float) -> float:
+    ''' Calcula el área de un circulo '''
+    return math.pi * (radio ** 2)
+
+
+def area_trapecio(base_mayor: float, base_menor: float, altura: float) -> float:
+    ''' Calcula el área de un trapecio '''
+    return ((base_mayor + base_menor) / 2) * altura
+
+
+def area_cuadrado(lado: float) -> float:
+    ''' Calcula el área de un cuadrado '''
+    return lado ** 2
+
+
+def area_poligono_regular(num_lados: int, lado: float, apotema: float) -> float:
+    ''' Calcula el área de un poligono regular '''
+    return num_lados * ((lado * apotema) / 2)
+
+
+def area_elipse(semi_eje_hor: float, semi_eje_ver: float) -> float:
+    ''' Calcula el área de una elipse '''
+    return math.pi * semi_eje_ver * semi_eje_hor
+
+
+def area_corona_circular(radio_mayor: float, radio_menor: float) -> float:
+    ''' Calcula el área de una corona circular '''
+    return math.pi * ((radio_mayor ** 2) - (radio_menor ** 2))
+
+
+def area_cubo(lado: float) -> float:
+    ''' Calcula el área de un cubo '''
+    return 6 * (lado ** 2)
+
+
+def area_cono(radio: float, generatriz: float) -> float:
+    ''' Calcula el área de un cono '''
+    return math.pi * radio * (radio + generatriz)
+
+
+############################################
+#### FÓRMULAS DE PERÍMETROS Y VOLÚMENES ####
+############################################
+
+# Igual que las de áreas: sin validación y válidas para escalares y arrays.
+# Solo hay fórmula si los parámetros de la figura determinan la medida (el
+# perímetro de un triángulo dado por base y altura, por ejemplo, no lo está).
+
+def _raiz(valor: Any) -> Any:
+    ''' Raíz cuadrada de escalares o arrays; NaN si el valor es negativo '''
+    if isinstance(valor, (int, float)):
+        return math.sqrt(valor) if valor >= 0 else math.nan
+    return valor ** 0.5
+
+
+def perimetro_rectangulo(base: float, altura: float) -> float:
+    ''' Calcula el perímetro de un rectángulo '''
+    return 2 * (base + altura)
+
+
+def perimetro_circulo(radio: float) -> float:
+    ''' Calcula la longitud de una circunferencia '''
+    return 2 * math.pi * radio
+
+
+def perimetro_cuadrado(lado: float) -> float:
+    ''' Calcula el perímetro de un cuadrado '''
+    return 4 * lado
+
+
+def perimetro_poligono_regular(num_lados: int, lado: float, apotema: float) -> float:
+    ''' Calcula el perímetro de un polígono regular '''
+    return num_lados * lado
+
+
+def perimetro_elipse(semi_eje_hor: float, semi_eje_ver: float) -> float:
+    ''' Calcula el perímetro de una elipse (segunda aproximación de Ramanujan) '''
+    h = ((semi_eje_hor - semi_eje_ver) / (semi_eje_hor + semi_eje_ver)) ** 2
+    return math.pi * (semi_eje_hor + semi_eje_ver) * (1 + 3 * h / (10 + _raiz(4 - 3 * h)))
+
+
+def perimetro_corona_circular(radio_mayor: float, radio_menor: float) -> float:
+    ''' Calcula el perímetro de una corona circular (las dos circunferencias) '''
+    return 2 * math.pi * (radio_mayor + radio_menor)
+
+
+def volumen_cubo(lado: float) -> float:
+    ''' Calcula el volumen de un cubo '''
+    return lado ** 3
+
+
+def superficie_lateral_cubo(lado: float) -> float:
+    ''' Calcula la superficie lateral de un cubo (sin las bases) '''
+    return 4 * (lado ** 2)
+
+
+def volumen_cono(radio: float, generatriz: float) -> float:
+    ''' Calcula el volumen de un cono (NaN si la generatriz es menor que el radio) '''
+    return math.pi * (radio ** 2) * _raiz(generatriz ** 2 - radio ** 2) / 3
+
+
+def superficie_lateral_cono(radio: float, generatriz: float) -> float:
+    ''' Calcula la superficie lateral de un cono '''
+    return math.pi * radio * generatriz
+
+
+####################################
+#### POLÍGONOS POR SUS VÉRTICES ####
+####################################
+
+# Un solo parámetro con la lista de vértices [(x, y), ...]; las fórmulas
+# están en poligonos.py, que se importa al usarlas para no cargar NumPy al
+# arrancar. No sirven para el cálculo en lote por parámetro (ver
+# _preparar_lote): muchos polígonos van con poligonos.medidas_poligonos.
+
+def _validar_poligono(vertices: Any) -> bool:
+    ''' Al menos 3 vértices finitos y área mayor que cero '''
+    from poligonos import areas_poligonos, empaquetar
+    try:
+        return not areas_poligonos(*empaquetar([vertices])).invalidos[0]
+    except (TypeError, ValueError):
+        # Vértices que no son pares de números
+        raise TypeError(f'Vértices no válidos: {str(vertices)[:50]!r}') from None
+
+
+def area_poligono(vertices: Any) -> float:
+    ''' Calcula el área de un polígono dado por sus vértices '''
+    from poligonos import areas_poligonos, empaquetar
+    return float(areas_poligonos(*empaquetar([vertices])).areas[0])
+
+
+def perimetro_poligono(vertices: Any) -> float:
+    ''' Calcula el perímetro de un polígono dado por sus vértices '''
+    from poligonos import empaquetar, medidas_poligonos
+    return float(medidas_poligonos(*empaquetar([vertices]), ('perimetro',)).medidas['perimetro'][0])
+
+
+#############################
+#### REGISTRO DE FIGURAS ####
+#############################
+
+def validar_positivos(*valores: Any) -> Any:
+    '''
+    Validador por defecto: todos los parámetros mayores que cero.
+    Con escalares devuelve un bool; con arrays de NumPy, una máscara.
+    '''
+    valido = valores[0] > 0
+    for valor in valores[1:]:
+        valido = valido & (valor > 0)
+    return valido
+
+
+# Tipos de parámetro que admiten el cálculo en lote y las figuras compuestas
+TIPOS_NUMERICOS = ('int', 'float')
+
+# Medidas que puede tener una figura, en el orden en que se informan
+MEDIDAS = ('area', 'perimetro', 'volumen', 'superficie_lateral', 'superficie_total')
+
+
+class Figura(NamedTuple):
+    ''' Entrada del registro de figuras '''
+    nombre: str
+    titulo: str
+    params: Tuple[Tuple[str, str, str], ...]  # (nombre, mensaje, tipo)
+    nombres_params: Tuple[str, ...]           # solo los nombres, en orden
+    area: Callable[..., Any]
+    error: str
+    validar: Callable[..., Any] = validar_positivos
+    medidas: Optional[Mapping[str, Callable[..., Any]]] = None   # medida -> fórmula (incluye 'area'); solo lectura
+
+
+# Registro global, construido una sola vez al importar el módulo
+FIGURAS: Dict[str, Figura] = {}
+
+
+def registrar_figura(
+        nombre: str,
+        titulo: str,
+        params: List[Tuple[str, str, str]],
+        area: Callable[..., Any],
+        error: str,
+        validar: Callable[..., Any]=validar_positivos,
+        medidas: Optional[Dict[str, Callable[..., Any]]]=None) -> Figura:
+    '''
+    Registra una figura para que la usen calcular_area, el cálculo en lote y el menú.
+
+    :param nombre: Clave de la figura (p. ej. 'circulo')
+    :param titulo: Título para mostrar en el menú
+    :param params: Lista de (nombre, mensaje, tipo) con tipo 'int', 'float' o
+        'vertices' (lista de (x, y); no admite cálculo en lote por parámetro)
+    :param area: Fórmula del área; debe funcionar con escalares y con arrays
+    :param error: Mensaje de error si la validación falla
+    :param validar: Recibe los parámetros en orden y devuelve bool o máscara
+    :param medidas: Fórmulas de otras medidas de MEDIDAS (perímetro, volumen...),
+        con los mismos parámetros que el área
+    :return: La entrada registrada
+    :rtype: Figura
+    '''
+    medidas = {'area': area, **(medidas or {})}
+    desconocidas = set(medidas) - set(MEDIDAS)
+    if desconocidas:
+        raise ValueError(f'Medidas no validas: {", ".join(sorted(desconocidas))}. Usa: {", ".join(MEDIDAS)}')
+    params = tuple(params)
+    figura = Figura(
+        nombre, titulo, params, tuple(p[0] for p in params), area, error, validar,
+        MappingProxyType({m: medidas[m] for m in MEDIDAS if m in medidas})
+    )
+    FIGURAS[nombre] = figura
+    return figura
+
+
+registrar_figura('rectangulo', 'Rectángulo', [
+    ('base', 'Introduce la base', 'float'),
+    ('altura', 'Introduce la altura', 'float')
+], area_rectangulo, 'Base y altura deben ser mayores a cero.',
+    medidas={'perimetro': perimetro_rectangulo})
+
+registrar_figura('triangulo', 'Triángulo', [
+    ('base', 'Introduce la base', 'float'),
+    ('altura', 'Introduce la altura', 'float')
+], area_triangulo, 'Base y altura deben ser mayores que cero.')
+
+registrar_figura('circulo', 'Circulo', [
+    ('radio', 'Introduce el radio', 'float')
+], area_circulo, 'El radio debe ser mayor de cero.',
+    medidas={'perimetro': perimetro_circulo})
+
+registrar_figura('trapecio', 'Trapecio', [
+    ('base_mayor', 'Introduce la base mayor', 'float'),
+    ('base_menor', 'Introduce la base menor', 'float'),
+    ('altura', 'Introduce la altura', 'float')
+], area_trapecio, 'Las bases y la altura deben ser mayores que cero.')
+
+registrar_figura('cuadrado', 'Cuadrado', [
+    ('lado', 'Introduce el lado', 'float')
+], area_cuadrado, 'El lado debe ser mayor de cero.',
+    medidas={'perimetro': perimetro_cuadrado})
+
+registrar_figura('poligono_regular', 'Poligono regular', [
+    ('num_lados', 'Introduce el número de lados', 'int'),
+    ('lado', 'Introduce el lado', 'float'),
+    ('apotema', 'Introduce el apotema', 'float')
+], area_poligono_regular, 'El número de lados, el lado y el apotema deben ser mayores que cero.',
+    medidas={'perimetro': perimetro_poligono_regular})
+
+registrar_figura('elipse', 'Elipse', [
+    ('semi_eje_hor', 'Introduce el semieje horizontal', 'float'),
+    ('semi_eje_ver', 'Introduce el semieje vertical', 'float')
+], area_elipse, 'El valor de los semiejes deben ser mayores que cero.',
+    medidas={'perimetro': perimetro_elipse})
+
+registrar_figura('corona_circular', 'Corona circular', [
+    ('radio_mayor', 'Introduce el radio mayor', 'float'),
+    ('radio_menor', 'Introduce el radio menor', 'float')
+], area_corona_circular, 'El valor de los radios deben ser mayores que cero.',
+    medidas={'perimetro': perimetro_corona_circular})
+
+registrar_figura('cubo', 'Cubo', [
+    ('lado', 'Introduce el lado', 'float')
+], area_cubo, 'El lado debe ser mayor que cero.',
+    medidas={'volumen': volumen_cubo, 'superficie_lateral': superficie_lateral_cubo, 'superficie_total': area_cubo})
+
+registrar_figura('cono', 'Cono', [
+    ('radio', 'Introduce el radio', 'float'),
+    ('generatriz', 'Introduce la generatriz', 'float')
+], area_cono, 'El radio y la generatriz deben ser mayores que cero.',
+    medidas={'volumen': volumen_cono, 'superficie_lateral': superficie_lateral_cono, 'superficie_total': area_cono})
+
+registrar_figura('poligono', 'Polígono', [
+    ('vertices', 'Introduce los vértices en JSON, p. ej. [[0, 0], [4, 0], [4, 3]]', 'vertices')
+], area_poligono, 'Un polígono necesita al menos 3 vértices con coordenadas finitas y área mayor que cero.',
+    validar=_validar_poligono, medidas={'perimetro': perimetro_poligono})
+
+
+
+############################
+#### FIGURAS COMPUESTAS ####
+############################
+
+class Pieza(NamedTuple):
+    '''
+    Parte de una figura compuesta: una figura registrada cuyos parámetros son
+    variables de la compuesta (str) o constantes (número).
+    '''
+    figura: str
+    parametros: Dict[str, Union[str, float]]   # parámetro de la figura -> variable o constante
+    hueco: bool = False                        # se resta en lugar de sumarse
+    cantidad: int = 1                          # piezas iguales (p. ej. 4 taladros)
+
+
+def _formula_compuesta(piezas: Sequence[Pieza], variables: Tuple[str, ...], medida: str) -> Callable[..., Any]:
+    '''
+    Fórmula de una medida de la compuesta a partir de las de sus piezas.
+    El área y el volumen de los huecos se restan; el perímetro de los huecos
+    se suma, porque también es borde de la figura.
+    '''
+    resta = medida in ('area', 'volumen')
+    argumentos = [
+        [pieza.parametros[n] for n in FIGURAS[pieza.figura].nombres_params]
+        for pieza in piezas
+    ]
+
+    def formula(*valores: Any) -> Any:
+        entorno = dict(zip(variables, valores))
+        total = 0
+        for pieza, args in zip(piezas, argumentos):
+            valor = FIGURAS[pieza.figura].medidas[medida](*(entorno[a] if isinstance(a, str) else a for a in args))
+            total = total + (-1 if pieza.hueco and resta else 1) * pieza.cantidad * valor
+        return total
+    return formula
+
+
+def registrar_figura_compuesta(
+        nombre: str,
+        titulo: str,
+        piezas: Sequence[Pieza],
+        error: Optional[str]=None) -> Figura:
+    '''
+    Registra una figura formada por piezas de otras figuras registradas,
+    sumando las piezas y restando los huecos (como corona_circular con dos
+    círculos). Se describe una vez y se calcula como cualquier otra figura:
+    con calcular_area, en lote o desde el menú.
+
+    Las piezas no deben solaparse entre sí y cada hueco debe quedar dentro
+    de las piezas (no se comprueba la geometría, solo que el área sea positiva).
+
+        registrar_figura_compuesta('placa', 'Placa con 4 taladros', [
+            Pieza('rectangulo', {'base': 'ancho', 'altura': 'alto'}),
+            Pieza('circulo', {'radio': 'radio_taladro'}, hueco=True, cantidad=4)
+        ])
+
+    :param nombre: Clave de la figura
+    :param titulo: Título para mostrar en el menú
+    :param piezas: Piezas de la figura
+    :param error: Mensaje de error si la validación falla
+    :return: La entrada registrada
+    :rtype: Figura
+    '''
+    variables: List[str] = []
+    for pieza in piezas:
+        entrada = FIGURAS.get(pieza.figura)
+        if entrada is None:
+            raise ValueError(f'Figura {pieza.figura}, no valida. Usa: {", ".join(FIGURAS.keys())}')
+        if any(tipo not in TIPOS_NUMERICOS for _, _, tipo in entrada.params):
+            raise ValueError(f'La figura {pieza.figura} no puede ser pieza de una compuesta: sus parámetros no son numéricos')
+        if set(pieza.parametros) != set(entrada.nombres_params):
+            raise ValueError(f'Argumentos incorrectos para la figura {pieza.figura}. Se esperan: {", ".join(entrada.nombres_params)}')
+        for parametro in entrada.nombres_params:
+            valor = pieza.parametros[parametro]
+            if isinstance(valor, str) and valor not in variables:
+                variables.append(valor)
+    if not variables:
+        raise ValueError(f'La figura compuesta {nombre} necesita al menos un parámetro variable')
+    variables = tuple(variables)
+
+    # Cada medida solo si la tienen todas las piezas
+    medidas = {
+        medida: _formula_compuesta(piezas, variables, medida)
+        for medida in MEDIDAS
+        if all(medida in FIGURAS[p.figura].medidas for p in piezas)
+    }
+    area = medidas.pop('area')
+
+    def validar(*valores: Any) -> Any:
+        entorno = dict(zip(variables, valores))
+        valido = area(*valores) > 0
+        for pieza in piezas:
+            entrada = FIGURAS[pieza.figura]
+            args = (pieza.parametros[n] for n in entrada.nombres_params)
+            valido = valido & entrada.validar(*(entorno[a] if isinstance(a, str) else a for a in args))
+        return valido
+
+    params = [(variable, f'Introduce {variable.replace("_", " ")}', 'float') for variable in variables]
+    error = error or 'Los parámetros deben ser válidos para cada pieza y los huecos menores que la figura.'
+    return registrar_figura(nombre, titulo, params, area, error, validar, medidas)
+
+
+def figuras_config() -> Dict[str, Dict]:
+    '''
+    Genera la configuración del menú a partir del registro de figuras.
+    Las opciones se numeran desde '1' en orden de registro.
+    '''
+    return {
+        str(i): {
+            'nombre': figura.nombre,
+            'titulo': figura.titulo,
+            'params': list(figura.params),
+            'medidas': list(figura.medidas)
+        }
+        for i, figura in enumerate(FIGURAS.values(), 1)
+    }
 
 
 ###############################
@@ -12,109 +426,244 @@ def calcular_area(figura: str, **kwargs: float) -> Union[float, str]:
    Calcula el área de distintas figuras geométricas según los argumentos pasados.
 
     Parámetros:
-        figura (str): Tipo de figura ('rectangulo', 'triangulo', 'circulo', 'trapecio', 'cuadrado', 'poligono regular')
+        figura (str): Tipo de figura registrada en FIGURAS ('rectangulo', 'circulo', 'cono', etc.)
         **kwargs: Parámetros de cada figura (base, altura, radio, lado, etc.)
 
     Retorna:
         float: Área calculada redondeada a 2 decimales.
         str: Mensaje de error si falta un argumento o la figura no es válida.
     '''
+    cache = cache_resultados()
+    clave = cache.clave(figura, kwargs) if cache is not None else None
+    area = cache.obtener(clave) if clave is not None else None
+
+    if area is None:
+        area = calcular_area_sin_registro(figura, **kwargs)
+        if isinstance(area, str):
+            return area
+        if clave is not None:
+            cache.guardar(clave, area)
+    elif not cache.registrar_aciertos:
+        return area
 
-    def area_rectangulo(base: float, altura: float) -> float:
-        ''' Calcula el ára del rectángulo '''
-        if base <= 0 or altura <= 0:
-            raise ValueError('Base y altura deben ser mayores a cero.')
-        return base * altura
-    
-
-    def area_triangulo(base: float, altura: float) -> float:
-        ''' Calcula el área de un triángulo '''
-        if base <= 0 or altura <= 0:
-            raise ValueError('Base y altura deben ser mayores que cero.')
-        return (base * altura) / 2
-    
-
-    def area_circulo(radio: float) -> float:
-        ''' Calcula el área de un circulo '''
-        if radio <= 0:
-            raise ValueError('El radio debe ser mayor de cero.')
-        return math.pi * (radio ** 2)
-    
-
-    def area_trapecio(base_mayor: float, base_menor: float, altura: float) -> float:
-        ''' Calcula el área de un trapecio '''
-        if base_mayor <= 0 or base_menor <= 0 or altura <= 0:
-            raise ValueError('Las bases y la altura deben ser mayores que cero.')
-        return ((base_mayor + base_menor) / 2) * altura
-    
-
-    def area_cuadrado(lado: float) -> float:
-        ''' Calcula el área de un cuadrado '''
-        if lado <= 0:
-            raise ValueError('El lado debe ser mayor de cero.')
-        return lado ** 2
-    
-
-    def area_poligono_regular(num_lados: int, lado: float, apotema: float) -> float:
-        ''' Calcula el área de un poligono regular '''
-        if num_lados <= 0 or lado <= 0 or apotema <= 0:
-            raise ValueError('El número de lados, el lado y el apotema deben ser mayores que cero.')
-        return num_lados * ((lado * apotema) / 2)
-    
-
-    def area_elipse(semi_eje_hor: float, semi_eje_ver: float) -> float:
-        ''' Calcula el área de una elipse '''
-        if semi_eje_hor <= 0 or semi_eje_ver <= 0:
-            raise ValueError('El valor de los semiejes deben ser mayores que cero.')
-        return math.pi * semi_eje_ver * semi_eje_hor
-    
-
-    def area_corona_circular(radio_mayor: float, radio_menor: float) -> float:
-        ''' Calcula el área de una corona circular '''
-        if radio_mayor <= 0 or radio_menor <= 0:
-            raise ValueError('El valor de los radios deben ser mayores que cero.')
-        return math.pi * ((radio_mayor ** 2) - (radio_menor ** 2))
-    
-
-    def area_cubo(lado: float) -> float:
-        ''' Calcula el área de un cubo '''
-        if lado <= 0 :
-            raise ValueError('El lado debe ser mayor que cero.')
-        return 6 * (lado ** 2)
-    
-
-    def area_cono(radio: float, generatriz: float) -> float:
-        ''' Calcula el área de un cono '''
-        if radio <= 0 or generatriz <= 0:
-            raise ValueError('El radio y la generatriz deben ser mayores que cero.')
-        return math.pi * radio * (radio + generatriz)
-
-
-    figuras = {
-        'rectangulo': area_rectangulo,
-        'triangulo': area_triangulo,
-        'circulo': area_circulo,
-        'trapecio': area_trapecio,
-        'cuadrado': area_cuadrado,
-        'poligono_regular': area_poligono_regular,
-        'elipse': area_elipse,
-        'corona_circular': area_corona_circular,
-        'cubo': area_cubo,
-        'cono': area_cono
+    datos = {
+        'figura': figura,
+        'area': area,
+        'parametros': kwargs
     }
 
-    if figura not in figuras:
-        raise ValueError(f'Figura {figura}, no valida. Usa: {", ".join(figuras.keys())}')
+    registrar_resultado(**datos)
+    return area
 
-    try:
-        area = round(figuras[figura](**kwargs), 2)
-        datos = {
-            'figura': figura,
-            'area': area,
-            'parametros': kwargs
-        }
 
-        registrar_resultado(**datos)
+def calcular_area_sin_registro(figura: str, **kwargs: float) -> Union[float, str]:
+    '''
+    Igual que calcular_area pero sin guardar el resultado en el historial.
+    Para quien se encarga de persistir por su cuenta (p. ej. servicio_async).
+    '''
+    if not metricas.activas():
+        return _calcular(figura, kwargs)
+
+    # Con métricas: latencia por figura y cálculos por figura y resultado
+    # (las figuras no registradas comparten etiqueta para no crear series sin fin)
+    etiqueta = figura if figura in FIGURAS else 'desconocida'
+    resultado = 'error'
+    inicio = time.perf_counter()
+    try:
+        area = _calcular(figura, kwargs)
+        if not isinstance(area, str):
+            resultado = 'ok'
         return area
+    finally:
+        metricas.observar('calculo_segundos', time.perf_counter() - inicio, figura=etiqueta)
+        metricas.incrementar('calculos_total', figura=etiqueta, resultado=resultado)
+
+
+def _calcular(figura: str, kwargs: Dict[str, float]) -> Union[float, str]:
+    ''' Cuerpo de calcular_area_sin_registro '''
+    entrada = FIGURAS.get(figura)
+    if entrada is None:
+        raise ValueError(f'Figura {figura}, no valida. Usa: {", ".join(FIGURAS.keys())}')
+
+    try:
+        valores = [kwargs[nombre] for nombre in entrada.nombres_params]
+    except KeyError:
+        return f'Argumentos incorrectos para la figura {figura}'
+    if len(kwargs) != len(valores):
+        return f'Argumentos incorrectos para la figura {figura}'
+
+    try:
+        valido = entrada.validar(*valores)
+        area = round(entrada.area(*valores), 2) if valido else None
     except TypeError:
-        return f'Argumentos incorrectos para la figura {figura}'
\ No newline at end of file
+        # Parámetros de un tipo no numérico (p. ej. lado='abc')
+        return f'Argumentos incorrectos para la figura {figura}'
+    if not valido:
+        raise ValueError(entrada.error)
+
+    return area
+
+
+def _figura_y_medidas(figura: str, medidas: Optional[Sequence[str]]) -> Tuple[Figura, Tuple[str, ...]]:
+    ''' Entrada del registro y medidas pedidas (todas las de la figura si es None) '''
+    entrada = FIGURAS.get(figura)
+    if entrada is None:
+        raise ValueError(f'Figura {figura}, no valida. Usa: {", ".join(FIGURAS.keys())}')
+    if medidas is None:
+        return entrada, tuple(entrada.medidas)
+    desconocidas = [m for m in medidas if m not in MEDIDAS]
+    if desconocidas:
+        raise ValueError(f'Medidas no validas: {", ".join(desconocidas)}. Usa: {", ".join(MEDIDAS)}')
+    return entrada, tuple(medidas)
+
+
+def calcular_medidas(figura: str, medidas: Optional[Sequence[str]]=None, **kwargs: float) -> Dict[str, Optional[float]]:
+    '''
+    Calcula varias medidas de una figura (área, perímetro, volumen,
+    superficie lateral y total) validando los parámetros una sola vez.
+    No registra nada en el historial.
+
+    Parámetros:
+        figura (str): Tipo de figura registrada en FIGURAS
+        medidas (Sequence[str]): Medidas de MEDIDAS a calcular; por defecto,
+            todas las que tiene la figura
+        **kwargs: Parámetros de la figura
+
+    Retorna:
+        Dict[str, Optional[float]]: Cada medida redondeada a 2 decimales, o
+            None si no está definida para la figura (o no existe, como el
+            volumen de un cono con la generatriz menor que el radio).
+    '''
+    entrada, medidas = _figura_y_medidas(figura, medidas)
+    if set(kwargs) != set(entrada.nombres_params):
+        raise ValueError(f'Argumentos incorrectos para la figura {figura}. Se esperan: {", ".join(entrada.nombres_params)}')
+    valores = [kwargs[nombre] for nombre in entrada.nombres_params]
+    if not entrada.validar(*valores):
+        raise ValueError(entrada.error)
+
+    resultado = {}
+    for medida in medidas:
+        formula = entrada.medidas.get(medida)
+        valor = formula(*valores) if formula is not None else math.nan
+        resultado[medida] = round(valor, 2) if not math.isnan(valor) else None
+    return resultado
+
+
+####################################
+#### CÁLCULO VECTORIZADO (LOTE) ####
+####################################
+
+class ResultadoLote(NamedTuple):
+    ''' Resultado de un cálculo en lote '''
+    areas: Any      # np.ndarray de float, NaN en las filas inválidas
+    invalidos: Any  # np.ndarray de bool, True en las filas inválidas
+
+    @property
+    def filas_invalidas(self) -> List[int]:
+        ''' Índices de las filas que no superaron la validación '''
+        return self.invalidos.nonzero()[0].tolist()
+
+
+class ResultadoMedidas(NamedTuple):
+    ''' Resultado de calcular_medidas_lote '''
+    medidas: Dict[str, Any]     # medida -> np.ndarray de float (NaN en filas inválidas o sin fórmula)
+    invalidos: Any              # np.ndarray de bool, True en las filas inválidas
+
+    @property
+    def filas_invalidas(self) -> List[int]:
+        ''' Índices de las filas que no superaron la validación '''
+        return self.invalidos.nonzero()[0].tolist()
+
+
+def _preparar_lote(entrada: Figura, arrays: Dict[str, Any]) -> Tuple[List[Any], Any]:
+    '''
+    Convierte los parámetros de un lote a arrays del mismo tamaño y los
+    valida una vez. Retorna (arrays en el orden de la figura, máscara de
+    filas inválidas).
+    '''
+    import numpy as np
+
+    nombres = entrada.nombres_params
+    if set(arrays) != set(nombres):
+        raise ValueError(f'Argumentos incorrectos para la figura {entrada.nombre}. Se esperan: {", ".join(nombres)}')
+    if any(tipo not in TIPOS_NUMERICOS for _, _, tipo in entrada.params):
+        raise ValueError(f'La figura {entrada.nombre} no admite cálculo en lote por parámetro; usa poligonos.medidas_poligonos')
+
+    valores = np.broadcast_arrays(*(np.asarray(arrays[n], dtype=np.float64) for n in nombres))
+    valores = [np.atleast_1d(v) for v in valores]
+
+    with np.errstate(invalid='ignore', over='ignore'):
+        validos = np.ones(valores[0].shape, dtype=bool)
+        validos &= entrada.validar(*valores)
+        for v in valores:
+            validos &= np.isfinite(v)
+    return valores, ~validos
+
+
+def calcular_areas_lote(figura: str, **arrays: Any) -> ResultadoLote:
+    '''
+    Calcula el área de muchas figuras del mismo tipo en una sola llamada.
+
+    Los parámetros se reciben como arrays de NumPy (o secuencias convertibles)
+    y se combinan con las reglas de broadcasting. La validación de la figura
+    (más la comprobación de valores finitos) se aplica como máscara: las filas
+    inválidas se marcan en el resultado en lugar de lanzar una excepción.
+    No registra nada en el historial.
+
+    Parámetros:
+        figura (str): Tipo de figura registrada en FIGURAS
+        **arrays: Un array por cada parámetro de la figura
+
+    Retorna:
+        ResultadoLote: Áreas redondeadas a 2 decimales (NaN en filas inválidas)
+            y máscara booleana con las filas inválidas.
+    '''
+    import numpy as np
+
+    entrada = FIGURAS.get(figura)
+    if entrada is None:
+        raise ValueError(f'Figura {figura}, no valida. Usa: {", ".join(FIGURAS.keys())}')
+
+    valores, invalidos = _preparar_lote(entrada, arrays)
+    with np.errstate(invalid='ignore', over='ignore'):
+        areas = np.round(entrada.area(*valores), 2)
+    areas[invalidos] = np.nan
+
+    return ResultadoLote(areas=areas, invalidos=invalidos)
+
+
+def calcular_medidas_lote(figura: str, medidas: Optional[Sequence[str]]=None, **arrays: Any) -> ResultadoMedidas:
+    '''
+    Calcula varias medidas (área, perímetro, volumen, superficie lateral y
+    total) de muchas figuras del mismo tipo en una sola pasada: los
+    parámetros se convierten, combinan y validan una vez y cada fórmula se
+    aplica a los arrays completos. No registra nada en el historial.
+
+    Parámetros:
+        figura (str): Tipo de figura registrada en FIGURAS
+        medidas (Sequence[str]): Medidas de MEDIDAS a calcular; por defecto,
+            todas las que tiene la figura
+        **arrays: Un array por cada parámetro de la figura
+
+    Retorna:
+        ResultadoMedidas: Un array por medida redondeado a 2 decimales (NaN en
+            las filas inválidas, en las medidas que la figura no tiene y donde
+            la medida no existe) y la máscara de filas inválidas.
+    '''
+    import numpy as np
+
+    entrada, medidas = _figura_y_medidas(figura, medidas)
+    valores, invalidos = _preparar_lote(entrada, arrays)
+
+    resultado = {}
+    with np.errstate(invalid='ignore', over='ignore', divide='ignore'):
+        for medida in medidas:
+            formula = entrada.medidas.get(medida)
+            if formula is None:
+                resultado[medida] = np.full(invalidos.shape, np.nan)
+                continue
+            columna = np.round(np.asarray(formula(*valores), dtype=np.float64), 2)
+            columna[invalidos] = np.nan
+            resultado[medida] = columna
+
+    return ResultadoMedidas(medidas=resultado, invalidos=invalidos)
@@ -0,0 +1,241 @@
+import math
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+
+##########################################
+###### BOCETO DE CUANTILES (SKETCH) ######
+##########################################
+
+class BocetoCuantiles:
+    '''
+    Boceto de cuantiles con error relativo acotado (cubetas logarítmicas).
+
+    Cada valor se asigna a la cubeta ceil(log_gamma(|x|)), así que el tamaño
+    depende del rango de valores y no del número de registros. Un cuantil
+    estimado tiene como mucho un error relativo de 'precision'.
+    '''
+
+    def __init__(self, precision: float=0.01):
+        self.precision = precision
+        self._gamma = (1 + precision) / (1 - precision)
+        self._log_gamma = math.log(self._gamma)
+        self.positivas: Counter = Counter()
+        self.negativas: Counter = Counter()
+        self.ceros = 0
+        self.total = 0
+
+
+    def _indice(self, valor: float) -> int:
+        ''' Cubeta que corresponde a un valor absoluto positivo '''
+        return math.ceil(math.log(valor) / self._log_gamma)
+
+
+    def _valor(self, indice: int) -> float:
+        ''' Valor representativo de una cubeta '''
+        return 2 * self._gamma ** indice / (self._gamma + 1)
+
+
+    def agregar(self, valor: float) -> None:
+        ''' Añade un valor al boceto en O(1) '''
+        if valor > 0:
+            self.positivas[self._indice(valor)] += 1
+        elif valor < 0:
+            self.negativas[self._indice(-valor)] += 1
+        else:
+            self.ceros += 1
+        self.total += 1
+
+
+    def cuantil(self, q: float) -> Optional[float]:
+        ''' Estima el cuantil q (entre 0 y 1); None si el boceto está vacío '''
+        if not self.total:
+            return None
+        rango = q * (self.total - 1)
+        acumulado = 0
+
+        # Negativos de mayor a menor magnitud, luego ceros, luego positivos
+        for indice in sorted(self.negativas, reverse=True):
+            acumulado += self.negativas[indice]
+            if acumulado > rango:
+                return -self._valor(indice)
+        acumulado += self.ceros
+        if acumulado > rango:
+            return 0.0
+        for indice in sorted(self.positivas):
+            acumulado += self.positivas[indice]
+            if acumulado > rango:
+                return self._valor(indice)
+        return self._valor(max(self.positivas)) if self.positivas else 0.0
+
+
+    def combinar(self, otro: 'BocetoCuantiles') -> None:
+        ''' Suma las cubetas de otro boceto con la misma precisión '''
+        if otro.precision != self.precision:
+            raise ValueError('Solo se pueden combinar bocetos con la misma precisión')
+        self.positivas.update(otro.positivas)
+        self.negativas.update(otro.negativas)
+        self.ceros += otro.ceros
+        self.total += otro.total
+
+
+    def a_dict(self) -> Dict:
+        ''' Representación serializable en JSON '''
+        return {
+            'precision': self.precision,
+            'positivas': {str(k): v for k, v in self.positivas.items()},
+            'negativas': {str(k): v for k, v in self.negativas.items()},
+            'ceros': self.ceros,
+            'total': self.total
+        }
+
+
+    @classmethod
+    def desde_dict(cls, datos: Dict) -> 'BocetoCuantiles':
+        ''' Reconstruye un boceto guardado con a_dict '''
+        boceto = cls(datos.get('precision', 0.01))
+        boceto.positivas = Counter({int(k): v for k, v in datos.get('positivas', {}).items()})
+        boceto.negativas = Counter({int(k): v for k, v in datos.get('negativas', {}).items()})
+        boceto.ceros = datos.get('ceros', 0)
+        boceto.total = datos.get('total', 0)
+        return boceto
+
+
+########################################
+###### ESTADÍSTICAS INCREMENTALES ######
+########################################
+
+class EstadisticasIncrementales:
+    '''
+    Acumulador de estadísticas del historial que se actualiza en O(1) por registro.
+
+    Guarda número de registros, suma, mínimo, máximo, media y varianza
+    (algoritmo de Welford), conteo por figura y un boceto de cuantiles.
+    '''
+
+    def __init__(self):
+        self.total_registros = 0
+        self.total_areas = 0
+        self.suma = 0.0
+        self.media = 0.0
+        self._m2 = 0.0
+        self.minimo: Optional[float] = None
+        self.maximo: Optional[float] = None
+        self.por_figura: Counter = Counter()
+        self.cuantiles = BocetoCuantiles()
+
+
+    def agregar(self, dato: Dict) -> None:
+        ''' Incorpora un registro del historial '''
+        self.total_registros += 1
+
+        figura = dato.get('figura')
+        if figura:
+            self.por_figura[figura] += 1
+
+        area = dato.get('area')
+        if not isinstance(area, (int, float)):
+            return
+
+        self.total_areas += 1
+        self.suma += area
+        delta = area - self.media
+        self.media += delta / self.total_areas
+        self._m2 += delta * (area - self.media)
+        self.minimo = area if self.minimo is None else min(self.minimo, area)
+        self.maximo = area if self.maximo is None else max(self.maximo, area)
+        self.cuantiles.agregar(area)
+
+
+    def agregar_varios(self, datos: Iterable[Dict]) -> None:
+        ''' Incorpora varios registros '''
+        for dato in datos:
+            self.agregar(dato)
+
+
+    def combinar(self, otro: 'EstadisticasIncrementales') -> None:
+        ''' Incorpora otro acumulador (p. ej. de un segmento archivado) sin recorrer sus registros '''
+        self.total_registros += otro.total_registros
+        self.por_figura.update(otro.por_figura)
+        self.cuantiles.combinar(otro.cuantiles)
+        if not otro.total_areas:
+            return
+
+        # Media y varianza combinadas (Chan et al.)
+        total = self.total_areas + otro.total_areas
+        delta = otro.media - self.media
+        self._m2 += otro._m2 + delta * delta * self.total_areas * otro.total_areas / total
+        self.media += delta * otro.total_areas / total
+        self.total_areas = total
+        self.suma += otro.suma
+        self.minimo = otro.minimo if self.minimo is None else min(self.minimo, otro.minimo)
+        self.maximo = otro.maximo if self.maximo is None else max(self.maximo, otro.maximo)
+
+
+    @property
+    def varianza(self) -> float:
+        ''' Varianza muestral de las áreas '''
+        return self._m2 / (self.total_areas - 1) if self.total_areas > 1 else 0.0
+
+
+    def figura_mas_calculada(self) -> str:
+        ''' Figura con más registros (la primera registrada en caso de empate) '''
+        if not self.por_figura:
+            return 'ninguna'
+        return self.por_figura.most_common(1)[0][0]
+
+
+    def resumen(self) -> Dict:
+        ''' Diccionario con las mismas claves que calcular_estadisticas_cached y algunas más '''
+        if not self.total_areas:
+            return {
+                'total_calculos': self.total_registros,
+                'area_promedio': 0,
+                'area_maxima': 0,
+                'area_minima': 0,
+                'figura_mas_calculada': self.figura_mas_calculada(),
+                'desviacion_tipica': 0,
+                'mediana': 0,
+                'percentil_95': 0
+            }
+        return {
+            'total_calculos': self.total_registros,
+            'area_promedio': self.suma / self.total_areas,
+            'area_maxima': self.maximo,
+            'area_minima': self.minimo,
+            'figura_mas_calculada': self.figura_mas_calculada(),
+            'desviacion_tipica': math.sqrt(self.varianza),
+            'mediana': self.cuantiles.cuantil(0.5),
+            'percentil_95': self.cuantiles.cuantil(0.95)
+        }
+
+
+    def a_dict(self) -> Dict:
+        ''' Representación serializable en JSON '''
+        return {
+            'total_registros': self.total_registros,
+            'total_areas': self.total_areas,
+            'suma': self.suma,
+            'media': self.media,
+            'm2': self._m2,
+            'minimo': self.minimo,
+            'maximo': self.maximo,
+            'por_figura': dict(self.por_figura),
+            'cuantiles': self.cuantiles.a_dict()
+        }
+
+
+    @classmethod
+    def desde_dict(cls, datos: Dict) -> 'EstadisticasIncrementales':
+        ''' Reconstruye un acumulador guardado con a_dict '''
+        stats = cls()
+        stats.total_registros = datos.get('total_registros', 0)
+        stats.total_areas = datos.get('total_areas', 0)
+        stats.suma = datos.get('suma', 0.0)
+        stats.media = datos.get('media', 0.0)
+        stats._m2 = datos.get('m2', 0.0)
+        stats.minimo = datos.get('minimo')
+        stats.maximo = datos.get('maximo')
+        stats.por_figura = Counter(datos.get('por_figura', {}))
+        stats.cuantiles = BocetoCuantiles.desde_dict(datos.get('cuantiles', {}))
+        return stats
@@ -0,0 +1,223 @@
+import math
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+FORMATO_FECHA = '%d/%m/%Y %H:%M:%S'
+
+
+def fecha_a_epoch(fecha: Optional[str]) -> float:
+    '''
+    Convierte 'dd/mm/YYYY HH:MM:SS' a segundos epoch (hora local).
+    Evita strptime en el caso normal; retorna NaN si la fecha no es válida.
+    '''
+    if not fecha:
+        return math.nan
+    try:
+        if len(fecha) == 19:
+            return datetime(
+                int(fecha[6:10]), int(fecha[3:5]), int(fecha[0:2]),
+                int(fecha[11:13]), int(fecha[14:16]), int(fecha[17:19])
+            ).timestamp()
+        return datetime.strptime(fecha, FORMATO_FECHA).timestamp()
+    except (ValueError, TypeError):
+        return math.nan
+
+
+def epoch_a_fecha(epoch: float) -> str:
+    ''' Convierte segundos epoch al formato de fecha del historial '''
+    if math.isnan(epoch):
+        return 'N/D'
+    return datetime.fromtimestamp(epoch).strftime(FORMATO_FECHA)
+
+
+def epoch_registro(dato: Dict) -> float:
+    '''
+    Segundos epoch de un registro: su columna 'epoch' o, en los registros
+    anteriores a ella, su 'fecha' convertida (NaN si no hay ninguna válida).
+    '''
+    epoch = dato.get('epoch')
+    if isinstance(epoch, (int, float)):
+        return float(epoch)
+    return fecha_a_epoch(dato.get('fecha'))
+
+
+def fecha_registro(dato: Dict) -> str:
+    ''' Fecha para mostrar de un registro: su 'fecha' o la derivada de 'epoch' '''
+    fecha = dato.get('fecha')
+    if fecha:
+        return fecha
+    epoch = dato.get('epoch')
+    return epoch_a_fecha(float(epoch)) if isinstance(epoch, (int, float)) else 'N/D'
+
+
+################################
+###### HISTORIAL COLUMNAR ######
+################################
+
+class HistorialColumnar:
+    '''
+    Representación compacta del historial en columnas tipadas.
+
+    - fechas: array('d') con segundos epoch
+    - areas: array('d') (NaN si el registro no tiene área numérica)
+    - figura_ids: array('H') con índices en la tabla de figuras internadas
+    - parámetros: una matriz por figura (array('d') plano de n_filas x n_params)
+      y el índice global de cada fila de esa matriz
+
+    Cada registro ocupa ~18 bytes en las columnas comunes más 8 bytes por
+    parámetro, frente a varios cientos como diccionario.
+    '''
+
+    def __init__(self):
+        self.fechas = array('d')
+        self.areas = array('d')
+        self.figura_ids = array('H')
+        self.figuras: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.param_nombres: List[Tuple[str, ...]] = []
+        self.param_valores: List[array] = []
+        self.param_filas: List[array] = []
+        self._fila_en_figura = array('I')
+
+
+    def __len__(self) -> int:
+        return len(self.areas)
+
+
+    def _id_figura(self, figura: str, parametros: Dict) -> int:
+        ''' Id internado de la figura; la crea con el esquema de parámetros del primer registro '''
+        fid = self._ids.get(figura)
+        if fid is None:
+            fid = len(self.figuras)
+            self._ids[figura] = fid
+            self.figuras.append(figura)
+            self.param_nombres.append(tuple(parametros))
+            self.param_valores.append(array('d'))
+            self.param_filas.append(array('I'))
+        return fid
+
+
+    def agregar(self, dato: Dict) -> None:
+        ''' Añade un registro del historial (diccionario) a las columnas '''
+        figura = dato.get('figura') or 'desconocida'
+        parametros = dato.get('parametros') or {}
+        if not isinstance(parametros, dict):
+            parametros = {}
+        area = dato.get('area')
+
+        fid = self._id_figura(figura, parametros)
+        fila = len(self.areas)
+
+        self.fechas.append(epoch_registro(dato))
+        self.areas.append(float(area) if isinstance(area, (int, float)) else math.nan)
+        self.figura_ids.append(fid)
+
+        valores = self.param_valores[fid]
+        for nombre in self.param_nombres[fid]:
+            valor = parametros.get(nombre)
+            valores.append(float(valor) if isinstance(valor, (int, float)) else math.nan)
+        self._fila_en_figura.append(len(self.param_filas[fid]))
+        self.param_filas[fid].append(fila)
+
+
+    def extender(self, datos: Iterable[Dict]) -> None:
+        ''' Añade varios registros '''
+        for dato in datos:
+            self.agregar(dato)
+
+
+    @classmethod
+    def desde_registros(cls, datos: Iterable[Dict]) -> 'HistorialColumnar':
+        ''' Construye el historial columnar a partir de registros (en streaming) '''
+        historial = cls()
+        historial.extender(datos)
+        return historial
+
+
+    def parametros(self, fila: int) -> Dict[str, float]:
+        ''' Parámetros de una fila como diccionario '''
+        fid = self.figura_ids[fila]
+        nombres = self.param_nombres[fid]
+        inicio = self._fila_en_figura[fila] * len(nombres)
+        valores = self.param_valores[fid][inicio:inicio + len(nombres)]
+        return {n: v for n, v in zip(nombres, valores) if not math.isnan(v)}
+
+
+    def registro(self, fila: int) -> Dict:
+        ''' Reconstruye el registro de una fila con el formato del historial '''
+        if fila < 0:
+            fila += len(self)
+        area = self.areas[fila]
+        epoch = self.fechas[fila]
+        return {
+            'fecha': epoch_a_fecha(epoch),
+            'epoch': None if math.isnan(epoch) else int(epoch),
+            'figura': self.figuras[self.figura_ids[fila]],
+            'area': None if math.isnan(area) else area,
+            'parametros': self.parametros(fila)
+        }
+
+
+    def ultimos(self, n: int) -> List[Dict]:
+        ''' Los últimos n registros en orden cronológico '''
+        if n <= 0:
+            return []
+        return [self.registro(i) for i in range(max(0, len(self) - n), len(self))]
+
+
+    def filas_de_figura(self, figura: str) -> array:
+        ''' Índices de fila de una figura, sin recorrer el resto del historial '''
+        fid = self._ids.get(figura.lower().strip())
+        return self.param_filas[fid] if fid is not None else array('I')
+
+
+    def buscar(self, figura: str) -> List[Dict]:
+        ''' Registros de una figura, en orden cronológico '''
+        return [self.registro(i) for i in self.filas_de_figura(figura)]
+
+
+    def matriz_parametros(self, figura: str):
+        '''
+        Matriz (n_filas x n_params) de parámetros de una figura como array de
+        NumPy sin copia, junto con los nombres de columna.
+        '''
+        import numpy as np
+
+        fid = self._ids.get(figura)
+        if fid is None:
+            return np.empty((0, 0)), ()
+        nombres = self.param_nombres[fid]
+        valores = np.frombuffer(self.param_valores[fid], dtype=np.float64)
+        return valores.reshape(-1, max(1, len(nombres))), nombres
+
+
+    def estadisticas(self) -> Dict:
+        ''' Estadísticas con las mismas claves que calcular_estadisticas_cached '''
+        validas = [a for a in self.areas if not math.isnan(a)]
+        conteos = [len(filas) for filas in self.param_filas]
+        mas_calculada = self.figuras[conteos.index(max(conteos))] if conteos else 'ninguna'
+        if not validas:
+            return {
+                'total_calculos': len(self),
+                'area_promedio': 0,
+                'area_maxima': 0,
+                'area_minima': 0,
+                'figura_mas_calculada': mas_calculada
+            }
+        return {
+            'total_calculos': len(self),
+            'area_promedio': math.fsum(validas) / len(validas),
+            'area_maxima': max(validas),
+            'area_minima': min(validas),
+            'figura_mas_calculada': mas_calculada
+        }
+
+
+    def memoria_bytes(self) -> int:
+        ''' Memoria aproximada ocupada por las columnas '''
+        total = sum(col.itemsize * len(col) for col in (self.fechas, self.areas, self.figura_ids, self._fila_en_figura))
+        total += sum(v.itemsize * len(v) for v in self.param_valores)
+        total += sum(f.itemsize * len(f) for f in self.param_filas)
+        return total
@@ -0,0 +1,248 @@
+import json
+import math
+import struct
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from historial_columnar import fecha_a_epoch
+
+
+# Una fila del índice por registro: byte donde empieza, fecha (epoch), área e id de figura
+FORMATO_FILA = struct.Struct('<qddH')
+DTYPE_FILA = [('posicion', '<i8'), ('fecha', '<f8'), ('area', '<f8'), ('figura', '<u2')]
+
+# Filas añadidas tras la última ordenación que se recorren sin índice; al
+# superar este número se vuelve a ordenar
+MAX_SIN_ORDENAR = 4096
+
+
+class IndiceHistorial:
+    '''
+    Índice invertido del historial (JSON o JSON Lines).
+
+    Guarda una fila empaquetada por registro (posición en el archivo, fecha,
+    área y figura) y, al consultar, órdenes por (figura, área), (figura,
+    fecha), área y fecha calculados con NumPy. Las consultas por figura y
+    rangos de área o fecha se resuelven con búsqueda binaria sobre esos
+    órdenes; solo las filas añadidas desde la última ordenación se recorren.
+    '''
+
+    def __init__(self):
+        self.figuras: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.posicion = 0       # hasta dónde se ha indexado el historial (como leer_incremento)
+        self.firma = ''         # bytes previos a posicion, en hex
+        self.filas = bytearray()
+        self._tabla = None
+        self._ordenes: Dict[tuple, tuple] = {}
+        self._ultima_fecha = None
+        self._ultimo_epoch = math.nan
+
+
+    def __len__(self) -> int:
+        return len(self.filas) // FORMATO_FILA.size
+
+
+    def agregar(self, posicion: int, dato: Dict) -> bytes:
+        ''' Indexa un registro que empieza en el byte 'posicion'; retorna la fila empaquetada '''
+        if not isinstance(dato, Mapping):
+            dato = {}
+        figura = dato.get('figura') or 'desconocida'
+        fid = self._ids.get(figura)
+        if fid is None:
+            fid = self._ids[figura] = len(self.figuras)
+            self.figuras.append(figura)
+        area = dato.get('area')
+        epoch = dato.get('epoch')
+        if not isinstance(epoch, (int, float)):
+            # Registro anterior a la columna epoch: se convierte la fecha
+            # (los registros seguidos suelen compartirla, p. ej. en lotes)
+            fecha = dato.get('fecha')
+            if fecha != self._ultima_fecha:
+                self._ultima_fecha, self._ultimo_epoch = fecha, fecha_a_epoch(fecha)
+            epoch = self._ultimo_epoch
+        fila = FORMATO_FILA.pack(
+            posicion,
+            epoch,
+            float(area) if isinstance(area, (int, float)) else math.nan,
+            fid
+        )
+        self.filas += fila
+        return fila
+
+
+    def posiciones(self, inicio: int, fin: int) -> List[int]:
+        ''' Bytes de inicio de los registros número inicio..fin-1 (sin NumPy) '''
+        inicio, fin = max(0, inicio), min(fin, len(self))
+        return [
+            FORMATO_FILA.unpack_from(self.filas, n * FORMATO_FILA.size)[0]
+            for n in range(inicio, fin)
+        ]
+
+
+    def extender(self, registros: Iterable[Tuple[int, Dict]]) -> bytes:
+        ''' Indexa pares (posición, registro); retorna las filas nuevas empaquetadas '''
+        return b''.join(self.agregar(posicion, dato) for posicion, dato in registros)
+
+
+    def _ordenar(self):
+        ''' Fija la tabla NumPy de las filas actuales; los órdenes se recalculan al usarse '''
+        import numpy as np
+
+        self._tabla = np.frombuffer(bytes(self.filas), dtype=DTYPE_FILA)
+        self._ordenes = {}
+        return self._tabla
+
+
+    def _orden(self, campo: str, por_figura: bool) -> tuple:
+        '''
+        Orden perezoso por campo ('area' o 'fecha'), opcionalmente agrupado
+        por figura: (permutación, figuras ordenadas o None, valores ordenados)
+        '''
+        import numpy as np
+
+        clave = (campo, por_figura)
+        orden = self._ordenes.get(clave)
+        if orden is None:
+            tabla = self._tabla
+            if por_figura:
+                permutacion = np.lexsort((tabla[campo], tabla['figura']))
+                figuras = tabla['figura'][permutacion]
+            else:
+                permutacion = np.argsort(tabla[campo], kind='stable')
+                figuras = None
+            orden = self._ordenes[clave] = (permutacion, figuras, tabla[campo][permutacion])
+        return orden
+
+
+    def _rango(self, campo: str, fid: Optional[int], minimo: Optional[float], maximo: Optional[float]):
+        ''' Filas cuyo campo está en [minimo, maximo] (dentro de una figura si se indica), por búsqueda binaria '''
+        import numpy as np
+
+        permutacion, figuras, valores = self._orden(campo, fid is not None)
+        inicio, fin = 0, len(permutacion)
+        if fid is not None:
+            inicio = int(np.searchsorted(figuras, fid, 'left'))
+            fin = int(np.searchsorted(figuras, fid, 'right'))
+
+        if minimo is not None or maximo is not None:
+            tramo = valores[inicio:fin]
+            desde = int(np.searchsorted(tramo, minimo, 'left')) if minimo is not None else 0
+            # Los NaN quedan al final del orden y no entran en ningún rango
+            hasta = int(np.searchsorted(tramo, maximo, 'right')) if maximo is not None \
+                else int(np.searchsorted(tramo, np.inf, 'right'))
+            inicio, fin = inicio + desde, inicio + max(desde, hasta)
+        return permutacion[inicio:fin]
+
+
+    def consultar(
+            self,
+            figura: Optional[str]=None,
+            area_min: Optional[float]=None,
+            area_max: Optional[float]=None,
+            desde: Optional[float]=None,
+            hasta: Optional[float]=None) -> List[int]:
+        '''
+        Posiciones (bytes) de los registros que cumplen todos los filtros, en
+        orden del archivo. Las fechas se indican en segundos epoch.
+
+        Se usa el orden del filtro más selectivo (búsqueda binaria) y el resto
+        de condiciones se comprueban solo sobre esos candidatos.
+        '''
+        import numpy as np
+
+        if figura is not None and figura not in self._ids:
+            return []
+        fid = self._ids.get(figura) if figura is not None else None
+
+        if self._tabla is None or len(self) - len(self._tabla) > MAX_SIN_ORDENAR:
+            self._ordenar()
+        tabla = self._tabla
+
+        por_area = area_min is not None or area_max is not None
+        por_fecha = desde is not None or hasta is not None
+        candidatos = []
+        if por_area:
+            candidatos.append(self._rango('area', fid, area_min, area_max))
+        if por_fecha:
+            candidatos.append(self._rango('fecha', fid, desde, hasta))
+        if not candidatos:
+            candidatos.append(
+                self._rango('area', fid, None, None) if fid is not None else np.arange(len(tabla))
+            )
+        filas = min(candidatos, key=len)
+
+        # Filas añadidas desde la última ordenación
+        recientes = np.frombuffer(bytes(self.filas[len(tabla) * FORMATO_FILA.size:]), dtype=DTYPE_FILA)
+        seleccion = np.concatenate([tabla[filas], recientes])
+
+        mascara = np.ones(len(seleccion), dtype=bool)
+        if fid is not None:
+            mascara &= seleccion['figura'] == fid
+        with np.errstate(invalid='ignore'):
+            if area_min is not None:
+                mascara &= seleccion['area'] >= area_min
+            if area_max is not None:
+                mascara &= seleccion['area'] <= area_max
+            if desde is not None:
+                mascara &= seleccion['fecha'] >= desde
+            if hasta is not None:
+                mascara &= seleccion['fecha'] <= hasta
+
+        return np.sort(seleccion['posicion'][mascara]).tolist()
+
+
+    def contar_por_figura(self) -> Dict[str, int]:
+        ''' Número de registros de cada figura '''
+        import numpy as np
+
+        conteos = np.bincount(
+            np.frombuffer(bytes(self.filas), dtype=DTYPE_FILA)['figura'],
+            minlength=len(self.figuras)
+        )
+        return dict(zip(self.figuras, conteos.tolist()))
+
+
+    def columnas(self):
+        ''' Todas las filas como array estructurado de NumPy (DTYPE_FILA): posición, fecha (epoch), área y figura '''
+        import numpy as np
+
+        return np.frombuffer(bytes(self.filas), dtype=DTYPE_FILA)
+
+
+    def guardar_meta(self, ruta_meta: Path, huella: Optional[List[int]]) -> None:
+        ''' Guarda figuras, posición y huella (reemplazo atómico); las filas van aparte '''
+        temporal = ruta_meta.with_name(ruta_meta.name + '.tmp')
+        with temporal.open('w', encoding='utf-8') as f:
+            json.dump({
+                'version': 1,
+                'huella': huella,
+                'posicion': self.posicion,
+                'firma': self.firma,
+                'filas': len(self),
+                'figuras': self.figuras
+            }, f)
+        temporal.replace(ruta_meta)
+
+
+    @classmethod
+    def cargar(cls, ruta_filas: Path, ruta_meta: Path) -> Optional['IndiceHistorial']:
+        ''' Lee un índice guardado; None si no existe o no es coherente '''
+        try:
+            with ruta_meta.open('r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with ruta_filas.open('rb') as f:
+                filas = f.read(meta['filas'] * FORMATO_FILA.size)
+        except (OSError, ValueError, KeyError):
+            return None
+        if meta.get('version') != 1 or len(filas) != meta['filas'] * FORMATO_FILA.size:
+            return None
+
+        indice = cls()
+        indice.figuras = list(meta['figuras'])
+        indice._ids = {figura: i for i, figura in enumerate(indice.figuras)}
+        indice.posicion = meta['posicion']
+        indice.firma = meta.get('firma', '')
+        indice.filas = bytearray(filas)
+        return indice
@@ -0,0 +1,378 @@
+import csv
+import io
+import json
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calcu_areas import FIGURAS, MEDIDAS, calcular_medidas_lote
+from poligonos import ERROR_POLIGONO, FIGURA_POLIGONO, empaquetar, leer_vertices, medidas_poligonos
+from utils_json import guardar_registros, sello_fecha
+
+
+TAM_BLOQUE = 10000
+COLUMNAS_SALIDA = ['fila', 'id', 'figura', 'area', 'parametros', 'error']
+
+
+def columnas_salida(medidas: Sequence[str]=('area',)) -> List[str]:
+    ''' Columnas de la salida CSV: COLUMNAS_SALIDA con una columna por medida '''
+    return ['fila', 'id', 'figura', *medidas, 'parametros', 'error']
+
+
+##############################
+###### LECTURA DE FILAS ######
+##############################
+
+def leer_filas(entrada: Path, figura_por_defecto: Optional[str]=None) -> Iterator[Dict]:
+    '''
+    Lee el archivo de entrada fila a fila (CSV o JSON Lines según la extensión).
+
+    Cada fila debe indicar la figura en la columna/clave 'figura' (o se usa
+    figura_por_defecto) y sus parámetros como columnas, o en JSON Lines
+    también dentro de un objeto 'parametros'. Una columna 'id' opcional se
+    copia al resultado.
+    '''
+    with entrada.open('r', encoding='utf-8', newline='') as f:
+        if entrada.suffix.lower() == '.csv':
+            for fila in csv.DictReader(f):
+                yield _normalizar_fila(fila, figura_por_defecto)
+        else:
+            for linea in f:
+                if not linea.strip():
+                    continue
+                try:
+                    fila = json.loads(linea)
+                except json.JSONDecodeError as e:
+                    yield {'_error': f'JSON no válido: {e}'}
+                    continue
+                if not isinstance(fila, dict):
+                    yield {'_error': f'La fila debe ser un objeto JSON, no {type(fila).__name__}'}
+                    continue
+                if isinstance(fila.get('parametros'), dict):
+                    fila = {**fila['parametros'], **{k: v for k, v in fila.items() if k != 'parametros'}}
+                yield _normalizar_fila(fila, figura_por_defecto)
+
+
+def _normalizar_fila(fila: Dict, figura_por_defecto: Optional[str]) -> Dict:
+    ''' Normaliza el nombre de la figura y descarta las celdas vacías '''
+    figura = str(fila.get('figura') or figura_por_defecto or '').strip().lower().replace(' ', '_')
+    datos = {k: v for k, v in fila.items() if k is not None and v not in (None, '')}
+    datos['figura'] = figura
+    return datos
+
+
+def bloques(iterable, tam: int) -> Iterator[List]:
+    ''' Agrupa un iterable en listas de como mucho 'tam' elementos '''
+    iterador = iter(iterable)
+    while True:
+        bloque = list(islice(iterador, tam))
+        if not bloque:
+            return
+        yield bloque
+
+
+#################################
+###### CÁLCULO POR BLOQUES ######
+#################################
+
+def calcular_bloque(filas: List[Dict], medidas: Sequence[str]=('area',)) -> List[Tuple[Dict, Optional[str]]]:
+    '''
+    Calcula las medidas de un bloque de filas agrupando por figura y usando
+    calcular_medidas_lote, de modo que cada figura se valida una vez y todas
+    sus medidas se calculan de forma vectorizada.
+
+    :param medidas: Medidas de MEDIDAS a calcular (por defecto, solo el área)
+    :return: Una tupla (resultado, error) por fila, en el orden de entrada.
+        resultado tiene figura, parametros y una clave por medida (None si la
+        figura no la tiene); error es None si la fila es válida.
+    '''
+    salida: List[Tuple[Dict, Optional[str]]] = [None] * len(filas)
+    grupos: Dict[str, List[int]] = {}
+    poligonos: List[int] = []
+
+    for i, fila in enumerate(filas):
+        if '_error' in fila:
+            salida[i] = ({}, fila['_error'])
+        elif fila['figura'] == FIGURA_POLIGONO:
+            poligonos.append(i)
+        elif fila['figura'] not in FIGURAS:
+            salida[i] = ({'figura': fila['figura']}, f'Figura {fila["figura"]}, no valida')
+        else:
+            grupos.setdefault(fila['figura'], []).append(i)
+
+    for figura, posiciones in grupos.items():
+        entrada = FIGURAS[figura]
+        nombres = entrada.nombres_params
+        valores = np.full((len(nombres), len(posiciones)), np.nan)
+        errores: Dict[int, str] = {}
+
+        for j, i in enumerate(posiciones):
+            fila = filas[i]
+            for k, nombre in enumerate(nombres):
+                if nombre not in fila:
+                    errores[j] = f'Argumentos incorrectos para la figura {figura}'
+                    break
+                try:
+                    valores[k, j] = float(fila[nombre])
+                except (TypeError, ValueError):
+                    errores[j] = f'Valor no numérico para {nombre}: {fila[nombre]!r}'
+                    break
+
+        resultado = calcular_medidas_lote(figura, medidas, **dict(zip(nombres, valores)))
+        columnas = {m: resultado.medidas[m].tolist() for m in medidas}
+
+        for j, i in enumerate(posiciones):
+            parametros = {n: float(valores[k, j]) for k, n in enumerate(nombres) if not math.isnan(valores[k, j])}
+            base = {'figura': figura, 'parametros': parametros}
+            if j in errores:
+                salida[i] = (base, errores[j])
+            elif resultado.invalidos[j]:
+                salida[i] = (base, entrada.error)
+            else:
+                valores_fila = {m: columnas[m][j] for m in medidas}
+                salida[i] = ({
+                    **base, **{m: None if math.isnan(v) else v for m, v in valores_fila.items()}
+                }, None)
+
+    if poligonos:
+        _calcular_poligonos(filas, poligonos, medidas, salida)
+    return salida
+
+
+def _calcular_poligonos(
+        filas: List[Dict],
+        posiciones: List[int],
+        medidas: Sequence[str],
+        salida: List[Tuple[Dict, Optional[str]]]) -> None:
+    '''
+    Calcula las filas de polígonos arbitrarios (columna 'vertices' con
+    [[x, y], ...]) empaquetándolas para una sola llamada a medidas_poligonos.
+    Deja los resultados en 'salida'.
+    '''
+    leidas, vertices = [], []
+    for i in posiciones:
+        fila = filas[i]
+        if 'vertices' not in fila:
+            salida[i] = ({'figura': FIGURA_POLIGONO, 'parametros': {}}, f'Argumentos incorrectos para la figura {FIGURA_POLIGONO}')
+            continue
+        try:
+            vertices.append(leer_vertices(fila['vertices']))
+        except ValueError as e:
+            salida[i] = ({'figura': FIGURA_POLIGONO, 'parametros': {}}, str(e))
+            continue
+        leidas.append(i)
+
+    resultado = medidas_poligonos(*empaquetar(vertices), medidas)
+    columnas = {m: resultado.medidas[m].tolist() for m in medidas}
+    for j, i in enumerate(leidas):
+        base = {'figura': FIGURA_POLIGONO, 'parametros': {'vertices': vertices[j]}}
+        if resultado.invalidos[j]:
+            salida[i] = (base, ERROR_POLIGONO)
+        else:
+            salida[i] = ({**base, **{m: None if math.isnan(columnas[m][j]) else columnas[m][j] for m in medidas}}, None)
+
+
+class BloqueProcesado(NamedTuple):
+    ''' Resultado de un bloque listo para escribir '''
+    salida: str
+    errores: str
+    historial: List[Dict]
+    validas: int
+    fallidas: int
+
+
+def _serializar(registros: List[Dict], como_csv: bool, columnas: List[str]=COLUMNAS_SALIDA) -> str:
+    ''' Convierte registros de resultado en texto CSV (sin cabecera) o JSON Lines '''
+    if not como_csv:
+        return ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in registros)
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=columnas, extrasaction='ignore')
+    escritor.writerows(
+        {**r, 'parametros': json.dumps(r['parametros'])} if 'parametros' in r else r
+        for r in registros
+    )
+    return buffer.getvalue()
+
+
+def procesar_bloque(
+        bloque: List[Dict],
+        inicio: int,
+        salida_csv: bool=False,
+        errores_csv: Optional[bool]=None,
+        historial: bool=False,
+        medidas: Sequence[str]=('area',)) -> BloqueProcesado:
+    '''
+    Calcula un bloque y deja su salida ya serializada.
+
+    Se ejecuta en los procesos de trabajo, de modo que el proceso principal
+    solo lee la entrada y escribe texto.
+
+    :param bloque: Filas del bloque
+    :param inicio: Número de la primera fila del bloque en la entrada
+    :param salida_csv: Si la salida es CSV (si no, JSON Lines)
+    :param errores_csv: Formato del archivo de errores; None si los errores
+        van en la propia salida
+    :param historial: Si se deben preparar los registros para el historial
+        (solo con figura, area y parametros; 'area' debe estar en medidas)
+    :param medidas: Medidas a calcular para cada fila
+    '''
+    validos, fallidos, para_historial = [], [], []
+    sello = sello_fecha() if historial else None
+
+    for n, (fila, (resultado, error)) in enumerate(zip(bloque, calcular_bloque(bloque, medidas)), inicio):
+        registro = {'fila': n, **resultado}
+        if 'id' in fila:
+            registro['id'] = fila['id']
+        if error is None:
+            validos.append(registro)
+            if historial:
+                para_historial.append({
+                    **sello,
+                    'figura': resultado['figura'],
+                    'area': resultado['area'],
+                    'parametros': resultado['parametros']
+                })
+        else:
+            registro['error'] = error
+            fallidos.append(registro)
+
+    columnas = columnas_salida(medidas)
+    if errores_csv is None:
+        texto = _serializar(sorted(validos + fallidos, key=lambda r: r['fila']), salida_csv, columnas)
+        texto_errores = ''
+    else:
+        texto = _serializar(validos, salida_csv, columnas)
+        texto_errores = _serializar(fallidos, errores_csv, columnas)
+
+    return BloqueProcesado(texto, texto_errores, para_historial, len(validos), len(fallidos))
+
+
+#######################################
+###### PROCESAMIENTO EN PARALELO ######
+#######################################
+
+def procesar_en_orden(bloques_filas: Iterator[List[Dict]], procesos: int=1, **opciones) -> Iterator[BloqueProcesado]:
+    '''
+    Procesa una secuencia de bloques y los devuelve en el orden de entrada.
+
+    Con procesos > 1 los bloques se reparten entre un ProcessPoolExecutor.
+    Como mucho hay 2 * procesos bloques en vuelo, así que la memoria sigue
+    acotada aunque la entrada sea enorme y la lectura vaya por delante.
+
+    :param bloques_filas: Iterador de bloques (listas de filas)
+    :param procesos: Número de procesos; 1 calcula en el proceso actual
+    :param opciones: Argumentos de procesar_bloque
+    '''
+    inicio = 0
+    if procesos <= 1:
+        for bloque in bloques_filas:
+            yield procesar_bloque(bloque, inicio, **opciones)
+            inicio += len(bloque)
+        return
+
+    en_vuelo = deque()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        for bloque in bloques_filas:
+            en_vuelo.append(pool.submit(procesar_bloque, bloque, inicio, **opciones))
+            inicio += len(bloque)
+            if len(en_vuelo) >= 2 * procesos:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+
+
+#######################################
+###### PROCESAMIENTO DE ARCHIVOS ######
+#######################################
+
+def _es_csv(ruta: Path) -> bool:
+    ''' Formato de un archivo de entrada o salida según su extensión '''
+    return ruta.suffix.lower() == '.csv'
+
+
+def procesar_archivo(
+        entrada: Path,
+        salida: Path,
+        errores: Optional[Path]=None,
+        figura: Optional[str]=None,
+        tam_bloque: int=TAM_BLOQUE,
+        historial: bool=False,
+        procesos: int=1,
+        medidas: Sequence[str]=('area',)) -> Dict[str, int]:
+    '''
+    Procesa un archivo de piezas en streaming y escribe las áreas (y demás
+    medidas pedidas) calculadas.
+
+    Lee por bloques de tam_bloque filas, calcula cada bloque de forma
+    vectorizada y escribe sus resultados antes de leer el siguiente, así que
+    la memoria usada no depende del tamaño de la entrada.
+
+    :param entrada: CSV o JSON Lines con las piezas
+    :param salida: CSV o JSON Lines con los resultados
+    :param errores: Si se indica, las filas con error van a este archivo; si no,
+        se escriben en la salida con una clave 'error'
+    :param figura: Figura por defecto para filas sin columna 'figura'
+    :param tam_bloque: Filas por bloque
+    :param historial: Si True, los resultados válidos se guardan en el
+        historial con una escritura por bloque
+    :param procesos: Procesos para el cálculo (0 = todos los núcleos). Los
+        resultados se escriben igualmente en orden y solo desde este proceso,
+        que es el único que escribe en la salida y en el historial
+    :param medidas: Medidas de MEDIDAS a calcular, una columna por medida. Con
+        historial=True el área se calcula siempre
+    :return: Resumen con el número de filas, válidas y con error
+    :rtype: Dict[str, int]
+    '''
+    if not entrada.exists():
+        raise FileNotFoundError(f'No existe el archivo de entrada {entrada}')
+    if procesos == 0:
+        procesos = os.cpu_count() or 1
+    desconocidas = [m for m in medidas if m not in MEDIDAS]
+    if desconocidas:
+        raise ValueError(f'Medidas no validas: {", ".join(desconocidas)}. Usa: {", ".join(MEDIDAS)}')
+    if tam_bloque < 1:
+        raise ValueError(f'El tamaño de bloque debe ser al menos 1, no {tam_bloque}')
+    medidas = tuple(medidas)
+    if historial and 'area' not in medidas:
+        medidas = ('area',) + medidas
+
+    filas = bloques(leer_filas(entrada, figura), tam_bloque)
+    resumen = {'filas': 0, 'validas': 0, 'errores': 0}
+
+    with ExitStack() as pila:
+        archivos = []
+        for ruta in (salida, errores):
+            if ruta is None:
+                archivos.append(None)
+                continue
+            f = pila.enter_context(ruta.open('w', encoding='utf-8', newline=''))
+            if _es_csv(ruta):
+                csv.writer(f).writerow(columnas_salida(medidas))
+            archivos.append(f)
+        f_salida, f_errores = archivos
+
+        opciones = {
+            'salida_csv': _es_csv(salida),
+            'errores_csv': _es_csv(errores) if errores else None,
+            'historial': historial,
+            'medidas': medidas
+        }
+        for procesado in procesar_en_orden(filas, procesos, **opciones):
+            f_salida.write(procesado.salida)
+            if f_errores is not None:
+                f_errores.write(procesado.errores)
+            if procesado.historial:
+                guardar_registros(procesado.historial)
+
+            resumen['filas'] += procesado.validas + procesado.fallidas
+            resumen['validas'] += procesado.validas
+            resumen['errores'] += procesado.fallidas
+
+    return resumen
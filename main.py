@@ -1,4 +1,146 @@
-from menu import menu
+import argparse
+import sys
+from pathlib import Path
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    ''' Define los subcomandos de la línea de comandos '''
+    parser = argparse.ArgumentParser(description='Calculadora de áreas')
+    subparsers = parser.add_subparsers(dest='comando')
+
+    migrar = subparsers.add_parser('migrar', help='Convierte el historial a otro formato (.json, .jsonl, .db)')
+    migrar.add_argument('--origen', type=Path, default=Path('areas.json'))
+    migrar.add_argument('--destino', type=Path, default=Path('areas.jsonl'))
+    migrar.add_argument('--sobrescribir', action='store_true')
+
+    batch = subparsers.add_parser('batch', help='Calcula áreas desde un CSV/JSONL sin interacción')
+    batch.add_argument('--input', dest='entrada', type=Path, required=True, help='Archivo .csv o .jsonl de entrada')
+    batch.add_argument('--output', dest='salida', type=Path, required=True, help='Archivo .csv o .jsonl de salida')
+    batch.add_argument('--errores', type=Path, default=None, help='Archivo aparte para las filas con error')
+    batch.add_argument('--figura', default=None, help='Figura para las filas sin columna figura')
+    batch.add_argument('--bloque', type=int, default=10000, help='Filas por bloque')
+    batch.add_argument('--historial', action='store_true', help='Guardar los resultados en el historial')
+    batch.add_argument('--procesos', type=int, default=1, help='Procesos para el cálculo (0 = todos los núcleos)')
+    batch.add_argument('--medidas', nargs='+', default=['area'],
+                       help='Medidas a calcular: area, perimetro, volumen, superficie_lateral, superficie_total')
+
+    servir = subparsers.add_parser('servir', help='Servidor HTTP/JSON local para calcular áreas')
+    servir.add_argument('--host', default='127.0.0.1')
+    servir.add_argument('--puerto', type=int, default=8080)
+
+    archivar = subparsers.add_parser('archivar', help='Rota el historial a un segmento comprimido y compacta los antiguos')
+    archivar.add_argument('--historial', type=Path, default=None, help='Historial .json o .jsonl (por defecto, el configurado)')
+    archivar.add_argument('--max-mb', type=float, default=None, help='Rotar solo si el historial activo ocupa al menos esto')
+    archivar.add_argument('--diario', action='store_true', help='Rotar solo si el registro más antiguo es de otro día')
+    archivar.add_argument('--compactar-dias', type=float, default=None, help='Compactar los segmentos con registros de hace más de N días')
+
+    migrar_epoch = subparsers.add_parser('migrar-epoch', help='Añade la fecha en segundos (epoch) a los registros antiguos')
+    migrar_epoch.add_argument('--historial', type=Path, default=None, help='Historial .json, .jsonl o .db (por defecto, el configurado)')
+
+    periodos = subparsers.add_parser('periodos', help='Registros y áreas por hora, día, semana o mes (JSON Lines)')
+    periodos.add_argument('--periodo', choices=['hora', 'dia', 'semana', 'mes'], default='dia')
+    periodos.add_argument('--figura', default=None)
+    periodos.add_argument('--desde', default=None, help='dd/mm/aaaa [HH:MM:SS] o aaaa-mm-dd')
+    periodos.add_argument('--hasta', default=None, help='dd/mm/aaaa [HH:MM:SS] o aaaa-mm-dd')
+    periodos.add_argument('--por-figura', action='store_true', help='Una fila por periodo y figura')
+    periodos.add_argument('--historial', type=Path, default=None, help='Historial (por defecto, el configurado)')
+
+    return parser
+
+
+def main(argv=None) -> int:
+    ''' Punto de entrada: sin subcomando abre el menú interactivo '''
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+    if args.comando == 'batch' and args.bloque < 1:
+        parser.error('--bloque debe ser al menos 1')
+
+    if args.comando == 'migrar':
+        from utils_json import migrar_json_a_jsonl, migrar_historial, es_jsonl
+        try:
+            if es_jsonl(args.destino) and args.origen.suffix == '.json':
+                total = migrar_json_a_jsonl(args.origen, args.destino, sobrescribir=args.sobrescribir)
+            else:
+                total = migrar_historial(args.origen, args.destino)
+        except (FileNotFoundError, FileExistsError) as e:
+            print(f'Error: {e}', file=sys.stderr)
+            return 1
+        print(f'{total} registros migrados a {args.destino}')
+        return 0
+
+    if args.comando == 'batch':
+        from lote import procesar_archivo
+        try:
+            resumen = procesar_archivo(
+                args.entrada, args.salida,
+                errores=args.errores,
+                figura=args.figura,
+                tam_bloque=args.bloque,
+                historial=args.historial,
+                procesos=args.procesos,
+                medidas=args.medidas
+            )
+        except (FileNotFoundError, ValueError) as e:
+            print(f'Error: {e}', file=sys.stderr)
+            return 1
+        print(f'{resumen["filas"]} filas: {resumen["validas"]} válidas, {resumen["errores"]} con error')
+        return 0 if not resumen['errores'] else 2
+
+    if args.comando == 'servir':
+        import asyncio
+        from servicio_async import servir
+        print(f'Sirviendo en http://{args.host}:{args.puerto} (Ctrl+C para terminar)')
+        try:
+            asyncio.run(servir(args.host, args.puerto))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.comando == 'archivar':
+        from utils_json import rotar_historial, compactar_historial
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        try:
+            entrada = rotar_historial(args.historial, max_bytes=max_bytes, diario=args.diario)
+        except ValueError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            return 1
+        if entrada is not None:
+            print(f'{entrada["registros"]} registros archivados en {entrada["archivo"]}')
+        else:
+            print('No hacía falta rotar el historial')
+        if args.compactar_dias is not None:
+            print(f'{compactar_historial(args.compactar_dias, args.historial)} segmentos compactados')
+        return 0
+
+    if args.comando == 'migrar-epoch':
+        from utils_json import migrar_epoch
+        try:
+            total = migrar_epoch(args.historial)
+        except FileNotFoundError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            return 1
+        print(f'{total} registros actualizados con la fecha epoch')
+        return 0
+
+    if args.comando == 'periodos':
+        import json
+        from utils_json import agregar_por_periodo
+        try:
+            filas = agregar_por_periodo(
+                args.periodo, figura=args.figura, desde=args.desde, hasta=args.hasta,
+                por_figura=args.por_figura, ruta=args.historial
+            )
+        except ValueError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            return 1
+        for fila in filas:
+            print(json.dumps(fila, ensure_ascii=False))
+        return 0
+
+    from menu import menu
+    menu()
+    return 0
+
 
 if __name__ == '__main__':
-    menu()
\ No newline at end of file
+    sys.exit(main())
@@ -2,9 +2,16 @@ from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.prompt import Prompt
+from typing import Optional
 
-from calcu_areas import calcular_area
-from utils_json import mostrar_json, mostrar_ultimos_calculos, limpiar_historial, buscar_por_figura
+import metricas
+from calcu_areas import calcular_area, figuras_config
+from utils_json import contar_registros, leer_pagina
+from vista_historial import (
+    limpiar_historial, buscar_por_figura, mostrar_registros,
+    mostrar_estadisticas_resumidas, mostrar_ultimos_calculos,
+    info_cache, mostrar_metricas
+)
 
 console = Console()
 
@@ -13,87 +20,21 @@ console = Console()
 #### CONFIGURACIÓN DE FIGURAS ####
 ##################################
 
-FIGURAS_CONFIG = {
-    '1': {
-        'nombre': 'rectangulo',
-        'titulo': 'Rectángulo',
-        'params': [
-            ('base', 'Introduce la base', 'float'),
-            ('altura', 'Introduce la altura', 'float')
-        ]
-    },
-    '2': {
-        'nombre': 'triangulo',
-        'titulo': 'Triángulo',
-        'params': [
-            ('base', 'Introduce la base', 'float'),
-            ('altura', 'Introduce la altura', 'float')
-        ]
-    },
-    '3': {
-        'nombre': 'circulo',
-        'titulo': 'Circulo',
-        'params': [
-            ('radio', 'Introduce el radio', 'float')
-        ]
-    },
-    '4': {
-        'nombre': 'trapecio',
-        'titulo': 'Trapecio',
-        'params': [
-            ('base_mayor', 'Introduce la base mayor', 'float'),
-            ('base_menor', 'Introduce la base menor', 'float'),
-            ('altura', 'Introduce la altura', 'float')
-        ]
-    },
-    '5': {
-        'nombre': 'cuadrado',
-        'titulo': 'Cuadrado',
-        'params': [
-            ('lado', 'Introduce el lado', 'float')
-        ]
-    },
-    '6': {
-        'nombre': 'poligono_regular',
-        'titulo': 'Poligono regular',
-        'params': [
-            ('num_lados', 'Introduce el número de lados', 'int'),
-            ('lado', 'Introduce el lado', 'float'),
-            ('apotema', 'Introduce el apotema', 'float')
-        ]
-    },
-    '7': {
-        'nombre': 'elipse',
-        'titulo': 'Elipse',
-        'params': [
-            ('semi_eje_hor', 'Introduce el semieje horizontal', 'float'),
-            ('semi_eje_ver', 'Introduce el semieje vertical', 'float')
-        ]
-    },
-    '8': {
-        'nombre': 'corona_circular',
-        'titulo': 'Corona circular',
-        'params': [
-            ('radio_mayor', 'Introduce el radio mayor', 'float'),
-            ('radio_menor', 'Introduce el radio menor', 'float')
-        ]
-    },
-    '9': {
-        'nombre': 'cubo',
-        'titulo': 'Cubo',
-        'params': [
-            ('lado', 'Introduce el lado', 'float')
-        ]
-    },
-    '10': {
-        'nombre': 'cono',
-        'titulo': 'Cono',
-        'params': [
-            ('radio', 'Introduce el radio', 'float'),
-            ('generatriz', 'Introduce la generatriz', 'float')
-        ]
-    }
-}
+# Generada desde el registro de figuras de calcu_areas (FIGURAS)
+FIGURAS_CONFIG = figuras_config()
+
+# Opciones adicionales, numeradas a continuación de las figuras registradas
+_NUM_FIGURAS = len(FIGURAS_CONFIG)
+OPCION_MOSTRAR_JSON = str(_NUM_FIGURAS + 1)
+OPCION_BUSCAR = str(_NUM_FIGURAS + 2)
+OPCION_ULTIMOS = str(_NUM_FIGURAS + 3)
+OPCION_CACHE = str(_NUM_FIGURAS + 4)
+OPCION_METRICAS = str(_NUM_FIGURAS + 5)
+OPCION_LIMPIAR = str(_NUM_FIGURAS + 6)
+OPCION_SALIR = str(_NUM_FIGURAS + 7)
+
+# Registros por página al mostrar el historial
+TAM_PAGINA = 20
 
 
 ##############################
@@ -124,6 +65,16 @@ def pedir_int(mensaje: str) -> int:
             console.print('[red]Ingresa un número entero válido mayor que cero.')
 
 
+def pedir_vertices(mensaje: str) -> list:
+    ''' Solicita los vértices de un polígono como JSON [[x, y], ...] '''
+    from poligonos import leer_vertices
+    while True:
+        try:
+            return leer_vertices(Prompt.ask(mensaje))
+        except ValueError:
+            console.print('[red]Ingresa al menos 3 vértices como pares de números, por ejemplo [[0, 0], [4, 0], [4, 3]].')
+
+
 def procesar_figura(config: dict) -> None:
     '''
         Procesa el cálculo del área para cualquier figura según su configuración.
@@ -140,6 +91,8 @@ def procesar_figura(config: dict) -> None:
                 parametros[param_name] = pedir_int(mensaje)
             elif tipo == 'float':
                 parametros[param_name] = pedir_float(mensaje)
+            elif tipo == 'vertices':
+                parametros[param_name] = pedir_vertices(mensaje)
         
         # Calcular área
         area = calcular_area(config['nombre'], **parametros)
@@ -183,11 +136,13 @@ def mostrar_menu() -> None:
         table.add_row(opcion, config['titulo'])
     
     # Agregar opciones adicionales
-    table.add_row('11', 'Mostrar JSON')
-    table.add_row('12', 'Buscar historial por figura')
-    table.add_row('13', 'Últimos cálculos')
-    table.add_row('14', 'Limpiar historial')
-    table.add_row('15', 'Salir')
+    table.add_row(OPCION_MOSTRAR_JSON, 'Mostrar JSON')
+    table.add_row(OPCION_BUSCAR, 'Buscar historial por figura')
+    table.add_row(OPCION_ULTIMOS, 'Últimos cálculos')
+    table.add_row(OPCION_CACHE, 'Estado de la caché')
+    table.add_row(OPCION_METRICAS, 'Métricas en vivo')
+    table.add_row(OPCION_LIMPIAR, 'Limpiar historial')
+    table.add_row(OPCION_SALIR, 'Salir')
 
     console.print(table)
 
@@ -223,6 +178,62 @@ def buscar_historial() -> None:
 
 
 
+def navegar_historial(ultimos: Optional[int]=None, titulo: str='📊 HISTORIAL DE CÁLCULOS') -> None:
+    '''
+    Muestra el historial página a página. Solo se lee del historial la
+    página visible, así que la memoria no crece con su tamaño.
+
+    Args:
+        ultimos: Si se indica, solo se recorren los últimos n registros
+        titulo: Título de la tabla
+    '''
+    total = contar_registros()
+    if not total:
+        console.print(Panel(
+            '[yellow]📂 No hay datos guardados aún.[/yellow]',
+            title='Historial vacío',
+            border_style='yellow'
+        ))
+        return
+
+    primero = max(0, total - ultimos) if ultimos else 0
+    paginas = -(-(total - primero) // TAM_PAGINA)
+    pagina = 0
+
+    while True:
+        inicio = primero + pagina * TAM_PAGINA
+        registros = leer_pagina(inicio, min(TAM_PAGINA, total - inicio))
+        mostrar_registros(
+            registros,
+            inicio + 1,
+            f'{titulo} - página {pagina + 1}/{paginas} ({total - primero} de {total} registros)'
+        )
+        if paginas == 1:
+            return
+
+        accion = Prompt.ask(
+            '[dim][s]iguiente, [a]nterior, [p]rimera, [u]ltima, nº de página o [q] salir[/dim]',
+            default='s' if pagina + 1 < paginas else 'q'
+        ).strip().lower()
+
+        if accion == 'q':
+            return
+        elif accion == 's':
+            pagina = min(pagina + 1, paginas - 1)
+        elif accion == 'a':
+            pagina = max(pagina - 1, 0)
+        elif accion == 'p':
+            pagina = 0
+        elif accion == 'u':
+            pagina = paginas - 1
+        elif accion.isdigit() and 1 <= int(accion) <= paginas:
+            pagina = int(accion) - 1
+        else:
+            console.print('[red]Opción no válida.')
+            continue
+        console.clear()
+
+
 ########################
 #### MENÚ PRINCIPAL ####
 ########################
@@ -235,38 +246,58 @@ def menu() -> None:
 
             opcion = Prompt.ask(
                 '\n[bold cyan]Elige una opción[/bold cyan]',
-                choices=[str(i) for i in range(1, 16)]
+                choices=[str(i) for i in range(1, int(OPCION_SALIR) + 1)]
             )
 
-            # Procesar figuras geometricas (opciones 1-10)
+            # Procesar figuras geometricas (opciones 1-N)
             if opcion in FIGURAS_CONFIG:
                 procesar_figura(FIGURAS_CONFIG[opcion])
 
-            # Mostrar JSON (opción 11)
-            elif opcion == '11':
+            # Mostrar JSON
+            elif opcion == OPCION_MOSTRAR_JSON:
                 console.print('\n[bold cyan]=== HISTORIAL DE CÁLCULOS ===[/bold cyan]\n')
-                mostrar_json()
+                navegar_historial()
+                mostrar_estadisticas_resumidas()
             
-            # Buscar historial (opción 12)
-            elif opcion == '12':
+            # Buscar historial
+            elif opcion == OPCION_BUSCAR:
                 buscar_historial()
 
-            # Mostrar últimos n cálculos (opción 13)
-            elif opcion == '13':
+            # Mostrar últimos n cálculos
+            elif opcion == OPCION_ULTIMOS:
                 while True:
                     try:
                         n = int(Prompt.ask(
                             '\n[bold cyan]¿Cuantos calculos deseas buscar?[/bold cyan]'
                         ))
-                        mostrar_ultimos_calculos(n)
+                        if n <= TAM_PAGINA:
+                            mostrar_ultimos_calculos(n)
+                        else:
+                            navegar_historial(ultimos=n, titulo='🕒 ÚLTIMOS CÁLCULOS')
                         break
                     except ValueError:
                             console.print(Panel(
                                 '[bold red]⚠️ Error: Debes introducir un número entero válido.[/bold red]'
                             ))
+
+            # Estado de la caché
+            elif opcion == OPCION_CACHE:
+                info_cache()
+
+            # Métricas (latencias, contadores y aciertos de caché)
+            elif opcion == OPCION_METRICAS:
+                if not metricas.activas():
+                    activar = Prompt.ask(
+                        '[bold yellow]Las métricas están desactivadas. ¿Activarlas? (s/n)[/bold yellow]',
+                        choices=['s','n','S','N'],
+                        default='s'
+                    )
+                    if activar.lower() == 's':
+                        metricas.activar_metricas()
+                mostrar_metricas()
             
-            # Limpiar historial (opción 14)
-            elif opcion == '14':
+            # Limpiar historial
+            elif opcion == OPCION_LIMPIAR:
                 confirmacion = Prompt.ask(
                     '[bold yellow]⚠️ ¿Estás seguro de que deseas limpiar todo el historial? (s/n)[/bold yellow]',
                     choices=['s','n','S','N'],
@@ -275,8 +306,8 @@ def menu() -> None:
                 if confirmacion.lower() == 's':
                     limpiar_historial()
             
-            # Salir (opción 15)
-            elif opcion == '15':
+            # Salir
+            elif opcion == OPCION_SALIR:
                 console.print(Panel(
                     '[bold green]✋ Hasta pronto[/bold green]',
                     border_style='green'
@@ -284,7 +315,7 @@ def menu() -> None:
                 break
 
             # Pausa antes de mostrar el menú nuevamente
-            if opcion != '15':
+            if opcion != OPCION_SALIR:
                 console.print('\n[dim]Presiona ENTER para continuar...[/dim]')
                 input()
                 console.clear()
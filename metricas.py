@@ -0,0 +1,267 @@
+'''
+Métricas internas: contadores e histogramas de latencia por figura y por
+operación de E/S, con volcado en texto de Prometheus o en JSON.
+
+Desactivadas por defecto. Se activan con CALCU_AREAS_METRICAS=1 o con
+activar_metricas(); con CALCU_AREAS_METRICAS_VOLCADO=<archivo> se vuelcan
+al terminar el programa (JSON si la extensión es .json, Prometheus si no).
+Desactivadas, cada punto instrumentado solo comprueba una bandera.
+'''
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Límites superiores (segundos) de las cubetas de los histogramas
+CUBETAS = (
+    0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025,
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+PREFIJO = 'calcu_areas_'
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+
+class Histograma:
+    ''' Histograma de latencias con cubetas fijas (como los de Prometheus) '''
+
+    def __init__(self):
+        self.cuentas = [0] * (len(CUBETAS) + 1)   # la última es +Inf
+        self.total = 0
+        self.suma = 0.0
+
+
+    def observar(self, segundos: float) -> None:
+        self.cuentas[bisect.bisect_left(CUBETAS, segundos)] += 1
+        self.total += 1
+        self.suma += segundos
+
+
+    def cuantil(self, q: float) -> Optional[float]:
+        ''' Estimación del cuantil q: límite superior de la cubeta donde cae '''
+        if not self.total:
+            return None
+        objetivo = q * self.total
+        acumulado = 0
+        for limite, cuenta in zip(CUBETAS, self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return limite
+        return float('inf')
+
+
+    def resumen(self) -> Dict:
+        return {
+            'cuenta': self.total,
+            'suma_s': self.suma,
+            'media_s': self.suma / self.total if self.total else 0.0,
+            'p50_s': self.cuantil(0.5),
+            'p95_s': self.cuantil(0.95),
+            'p99_s': self.cuantil(0.99)
+        }
+
+
+class RegistroMetricas:
+    '''
+    Contadores e histogramas identificados por nombre y etiquetas, más
+    indicadores calculados al volcar (funciones que retornan {nombre: valor}).
+    '''
+
+    def __init__(self):
+        self.contadores: Dict[Tuple[str, Etiquetas], float] = {}
+        self.histogramas: Dict[Tuple[str, Etiquetas], Histograma] = {}
+        self.indicadores: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+
+    def incrementar(self, nombre: str, valor: float=1, **etiquetas: str) -> None:
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+
+    def observar(self, nombre: str, segundos: float, **etiquetas: str) -> None:
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            histograma = self.histogramas.get(clave)
+            if histograma is None:
+                histograma = self.histogramas[clave] = Histograma()
+            histograma.observar(segundos)
+
+
+    def reiniciar(self) -> None:
+        ''' Pone a cero contadores e histogramas (los indicadores se mantienen) '''
+        with self._lock:
+            self.contadores.clear()
+            self.histogramas.clear()
+
+
+    def _leer_indicadores(self) -> Dict[str, float]:
+        valores = {}
+        for funcion in list(self.indicadores.values()):
+            valores.update(funcion())
+        return valores
+
+
+    def instantanea(self) -> Dict:
+        ''' Copia de todas las métricas como diccionario serializable en JSON '''
+        with self._lock:
+            contadores = [
+                {'nombre': nombre, 'etiquetas': dict(etiquetas), 'valor': valor}
+                for (nombre, etiquetas), valor in sorted(self.contadores.items())
+            ]
+            histogramas = [
+                {'nombre': nombre, 'etiquetas': dict(etiquetas), **histograma.resumen()}
+                for (nombre, etiquetas), histograma in sorted(self.histogramas.items())
+            ]
+        return {
+            'activas': activas(),
+            'contadores': contadores,
+            'histogramas': histogramas,
+            'indicadores': self._leer_indicadores()
+        }
+
+
+    def a_prometheus(self) -> str:
+        ''' Formato de exposición de texto de Prometheus '''
+        def escapar(valor) -> str:
+            # El formato de texto solo admite \\, \" y \n escapados dentro de las comillas
+            return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def etiquetas_texto(etiquetas, extra=()) -> str:
+            pares = list(etiquetas) + list(extra)
+            if not pares:
+                return ''
+            return '{' + ','.join(f'{k}="{escapar(v)}"' for k, v in pares) + '}'
+
+        lineas: List[str] = []
+        with self._lock:
+            vistos = set()
+            for (nombre, etiquetas), valor in sorted(self.contadores.items()):
+                if nombre not in vistos:
+                    lineas.append(f'# TYPE {PREFIJO}{nombre} counter')
+                    vistos.add(nombre)
+                lineas.append(f'{PREFIJO}{nombre}{etiquetas_texto(etiquetas)} {valor}')
+
+            for (nombre, etiquetas), histograma in sorted(self.histogramas.items()):
+                if nombre not in vistos:
+                    lineas.append(f'# TYPE {PREFIJO}{nombre} histogram')
+                    vistos.add(nombre)
+                acumulado = 0
+                for limite, cuenta in zip(CUBETAS + ('+Inf',), histograma.cuentas):
+                    acumulado += cuenta
+                    lineas.append(f'{PREFIJO}{nombre}_bucket{etiquetas_texto(etiquetas, [("le", limite)])} {acumulado}')
+                lineas.append(f'{PREFIJO}{nombre}_sum{etiquetas_texto(etiquetas)} {histograma.suma}')
+                lineas.append(f'{PREFIJO}{nombre}_count{etiquetas_texto(etiquetas)} {histograma.total}')
+
+        for nombre, valor in sorted(self._leer_indicadores().items()):
+            lineas.append(f'# TYPE {PREFIJO}{nombre} gauge')
+            lineas.append(f'{PREFIJO}{nombre} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+
+#############################
+###### REGISTRO GLOBAL ######
+#############################
+
+_registro = RegistroMetricas()
+_activas = os.environ.get('CALCU_AREAS_METRICAS') == '1'
+
+
+def activas() -> bool:
+    ''' Si se están recogiendo métricas '''
+    return _activas
+
+
+def activar_metricas() -> RegistroMetricas:
+    ''' Empieza a recoger métricas '''
+    global _activas
+    _activas = True
+    return _registro
+
+
+def desactivar_metricas() -> None:
+    ''' Deja de recoger métricas (lo recogido se conserva) '''
+    global _activas
+    _activas = False
+
+
+def registro_metricas() -> RegistroMetricas:
+    ''' Registro global de métricas '''
+    return _registro
+
+
+def incrementar(nombre: str, valor: float=1, **etiquetas: str) -> None:
+    ''' Suma al contador si las métricas están activas '''
+    if _activas:
+        _registro.incrementar(nombre, valor, **etiquetas)
+
+
+def observar(nombre: str, segundos: float, **etiquetas: str) -> None:
+    ''' Añade una duración al histograma si las métricas están activas '''
+    if _activas:
+        _registro.observar(nombre, segundos, **etiquetas)
+
+
+def registrar_indicador(nombre: str, funcion: Callable[[], Dict[str, float]]) -> None:
+    ''' Añade una función que aporta indicadores al volcado (p. ej. aciertos de un caché) '''
+    _registro.indicadores[nombre] = funcion
+
+
+@contextmanager
+def medir(nombre: str, **etiquetas: str):
+    ''' Mide la duración del bloque en el histograma 'nombre' (si están activas) '''
+    if not _activas:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registro.observar(nombre, time.perf_counter() - inicio, **etiquetas)
+
+
+def cronometrado(nombre: str, **etiquetas: str) -> Callable:
+    ''' Decorador: mide cada llamada en el histograma 'nombre' (si están activas) '''
+    def decorador(funcion: Callable) -> Callable:
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activas:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                _registro.observar(nombre, time.perf_counter() - inicio, **etiquetas)
+        return envoltura
+    return decorador
+
+
+def volcar_metricas(formato: str='prometheus', ruta: Optional[str]=None) -> str:
+    '''
+    Vuelca las métricas en texto de Prometheus ('prometheus') o JSON ('json').
+
+    :param ruta: Si se indica, además se escribe en ese archivo
+    :return: El texto volcado
+    '''
+    if formato == 'json':
+        texto = json.dumps(_registro.instantanea(), indent=4, ensure_ascii=False)
+    elif formato == 'prometheus':
+        texto = _registro.a_prometheus()
+    else:
+        raise ValueError(f'Formato {formato} no válido. Usa: prometheus, json')
+    if ruta is not None:
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    return texto
+
+
+if os.environ.get('CALCU_AREAS_METRICAS_VOLCADO'):
+    _destino = os.environ['CALCU_AREAS_METRICAS_VOLCADO']
+    atexit.register(volcar_metricas, 'json' if _destino.endswith('.json') else 'prometheus', _destino)
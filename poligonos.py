@@ -0,0 +1,189 @@
+import json
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calcu_areas import MEDIDAS, ResultadoLote, ResultadoMedidas
+from utils_json import registrar_resultado
+
+
+# Nombre con el que se guardan en el historial y se reconocen en el modo batch
+FIGURA_POLIGONO = 'poligono'
+ERROR_POLIGONO = 'Un polígono necesita al menos 3 vértices con coordenadas finitas y área mayor que cero.'
+
+# Medidas que tienen los polígonos (las demás de MEDIDAS se devuelven como NaN)
+MEDIDAS_POLIGONO = ('area', 'perimetro')
+
+
+#################################
+###### FORMATO EMPAQUETADO ######
+#################################
+
+# Muchos polígonos de distinto número de vértices van en dos arrays:
+#   coordenadas:     (V, 2) con los vértices de todos los polígonos seguidos
+#                    (o plano [x0, y0, x1, y1, ...])
+#   desplazamientos: (P + 1,) con el índice del primer vértice de cada
+#                    polígono y, al final, V
+# El polígono i son los vértices desplazamientos[i]:desplazamientos[i + 1].
+
+def empaquetar(poligonos: Iterable[Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Empaqueta una secuencia de polígonos (cada uno, una secuencia de (x, y)).
+
+    :return: (coordenadas, desplazamientos)
+    '''
+    partes = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in poligonos]
+    desplazamientos = np.zeros(len(partes) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in partes], out=desplazamientos[1:])
+    coordenadas = np.concatenate(partes) if partes else np.empty((0, 2))
+    return coordenadas, desplazamientos
+
+
+def _comprobar(coordenadas: Any, desplazamientos: Any) -> Tuple[np.ndarray, np.ndarray]:
+    ''' Convierte y valida el formato empaquetado (ValueError si no es coherente) '''
+    coordenadas = np.asarray(coordenadas, dtype=np.float64)
+    if coordenadas.ndim == 1:
+        if len(coordenadas) % 2:
+            raise ValueError('Las coordenadas planas deben ser pares x, y')
+        coordenadas = coordenadas.reshape(-1, 2)
+    if coordenadas.ndim != 2 or coordenadas.shape[1] != 2:
+        raise ValueError(f'Las coordenadas deben tener forma (V, 2), no {coordenadas.shape}')
+
+    desplazamientos = np.asarray(desplazamientos, dtype=np.int64)
+    if desplazamientos.ndim != 1 or len(desplazamientos) < 1:
+        raise ValueError('Los desplazamientos deben ser un array con al menos un elemento')
+    if desplazamientos[0] != 0 or desplazamientos[-1] != len(coordenadas):
+        raise ValueError(f'Los desplazamientos deben empezar en 0 y terminar en {len(coordenadas)}')
+    if np.any(np.diff(desplazamientos) < 0):
+        raise ValueError('Los desplazamientos deben ser crecientes')
+    return coordenadas, desplazamientos
+
+
+#########################################
+###### FÓRMULA DEL LAZO (SHOELACE) ######
+#########################################
+
+def _lazo(coordenadas: np.ndarray, desplazamientos: np.ndarray, con_perimetro: bool=True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Área con signo (positiva en sentido antihorario), perímetro (ceros con
+    con_perimetro=False) y máscara de polígonos inválidos, en una pasada
+    sobre todos los vértices.
+
+    Cada vértice se toma relativo al primero de su polígono: con coordenadas
+    grandes y miles de vértices, el producto cruzado pierde mucha menos
+    precisión que con las coordenadas absolutas.
+    '''
+    num_vertices = np.diff(desplazamientos)
+    areas = np.zeros(len(num_vertices))
+    perimetros = np.zeros(len(num_vertices))
+    no_finitos = np.zeros(len(num_vertices), dtype=bool)
+
+    # Solo los polígonos con vértices (reduceat no admite tramos vacíos)
+    con_vertices = num_vertices > 0
+    inicios = desplazamientos[:-1][con_vertices]
+    if len(inicios):
+        relativas = coordenadas - np.repeat(coordenadas[inicios], num_vertices[con_vertices], axis=0)
+        x = np.ascontiguousarray(relativas[:, 0])
+        y = np.ascontiguousarray(relativas[:, 1])
+
+        # Siguiente vértice de cada uno; el último de cada polígono cierra con el primero
+        ultimos = desplazamientos[1:][con_vertices] - 1
+        xs, ys = np.empty_like(x), np.empty_like(y)
+        xs[:-1], ys[:-1] = x[1:], y[1:]
+        xs[ultimos], ys[ultimos] = x[inicios], y[inicios]
+
+        with np.errstate(invalid='ignore', over='ignore'):
+            areas[con_vertices] = np.add.reduceat(x * ys - xs * y, inicios) / 2
+            if con_perimetro:
+                perimetros[con_vertices] = np.add.reduceat(np.hypot(xs - x, ys - y), inicios)
+        no_finitos[con_vertices] = np.logical_or.reduceat(~np.isfinite(coordenadas).all(axis=1), inicios)
+
+    invalidos = (num_vertices < 3) | no_finitos | ~(np.abs(areas) > 0)
+    return areas, perimetros, invalidos
+
+
+def medidas_poligonos(coordenadas: Any, desplazamientos: Any, medidas: Optional[Sequence[str]]=None) -> ResultadoMedidas:
+    '''
+    Área y perímetro de muchos polígonos arbitrarios en formato empaquetado
+    (ver empaquetar), vectorizado sobre todos los vértices a la vez.
+
+    Los polígonos pueden ser cóncavos y estar en cualquier sentido; no deben
+    cortarse a sí mismos (con autointersecciones el área se compensa).
+
+    :param coordenadas: (V, 2) o plano [x0, y0, x1, y1, ...]
+    :param desplazamientos: (P + 1,) inicio de cada polígono y V al final
+    :param medidas: Medidas de MEDIDAS a calcular; por defecto, área y perímetro
+    :return: Un array por medida redondeado a 2 decimales (NaN en los
+        polígonos inválidos y en las medidas que no tienen) y la máscara de inválidos
+    '''
+    medidas = tuple(medidas) if medidas is not None else MEDIDAS_POLIGONO
+    desconocidas = [m for m in medidas if m not in MEDIDAS]
+    if desconocidas:
+        raise ValueError(f'Medidas no validas: {", ".join(desconocidas)}. Usa: {", ".join(MEDIDAS)}')
+
+    areas, perimetros, invalidos = _lazo(*_comprobar(coordenadas, desplazamientos), 'perimetro' in medidas)
+    calculadas = {'area': np.abs(areas), 'perimetro': perimetros}
+
+    resultado = {}
+    for medida in medidas:
+        if medida not in calculadas:
+            resultado[medida] = np.full(invalidos.shape, np.nan)
+            continue
+        columna = np.round(calculadas[medida], 2)
+        columna[invalidos] = np.nan
+        resultado[medida] = columna
+    return ResultadoMedidas(medidas=resultado, invalidos=invalidos)
+
+
+def areas_poligonos(coordenadas: Any, desplazamientos: Any) -> ResultadoLote:
+    ''' Como medidas_poligonos, solo el área y con el mismo resultado que calcular_areas_lote '''
+    resultado = medidas_poligonos(coordenadas, desplazamientos, ('area',))
+    return ResultadoLote(areas=resultado.medidas['area'], invalidos=resultado.invalidos)
+
+
+##############################
+###### UN SOLO POLÍGONO ######
+##############################
+
+def area_poligono(vertices: Sequence) -> float:
+    '''
+    Área de un polígono dado por sus vértices [(x, y), ...], redondeada a 2 decimales.
+
+    :raises ValueError: Si tiene menos de 3 vértices, alguno no es finito o el área es cero
+    '''
+    resultado = areas_poligonos(*empaquetar([vertices]))
+    if resultado.invalidos[0]:
+        raise ValueError(ERROR_POLIGONO)
+    return float(resultado.areas[0])
+
+
+def calcular_area_poligono(vertices: Sequence) -> float:
+    '''
+    Igual que area_poligono pero guardando el resultado en el historial,
+    como calcular_area, con figura 'poligono' y los vértices como parámetro.
+    '''
+    area = area_poligono(vertices)
+    registrar_resultado(
+        figura=FIGURA_POLIGONO,
+        area=area,
+        parametros={'vertices': np.asarray(vertices, dtype=np.float64).reshape(-1, 2).tolist()}
+    )
+    return area
+
+
+def leer_vertices(valor: Any) -> List[List[float]]:
+    '''
+    Vértices de una fila del modo batch: lista [[x, y], ...] en JSON Lines o
+    el mismo JSON como texto en una celda CSV.
+
+    :raises ValueError: Si no es una lista de pares de números
+    '''
+    if isinstance(valor, str):
+        try:
+            valor = json.loads(valor)
+        except json.JSONDecodeError as e:
+            raise ValueError(f'Vértices no válidos: {e}') from None
+    try:
+        return np.asarray(valor, dtype=np.float64).reshape(-1, 2).tolist()
+    except (TypeError, ValueError):
+        raise ValueError(f'Vértices no válidos: {str(valor)[:50]!r}') from None
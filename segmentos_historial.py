@@ -0,0 +1,244 @@
+import json
+import math
+import os
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from estadisticas import EstadisticasIncrementales
+from historial_columnar import epoch_a_fecha, epoch_registro
+
+
+# Los segmentos archivados se guardan siempre como JSON Lines comprimido,
+# sea cual sea el formato del historial activo
+EXTENSION_SEGMENTO = '.jsonl.gz'
+
+
+####################################
+###### RESUMEN DE UN SEGMENTO ######
+####################################
+
+class ResumenSegmento:
+    '''
+    Acumula, mientras se archiva un segmento, lo necesario para no tener
+    que volver a leerlo: estadísticas completas, rango de fechas y de áreas,
+    figuras presentes y un resumen por figura y día (registros, suma,
+    mínimo y máximo del área).
+    '''
+
+    def __init__(self):
+        self.registros = 0
+        self.estadisticas = EstadisticasIncrementales()
+        self.desde = math.inf
+        self.hasta = -math.inf
+        self.area_min = math.inf
+        self.area_max = -math.inf
+        self.diario: Dict[tuple, List] = {}
+        self._ultima_fecha = None
+        self._ultimo_epoch = math.nan
+        self._ultimo_dia = 'N/D'
+
+
+    def agregar(self, dato: Dict) -> None:
+        ''' Incorpora un registro del segmento '''
+        self.registros += 1
+        self.estadisticas.agregar(dato)
+
+        marca = dato.get('epoch', dato.get('fecha'))    # la fecha solo en registros sin epoch
+        if marca != self._ultima_fecha:
+            self._ultima_fecha = marca
+            self._ultimo_epoch = epoch_registro(dato)
+            self._ultimo_dia = epoch_a_fecha(self._ultimo_epoch)[:10]
+        if not math.isnan(self._ultimo_epoch):
+            self.desde = min(self.desde, self._ultimo_epoch)
+            self.hasta = max(self.hasta, self._ultimo_epoch)
+
+        area = dato.get('area')
+        clave = (dato.get('figura') or 'desconocida', self._ultimo_dia)
+        fila = self.diario.get(clave)
+        if fila is None:
+            fila = self.diario[clave] = [0, 0, 0.0, None, None]
+        fila[0] += 1
+        if isinstance(area, (int, float)):
+            self.area_min = min(self.area_min, area)
+            self.area_max = max(self.area_max, area)
+            fila[1] += 1
+            fila[2] += area
+            fila[3] = area if fila[3] is None else min(fila[3], area)
+            fila[4] = area if fila[4] is None else max(fila[4], area)
+
+
+    def a_entrada(self, numero: int, archivo: str) -> Dict:
+        ''' Entrada del manifiesto para este segmento '''
+        return {
+            'numero': numero,
+            'archivo': archivo,
+            'compactado': False,
+            'registros': self.registros,
+            'desde': self.desde if self.desde != math.inf else None,
+            'hasta': self.hasta if self.hasta != -math.inf else None,
+            'area_min': self.area_min if self.area_min != math.inf else None,
+            'area_max': self.area_max if self.area_max != -math.inf else None,
+            'figuras': sorted(self.estadisticas.por_figura),
+            'estadisticas': self.estadisticas.a_dict(),
+            'diario': [
+                {
+                    'figura': figura, 'dia': dia, 'registros': fila[0], 'con_area': fila[1],
+                    'suma': fila[2], 'minimo': fila[3], 'maximo': fila[4]
+                }
+                for (figura, dia), fila in self.diario.items()
+            ]
+        }
+
+
+########################
+###### MANIFIESTO ######
+########################
+
+def directorio_segmentos(ruta: Path) -> Path:
+    ''' Carpeta con los segmentos archivados de un historial '''
+    return ruta.with_name(ruta.name + '.segmentos')
+
+
+def ruta_manifiesto(ruta: Path) -> Path:
+    ''' Manifiesto (lista ordenada de segmentos) de un historial '''
+    return directorio_segmentos(ruta) / 'manifiesto.json'
+
+
+def cargar_manifiesto(ruta: Path) -> List[Dict]:
+    ''' Segmentos archivados, del más antiguo al más reciente ([] si no hay) '''
+    try:
+        with ruta_manifiesto(ruta).open('r', encoding='utf-8') as f:
+            return json.load(f)['segmentos']
+    except FileNotFoundError:
+        return []
+
+
+def guardar_manifiesto(ruta: Path, segmentos: List[Dict]) -> None:
+    ''' Guarda el manifiesto con reemplazo atómico '''
+    destino = ruta_manifiesto(ruta)
+    destino.parent.mkdir(exist_ok=True)
+    temporal = destino.with_name(destino.name + '.tmp')
+    with temporal.open('w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'segmentos': segmentos}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    temporal.replace(destino)
+
+
+def huella_manifiesto(ruta: Path) -> tuple:
+    ''' Tamaño y mtime del manifiesto: cambia con cada rotación o compactación '''
+    try:
+        st = ruta_manifiesto(ruta).stat()
+    except FileNotFoundError:
+        return ()
+    return (st.st_size, st.st_mtime_ns)
+
+
+##################################
+###### ARCHIVO DE SEGMENTOS ######
+##################################
+
+def archivar_segmento(ruta: Path, registros: Iterable[Dict], nivel: int=6) -> Optional[Dict]:
+    '''
+    Escribe los registros como un nuevo segmento comprimido (gzip) y lo
+    añade al manifiesto. No toca el historial activo.
+
+    :param ruta: Ruta al historial activo
+    :param registros: Registros del segmento, en orden cronológico
+    :param nivel: Nivel de compresión de gzip (1-9)
+    :return: Entrada del manifiesto, o None si no había registros
+    '''
+    import gzip
+
+    segmentos = cargar_manifiesto(ruta)
+    numero = segmentos[-1]['numero'] + 1 if segmentos else 1
+    archivo = f'{ruta.stem}.{numero:05d}{EXTENSION_SEGMENTO}'
+    directorio = directorio_segmentos(ruta)
+    directorio.mkdir(exist_ok=True)
+    temporal = directorio / (archivo + '.tmp')
+
+    resumen = ResumenSegmento()
+    with gzip.open(temporal, 'wt', encoding='utf-8', compresslevel=nivel) as f:
+        for dato in registros:
+            resumen.agregar(dato)
+            f.write(json.dumps(dato, ensure_ascii=False))
+            f.write('\n')
+
+    if not resumen.registros:
+        temporal.unlink()
+        return None
+    temporal.replace(directorio / archivo)
+    entrada = resumen.a_entrada(numero, archivo)
+    guardar_manifiesto(ruta, segmentos + [entrada])
+    return entrada
+
+
+def iterar_segmento(ruta: Path, entrada: Dict) -> Iterator[Dict]:
+    ''' Registros de un segmento archivado (ninguno si está compactado) '''
+    import gzip
+
+    if entrada.get('compactado'):
+        return
+    with gzip.open(directorio_segmentos(ruta) / entrada['archivo'], 'rt', encoding='utf-8') as f:
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def ultimos_de_segmento(ruta: Path, entrada: Dict, n: int) -> List[Dict]:
+    ''' Últimos n registros de un segmento (gzip no permite leer hacia atrás) '''
+    return list(deque(iterar_segmento(ruta, entrada), maxlen=n)) if n > 0 else []
+
+
+def puede_contener(
+        entrada: Dict,
+        figura: Optional[str]=None,
+        area_min: Optional[float]=None,
+        area_max: Optional[float]=None,
+        desde: Optional[float]=None,
+        hasta: Optional[float]=None) -> bool:
+    ''' Si un segmento puede tener registros que cumplan los filtros (según su manifiesto) '''
+    if entrada.get('compactado'):
+        return False
+    if figura is not None and figura not in (f.lower() for f in entrada['figuras']):
+        return False
+    if area_min is not None and (entrada['area_max'] is None or entrada['area_max'] < area_min):
+        return False
+    if area_max is not None and (entrada['area_min'] is None or entrada['area_min'] > area_max):
+        return False
+    if desde is not None and (entrada['hasta'] is None or entrada['hasta'] < desde):
+        return False
+    if hasta is not None and (entrada['desde'] is None or entrada['desde'] > hasta):
+        return False
+    return True
+
+
+def estadisticas_archivadas(ruta: Path) -> EstadisticasIncrementales:
+    ''' Estadísticas de todos los segmentos archivados, sin leerlos '''
+    stats = EstadisticasIncrementales()
+    for entrada in cargar_manifiesto(ruta):
+        stats.combinar(EstadisticasIncrementales.desde_dict(entrada['estadisticas']))
+    return stats
+
+
+def compactar_segmentos(ruta: Path, antes_de: float) -> int:
+    '''
+    Compacta los segmentos cuyo registro más reciente es anterior a 'antes_de'
+    (epoch): se borra el archivo con los registros y solo se conservan, en el
+    manifiesto, sus estadísticas y el resumen por figura y día.
+
+    :return: Número de segmentos compactados
+    '''
+    segmentos = cargar_manifiesto(ruta)
+    compactados = []
+    for entrada in segmentos:
+        if not entrada['compactado'] and entrada['hasta'] is not None and entrada['hasta'] < antes_de:
+            entrada['compactado'] = True
+            compactados.append(entrada['archivo'])
+    if compactados:
+        # Primero el manifiesto: si se interrumpe, quedan archivos sobrantes, no referencias rotas
+        guardar_manifiesto(ruta, segmentos)
+        for archivo in compactados:
+            (directorio_segmentos(ruta) / archivo).unlink(missing_ok=True)
+    return len(compactados)
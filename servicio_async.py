@@ -0,0 +1,339 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from calcu_areas import FIGURAS, ResultadoLote, calcular_area_sin_registro, calcular_areas_lote
+from metricas import registro_metricas
+from utils_json import guardar_registros, sello_fecha
+
+
+##############################################
+###### ESCRITOR ASÍNCRONO DEL HISTORIAL ######
+##############################################
+
+_CERRAR = object()
+
+
+class EscritorAsync:
+    '''
+    Tarea de asyncio que guarda en el historial los registros encolados.
+
+    La cola está acotada: si el disco no da abasto, agregar() espera en lugar
+    de acumular memoria. Cada lote se escribe con guardar_registros en un hilo
+    (asyncio.to_thread), así que el bucle de eventos nunca se bloquea en E/S.
+    '''
+
+    def __init__(self, ruta: Optional[Path]=None, tam_lote: int=500, max_pendientes: int=10000):
+        self.ruta = ruta
+        self.tam_lote = tam_lote
+        self.max_pendientes = max_pendientes
+        self.escritos = 0
+        self.errores = 0
+        self._cola: Optional[asyncio.Queue] = None
+        self._tarea: Optional[asyncio.Task] = None
+
+
+    def iniciar(self) -> None:
+        ''' Crea la cola y la tarea en el bucle de eventos en ejecución '''
+        if self._tarea is None:
+            self._cola = asyncio.Queue(maxsize=self.max_pendientes)
+            self._tarea = asyncio.get_running_loop().create_task(self._bucle())
+
+
+    async def agregar(self, dato: Dict) -> None:
+        ''' Encola un registro; espera si la cola está llena '''
+        self.iniciar()
+        await self._cola.put(dato)
+
+
+    def pendientes(self) -> int:
+        ''' Registros encolados que aún no se han escrito '''
+        return self._cola.qsize() if self._cola is not None else 0
+
+
+    async def flush(self) -> None:
+        ''' Espera a que todo lo encolado hasta ahora esté escrito '''
+        if self._cola is not None:
+            await self._cola.join()
+
+
+    async def cerrar(self) -> None:
+        ''' Escribe lo pendiente y termina la tarea '''
+        if self._tarea is None:
+            return
+        await self._cola.put(_CERRAR)
+        await self._tarea
+        self._tarea = None
+        self._cola = None
+
+
+    async def __aenter__(self) -> 'EscritorAsync':
+        self.iniciar()
+        return self
+
+
+    async def __aexit__(self, *excepcion) -> None:
+        await self.cerrar()
+
+
+    def _vaciar(self) -> None:
+        '''
+        Escribe de forma síncrona lo que queda en la cola. Se usa cuando se
+        cancela la tarea (p. ej. al terminar asyncio.run sin cerrar el escritor).
+        '''
+        lote = []
+        while not self._cola.empty():
+            elemento = self._cola.get_nowait()
+            self._cola.task_done()
+            if elemento is not _CERRAR:
+                lote.append(elemento)
+        if lote:
+            if guardar_registros(lote, self.ruta):
+                self.escritos += len(lote)
+            else:
+                self.errores += len(lote)
+
+
+    async def _bucle(self) -> None:
+        try:
+            await self._procesar()
+        except asyncio.CancelledError:
+            # El lote que estaba en asyncio.to_thread lo termina su hilo
+            self._vaciar()
+            raise
+        finally:
+            for bucle, escritor in list(_escritores.items()):
+                if escritor is self:
+                    del _escritores[bucle]
+
+
+    async def _procesar(self) -> None:
+        cerrar = False
+        while not cerrar:
+            elemento = await self._cola.get()
+            lote = []
+            tomados = 1
+            if elemento is _CERRAR:
+                cerrar = True
+            else:
+                lote.append(elemento)
+
+            while not cerrar and len(lote) < self.tam_lote and not self._cola.empty():
+                elemento = self._cola.get_nowait()
+                tomados += 1
+                if elemento is _CERRAR:
+                    cerrar = True
+                else:
+                    lote.append(elemento)
+
+            try:
+                if lote:
+                    if await asyncio.to_thread(guardar_registros, lote, self.ruta):
+                        self.escritos += len(lote)
+                    else:
+                        self.errores += len(lote)
+            finally:
+                for _ in range(tomados):
+                    self._cola.task_done()
+
+
+# Un escritor por bucle de eventos (la cola de asyncio pertenece a su bucle)
+_escritores: Dict[asyncio.AbstractEventLoop, EscritorAsync] = {}
+
+
+def obtener_escritor_async() -> EscritorAsync:
+    '''
+    Escritor asíncrono del bucle de eventos actual (se crea al primer uso).
+
+    Conviene usarlo con 'async with obtener_escritor_async():' o llamar a
+    cerrar_escritor_async() antes de salir del bucle. Si no, al cancelarse
+    su tarea (asyncio.run cancela las pendientes al terminar) lo que quede en
+    la cola se escribe de forma síncrona.
+    '''
+    bucle = asyncio.get_running_loop()
+    for cerrado in [b for b in _escritores if b.is_closed()]:
+        del _escritores[cerrado]
+    escritor = _escritores.get(bucle)
+    if escritor is None:
+        escritor = _escritores[bucle] = EscritorAsync()
+    return escritor
+
+
+async def cerrar_escritor_async() -> None:
+    ''' Vacía y cierra el escritor asíncrono del bucle actual '''
+    escritor = _escritores.pop(asyncio.get_running_loop(), None)
+    if escritor is not None:
+        await escritor.cerrar()
+
+
+###############################
+###### CÁLCULO ASÍNCRONO ######
+###############################
+
+async def calcular_area_async(figura: str, **kwargs: float) -> Union[float, str]:
+    '''
+    Versión asíncrona de calcular_area.
+
+    El cálculo se hace en línea (es CPU y muy corto); el registro en el
+    historial se encola en el escritor asíncrono en vez de escribir en disco.
+    Mismos valores de retorno y excepciones que calcular_area.
+    '''
+    area = calcular_area_sin_registro(figura, **kwargs)
+    if isinstance(area, str):
+        return area
+    await obtener_escritor_async().agregar({
+        **sello_fecha(),
+        'figura': figura,
+        'area': area,
+        'parametros': kwargs
+    })
+    return area
+
+
+async def calcular_areas_lote_async(figura: str, *, registrar: bool=False, **arrays) -> ResultadoLote:
+    '''
+    Versión asíncrona de calcular_areas_lote.
+
+    Con registrar=True las filas válidas se encolan en el historial con el
+    mismo formato que calcular_area.
+    '''
+    import numpy as np
+
+    resultado = calcular_areas_lote(figura, **arrays)
+    if registrar:
+        escritor = obtener_escritor_async()
+        sello = sello_fecha()
+        nombres = FIGURAS[figura].nombres_params
+        columnas = np.broadcast_arrays(*(np.asarray(arrays[n], dtype=np.float64) for n in nombres))
+        columnas = [np.atleast_1d(c).tolist() for c in columnas]
+        for i in (~resultado.invalidos).nonzero()[0].tolist():
+            await escritor.agregar({
+                **sello,
+                'figura': figura,
+                'area': float(resultado.areas[i]),
+                'parametros': {n: columnas[k][i] for k, n in enumerate(nombres)}
+            })
+    return resultado
+
+
+###########################
+###### SERVIDOR HTTP ######
+###########################
+
+_ESTADOS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large'}
+MAX_CUERPO = 16 * 1024 * 1024
+
+
+async def _atender(metodo: str, ruta: str, cuerpo: bytes) -> Tuple[int, Dict]:
+    '''
+    Resuelve una petición y retorna (código HTTP, respuesta JSON).
+
+    - GET  /salud   -> estado y registros pendientes de escribir
+    - GET  /figuras -> figuras disponibles y sus parámetros
+    - GET  /metricas -> métricas internas en JSON (ver metricas.py)
+    - POST /area    -> {"figura": ..., "parametros": {...}}
+    - POST /lote    -> {"figura": ..., "parametros": {nombre: [valores]}, "registrar": bool}
+    '''
+    if ruta == '/salud' and metodo == 'GET':
+        return 200, {'ok': True, 'pendientes': obtener_escritor_async().pendientes()}
+    if ruta == '/figuras' and metodo == 'GET':
+        return 200, {nombre: list(f.nombres_params) for nombre, f in FIGURAS.items()}
+    if ruta == '/metricas' and metodo == 'GET':
+        return 200, registro_metricas().instantanea()
+    if ruta not in ('/area', '/lote'):
+        return 404, {'error': f'Ruta {ruta} no encontrada'}
+    if metodo != 'POST':
+        return 405, {'error': 'Usa POST'}
+
+    try:
+        peticion = json.loads(cuerpo or b'{}')
+        figura = peticion['figura']
+        if not isinstance(figura, str) or figura not in FIGURAS:
+            return 400, {'error': f'Figura desconocida: {figura}. Usa: {", ".join(FIGURAS)}'}
+        parametros = peticion.get('parametros', {})
+        if ruta == '/area':
+            area = await calcular_area_async(figura, **parametros)
+            if isinstance(area, str):
+                return 400, {'error': area}
+            return 200, {'figura': figura, 'area': area}
+
+        resultado = await calcular_areas_lote_async(figura, registrar=bool(peticion.get('registrar')), **parametros)
+        return 200, {
+            'figura': figura,
+            'areas': [None if invalido else area for area, invalido in zip(resultado.areas.tolist(), resultado.invalidos.tolist())],
+            'filas_invalidas': resultado.filas_invalidas
+        }
+    except (ValueError, KeyError, TypeError) as e:
+        return 400, {'error': str(e) if not isinstance(e, KeyError) else f'Falta el campo {e}'}
+
+
+async def _conexion(lector: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+    ''' Atiende una conexión HTTP/1.1 (con keep-alive) '''
+    try:
+        while True:
+            linea = await lector.readline()
+            if not linea:
+                break
+            try:
+                metodo, ruta, version = linea.decode('latin-1').split()
+            except ValueError:
+                break
+
+            cabeceras = {}
+            while True:
+                cabecera = await lector.readline()
+                if cabecera in (b'\r\n', b'\n', b''):
+                    break
+                nombre, _, valor = cabecera.decode('latin-1').partition(':')
+                cabeceras[nombre.strip().lower()] = valor.strip()
+
+            try:
+                longitud = int(cabeceras.get('content-length', 0) or 0)
+            except ValueError:
+                longitud = -1
+            if longitud < 0:
+                # Sin una longitud válida no se sabe dónde acaba el cuerpo: se cierra
+                codigo, respuesta = 400, {'error': 'Content-Length no válido'}
+                cerrar = True
+            elif longitud > MAX_CUERPO:
+                codigo, respuesta = 413, {'error': 'Cuerpo demasiado grande'}
+                cerrar = True
+            else:
+                cuerpo = await lector.readexactly(longitud) if longitud else b''
+                codigo, respuesta = await _atender(metodo.upper(), ruta.split('?', 1)[0], cuerpo)
+                conexion = cabeceras.get('connection', '').lower()
+                cerrar = conexion == 'close' or (version == 'HTTP/1.0' and conexion != 'keep-alive')
+
+            datos = json.dumps(respuesta, ensure_ascii=False).encode('utf-8')
+            escritor.write(
+                f'HTTP/1.1 {codigo} {_ESTADOS[codigo]}\r\n'
+                f'Content-Type: application/json; charset=utf-8\r\n'
+                f'Content-Length: {len(datos)}\r\n'
+                f'Connection: {"close" if cerrar else "keep-alive"}\r\n\r\n'.encode('latin-1') + datos
+            )
+            await escritor.drain()
+            if cerrar:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        escritor.close()
+
+
+async def servir(host: str='127.0.0.1', puerto: int=8080, listo: Optional[asyncio.Event]=None) -> None:
+    '''
+    Arranca el servidor HTTP/JSON y lo mantiene hasta que se cancele.
+    Al terminar vacía el escritor asíncrono para no perder registros.
+
+    :param listo: Evento opcional que se activa cuando el servidor ya escucha
+    '''
+    servidor = await asyncio.start_server(_conexion, host, puerto)
+    obtener_escritor_async().iniciar()
+    try:
+        async with servidor:
+            if listo is not None:
+                listo.set()
+            await servidor.serve_forever()
+    finally:
+        await cerrar_escritor_async()
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Los módulos están en la raíz del repositorio, sin paquete
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import utils_json  # noqa: E402
+from historial_columnar import epoch_a_fecha  # noqa: E402
+
+FIGURAS_PRUEBA = ('circulo', 'cuadrado', 'rectangulo', 'triangulo')
+EPOCH_INICIO = 1704067200   # 1/1/2024
+
+
+@pytest.fixture(autouse=True)
+def directorio_temporal(tmp_path, monkeypatch):
+    ''' Cada prueba en su directorio: nunca se toca el areas.json del repositorio '''
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    utils_json.desactivar_escritura_diferida()
+    utils_json.configurar_rotacion()
+
+
+@pytest.fixture
+def generar_registros():
+    '''
+    Registros deterministas con figura, área y fecha variadas (uno por
+    minuto desde el 1/1/2024), con el mismo formato que registrar_resultado.
+    '''
+    def generar(n, inicio=0):
+        registros = []
+        for i in range(inicio, inicio + n):
+            epoch = EPOCH_INICIO + i * 60
+            registros.append({
+                'fecha': epoch_a_fecha(epoch),
+                'epoch': epoch,
+                'figura': FIGURAS_PRUEBA[i % len(FIGURAS_PRUEBA)],
+                'area': float((i * 37) % 500) + 0.5,
+                'parametros': {'lado': float(i % 13 + 1)}
+            })
+        return registros
+    return generar
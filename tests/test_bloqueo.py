@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import utils_json
+from conftest import RAIZ
+
+pytest.importorskip('fcntl')
+
+# Proceso hijo: toma el bloqueo, avisa por stdout y lo suelta
+HIJO = '''
+import sys, time
+from pathlib import Path
+from utils_json import bloqueo_historial
+with bloqueo_historial(Path(sys.argv[1]), compartido=sys.argv[2] == 'compartido'):
+    print(time.time(), flush=True)
+'''
+
+# Proceso hijo: agrega registros uno a uno
+ESCRITOR = '''
+import sys
+from pathlib import Path
+from utils_json import guardar_registro
+ruta, proceso, n = Path(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3])
+for i in range(n):
+    guardar_registro({'fecha': '01/01/2024 00:00:00', 'epoch': 1704067200, 'figura': 'circulo',
+                      'area': float(proceso * 1000 + i), 'parametros': {'radio': 1.0}}, ruta)
+'''
+
+
+def lanzar(codigo, *argumentos):
+    entorno = {**os.environ, 'PYTHONPATH': str(RAIZ)}
+    return subprocess.Popen(
+        [sys.executable, '-c', codigo, *map(str, argumentos)],
+        stdout=subprocess.PIPE, text=True, env=entorno
+    )
+
+
+def test_exclusivo_bloquea_a_otro_proceso():
+    ruta = Path('areas.json')
+    with utils_json.bloqueo_historial(ruta):
+        hijo = lanzar(HIJO, ruta, 'exclusivo')
+        time.sleep(0.5)
+        assert hijo.poll() is None
+        soltado = time.time()
+    salida, _ = hijo.communicate(timeout=10)
+    assert hijo.returncode == 0
+    assert float(salida) >= soltado
+
+
+def test_compartido_admite_lectores_de_otro_proceso():
+    ruta = Path('areas.json')
+    with utils_json.bloqueo_historial(ruta, compartido=True):
+        lector = lanzar(HIJO, ruta, 'compartido')
+        lector.communicate(timeout=10)
+        assert lector.returncode == 0
+
+        escritor = lanzar(HIJO, ruta, 'exclusivo')
+        time.sleep(0.5)
+        assert escritor.poll() is None
+        soltado = time.time()
+    salida, _ = escritor.communicate(timeout=10)
+    assert float(salida) >= soltado
+
+
+def test_no_se_amplia_de_compartido_a_exclusivo():
+    ruta = Path('areas.json')
+    with utils_json.bloqueo_historial(ruta, compartido=True):
+        with pytest.raises(RuntimeError):
+            with utils_json.bloqueo_historial(ruta):
+                pass
+    # El fallo no deja el bloqueo tomado
+    with utils_json.bloqueo_historial(ruta):
+        pass
+
+
+@pytest.mark.parametrize('nombre', ['areas.json', 'areas.jsonl'])
+def test_escritores_concurrentes_no_pierden_registros(nombre):
+    ruta = Path(nombre)
+    procesos = [lanzar(ESCRITOR, ruta, p, 50) for p in range(4)]
+    for proceso in procesos:
+        proceso.communicate(timeout=60)
+        assert proceso.returncode == 0
+
+    areas = sorted(r['area'] for r in utils_json.iterar_historial(ruta))
+    assert areas == sorted(float(p * 1000 + i) for p in range(4) for i in range(50))
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+import utils_json
+from conftest import EPOCH_INICIO
+from indice_historial import IndiceHistorial
+
+FORMATOS = ['areas.json', 'areas.jsonl', 'areas.db']
+
+FILTROS = [
+    {},
+    {'figura': 'circulo'},
+    {'figura': 'Cuadrado '},
+    {'figura': 'hexagono'},
+    {'area_min': 100, 'area_max': 200},
+    {'area_min': 480},
+    {'area_max': 0.5},
+    {'figura': 'rectangulo', 'area_min': 50, 'area_max': 450},
+    {'desde': EPOCH_INICIO + 60 * 100, 'hasta': EPOCH_INICIO + 60 * 250},
+    {'figura': 'triangulo', 'area_min': 10, 'desde': EPOCH_INICIO + 60 * 200},
+    {'hasta': EPOCH_INICIO - 1},
+]
+
+
+@pytest.fixture
+def historiales(generar_registros):
+    ''' El mismo historial en los tres formatos '''
+    registros = generar_registros(300)
+    rutas = [Path(nombre) for nombre in FORMATOS]
+    for ruta in rutas:
+        utils_json.guardar_registros(registros, ruta)
+    return registros, rutas
+
+
+def esperado(registros, figura=None, area_min=None, area_max=None, desde=None, hasta=None):
+    figura = figura.lower().strip() if figura is not None else None
+    return [
+        r for r in registros
+        if (figura is None or r['figura'] == figura)
+        and (area_min is None or r['area'] >= area_min)
+        and (area_max is None or r['area'] <= area_max)
+        and (desde is None or r['epoch'] >= desde)
+        and (hasta is None or r['epoch'] <= hasta)
+    ]
+
+
+@pytest.mark.parametrize('filtros', FILTROS)
+def test_mismo_resultado_en_todos_los_formatos(historiales, filtros):
+    registros, rutas = historiales
+    for ruta in rutas:
+        assert utils_json.consultar_historial(ruta=ruta, **filtros) == esperado(registros, **filtros), ruta
+
+
+@pytest.mark.parametrize('filtros', FILTROS)
+def test_sin_numpy_recorre_el_historial(historiales, filtros, monkeypatch):
+    registros, rutas = historiales
+
+    def sin_numpy(*args, **kwargs):
+        raise ImportError('No module named numpy')
+    monkeypatch.setattr(IndiceHistorial, 'consultar', sin_numpy)
+
+    for ruta in rutas:
+        assert utils_json.consultar_historial(ruta=ruta, **filtros) == esperado(registros, **filtros), ruta
+
+
+@pytest.mark.parametrize('filtros', FILTROS)
+def test_con_segmentos_igual_que_sqlite(historiales, filtros):
+    registros, rutas = historiales
+    for ruta in rutas[:2]:
+        utils_json.borrar_historial(ruta)
+        utils_json.guardar_registros(registros[:120], ruta)
+        utils_json.rotar_historial(ruta)
+        utils_json.guardar_registros(registros[120:], ruta)
+
+    sqlite = utils_json.consultar_historial(ruta=rutas[2], **filtros)
+    for ruta in rutas[:2]:
+        assert utils_json.consultar_historial(ruta=ruta, **filtros) == sqlite, ruta
@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import pytest
+
+import utils_json
+
+FORMATOS = ['areas.json', 'areas.jsonl', 'areas.db']
+
+
+def activar(ruta, **opciones):
+    # Sin flush explícito no se escribe nada: ni por tamaño de lote ni por tiempo
+    return utils_json.activar_escritura_diferida(ruta=ruta, **{'tam_lote': 10000, 'intervalo': 3600, **opciones})
+
+
+@pytest.mark.parametrize('nombre', FORMATOS)
+def test_flush_escribe_en_orden(nombre, generar_registros):
+    ruta = Path(nombre)
+    registros = generar_registros(50)
+    escritor = activar(ruta)
+    for dato in registros:
+        escritor.agregar(dato)
+    assert not ruta.exists()
+
+    utils_json.flush()
+    assert escritor.pendientes() == 0
+    assert list(utils_json.iterar_historial(ruta)) == registros
+
+
+@pytest.mark.parametrize('nombre', FORMATOS)
+def test_lotes_conservan_el_orden(nombre, generar_registros):
+    ruta = Path(nombre)
+    registros = generar_registros(50)
+    escritor = activar(ruta, tam_lote=7)
+    for dato in registros:
+        escritor.agregar(dato)
+    escritor.cerrar()
+    assert escritor.escritos == 50
+    assert list(utils_json.iterar_historial(ruta)) == registros
+
+
+def test_cerrar_escribe_lo_pendiente_y_rechaza_mas(generar_registros):
+    ruta = Path('areas.jsonl')
+    escritor = activar(ruta)
+    escritor.agregar(generar_registros(1)[0])
+    escritor.cerrar()
+    assert utils_json.contar_registros(ruta) == 1
+
+    with pytest.raises(RuntimeError):
+        escritor.agregar(generar_registros(1, 1)[0])
+    # Ya cerrado: ni flush ni un segundo cerrar se quedan esperando
+    escritor.flush()
+    escritor.cerrar()
+
+
+def test_desactivar_escribe_lo_pendiente(generar_registros):
+    ruta = Path('areas.json')
+    escritor = activar(ruta)
+    for dato in generar_registros(5):
+        escritor.agregar(dato)
+    utils_json.desactivar_escritura_diferida()
+    assert utils_json.contar_registros(ruta) == 5
+
+
+@pytest.mark.parametrize('nombre', FORMATOS)
+def test_lecturas_incluyen_lo_pendiente(nombre, generar_registros):
+    ruta = Path(nombre)
+    registros = generar_registros(8)
+    utils_json.guardar_registros(registros[:3], ruta)
+    escritor = activar(ruta)
+    for dato in registros[3:]:
+        escritor.agregar(dato)
+
+    assert utils_json.contar_registros(ruta) == 8
+    escritor.agregar(generar_registros(1, 8)[0])
+    assert utils_json.leer_pagina(0, 20, ruta) == generar_registros(9)
+    escritor.agregar(generar_registros(1, 9)[0])
+    assert [dict(r) for r in utils_json.ultimos_registros(2, ruta)] == generar_registros(2, 8)
+    escritor.agregar(generar_registros(1, 10)[0])
+    figura = registros[0]['figura']
+    assert utils_json.consultar_historial(figura, ruta=ruta) == [r for r in generar_registros(11) if r['figura'] == figura]
+
+
+@pytest.mark.parametrize('nombre', FORMATOS)
+def test_borrar_con_registros_pendientes(nombre, generar_registros):
+    ruta = Path(nombre)
+    utils_json.guardar_registros(generar_registros(3), ruta)
+    escritor = activar(ruta)
+    escritor.agregar(generar_registros(1, 3)[0])
+
+    assert utils_json.borrar_historial(ruta)
+    # Lo que estaba en cola se borró con el historial: no reaparece después
+    escritor.flush()
+    assert not ruta.exists()
+    assert utils_json.contar_registros(ruta) == 0
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+
+import utils_json
+from indice_historial import IndiceHistorial
+
+pytest.importorskip('numpy')
+
+FORMATOS = ['areas.json', 'areas.jsonl']
+
+
+def indice_en_disco(ruta):
+    return IndiceHistorial.cargar(utils_json.ruta_indice(ruta), utils_json._ruta_meta_indice(ruta))
+
+
+def recorrido(ruta, figura, area_min, area_max):
+    ''' Lo que debe devolver la consulta, sin índice '''
+    return [
+        r for r in utils_json.iterar_historial(ruta)
+        if r['figura'] == figura and area_min <= r['area'] <= area_max
+    ]
+
+
+@pytest.mark.parametrize('nombre', FORMATOS)
+def test_indice_al_dia_tras_agregar(nombre, generar_registros):
+    ruta = Path(nombre)
+    utils_json.guardar_registros(generar_registros(100), ruta)
+    assert len(utils_json.obtener_indice(ruta)) == 100
+    assert utils_json.ruta_indice(ruta).exists()
+
+    # Las escrituras siguientes amplían el índice en disco sin reconstruirlo
+    utils_json.guardar_registros(generar_registros(40, 100), ruta)
+    utils_json.guardar_registro(generar_registros(1, 140)[0], ruta)
+    en_disco = indice_en_disco(ruta)
+    assert en_disco is not None and len(en_disco) == 141
+
+    # Otro proceso (sin índice en memoria) lee el mismo resultado que un recorrido
+    utils_json._indices_global.clear()
+    assert utils_json.consultar_historial('circulo', 50, 300, ruta=ruta) == recorrido(ruta, 'circulo', 50, 300)
+
+
+@pytest.mark.parametrize('nombre', FORMATOS)
+def test_indice_tras_rotar(nombre, generar_registros):
+    ruta = Path(nombre)
+    utils_json.guardar_registros(generar_registros(100), ruta)
+    utils_json.obtener_indice(ruta)
+
+    assert utils_json.rotar_historial(ruta) is not None
+    assert not utils_json.ruta_indice(ruta).exists()
+    assert not ruta.exists()
+
+    utils_json.guardar_registros(generar_registros(20, 100), ruta)
+    assert len(utils_json.obtener_indice(ruta)) == 20
+
+    # Segmento más historial activo, en orden
+    esperado = [
+        r for r in generar_registros(120)
+        if r['figura'] == 'cuadrado' and 10 <= r['area'] <= 400
+    ]
+    assert utils_json.consultar_historial('cuadrado', 10, 400, ruta=ruta) == esperado
+
+
+@pytest.mark.parametrize('nombre', FORMATOS)
+def test_indice_se_reconstruye_si_el_archivo_se_reescribe(nombre, generar_registros):
+    ruta = Path(nombre)
+    utils_json.guardar_registros(generar_registros(50), ruta)
+    utils_json.obtener_indice(ruta)
+
+    # Reescritura por fuera: mismo tamaño o menor, otros registros
+    otro = Path('otro' + ruta.suffix)
+    utils_json.guardar_registros(generar_registros(30, 500), otro)
+    otro.replace(ruta)
+    utils_json._indices_global.clear()
+
+    assert len(utils_json.obtener_indice(ruta)) == 30
+    assert utils_json.consultar_historial('triangulo', 0, 1000, ruta=ruta) == recorrido(ruta, 'triangulo', 0, 1000)
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+
+import utils_json
+from segmentos_historial import cargar_manifiesto, directorio_segmentos, iterar_segmento
+
+FORMATOS = ['areas.json', 'areas.jsonl']
+
+
+@pytest.mark.parametrize('nombre', FORMATOS)
+def test_segmento_ida_y_vuelta(nombre, generar_registros):
+    ruta = Path(nombre)
+    registros = generar_registros(150)
+    utils_json.guardar_registros(registros[:100], ruta)
+
+    entrada = utils_json.rotar_historial(ruta)
+    assert entrada['registros'] == 100
+    assert (directorio_segmentos(ruta) / entrada['archivo']).exists()
+    assert cargar_manifiesto(ruta) == [entrada]
+    assert list(iterar_segmento(ruta, entrada)) == registros[:100]
+
+    # Segmento y archivo activo se leen como un único historial
+    utils_json.guardar_registros(registros[100:], ruta)
+    assert utils_json.contar_registros(ruta) == 150
+    assert utils_json.leer_pagina(0, 150, ruta) == registros
+    assert utils_json.leer_pagina(95, 10, ruta) == registros[95:105]
+    assert [dict(r) for r in utils_json.ultimos_registros(60, ruta)] == registros[90:]
+
+
+@pytest.mark.parametrize('nombre', FORMATOS)
+def test_varios_segmentos_en_orden(nombre, generar_registros):
+    ruta = Path(nombre)
+    registros = generar_registros(90)
+    for inicio in range(0, 90, 30):
+        utils_json.guardar_registros(registros[inicio:inicio + 30], ruta)
+        utils_json.rotar_historial(ruta)
+
+    manifiesto = cargar_manifiesto(ruta)
+    assert [e['numero'] for e in manifiesto] == [1, 2, 3]
+    assert [r for e in manifiesto for r in iterar_segmento(ruta, e)] == registros
+    assert utils_json.leer_pagina(25, 40, ruta) == registros[25:65]
+
+
+def test_rotar_sin_registros_no_crea_segmento():
+    ruta = Path('areas.jsonl')
+    assert utils_json.rotar_historial(ruta) is None
+    assert cargar_manifiesto(ruta) == []
+
+
+def test_borrar_historial_elimina_los_segmentos(generar_registros):
+    ruta = Path('areas.jsonl')
+    utils_json.guardar_registros(generar_registros(10), ruta)
+    utils_json.rotar_historial(ruta)
+    utils_json.guardar_registros(generar_registros(5, 10), ruta)
+
+    assert utils_json.borrar_historial(ruta)
+    assert not directorio_segmentos(ruta).exists()
+    assert utils_json.contar_registros(ruta) == 0
@@ -1,19 +1,151 @@
+import codecs
 import json
+import math
+import os
 from pathlib import Path
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Iterator, Any, Union, Callable
+from collections.abc import Mapping, Sequence
 from functools import lru_cache
+from itertools import islice
+from contextlib import contextmanager
 import threading
 
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.json import JSON
-from rich import box
+try:
+    import fcntl
+except ImportError:     # Windows: solo bloqueo entre hilos
+    fcntl = None
+
+from estadisticas import EstadisticasIncrementales
+from historial_columnar import FORMATO_FECHA, HistorialColumnar, epoch_a_fecha, epoch_registro, fecha_a_epoch
+from indice_historial import IndiceHistorial
+from segmentos_historial import (
+    ResumenSegmento, archivar_segmento, cargar_manifiesto, compactar_segmentos,
+    directorio_segmentos, estadisticas_archivadas, huella_manifiesto,
+    iterar_segmento, puede_contener, ultimos_de_segmento
+)
+from cache_resultados import cache_resultados
+from metricas import cronometrado, incrementar, registrar_indicador
 
-console = Console()
 
 ARCHIVO_JSON = Path('areas.json')
+ARCHIVO_JSONL = Path('areas.jsonl')
+ARCHIVO_SQLITE = Path('areas.db')
+
+
+###########################
+###### CONFIGURACIÓN ######
+###########################
+
+# Formato del historial: 'json' (array indentado, formato original),
+# 'jsonl' (un registro por línea, append O(1) y lectura en streaming) o
+# 'sqlite' (base de datos con índices por figura, fecha y área).
+FORMATO_HISTORIAL = os.environ.get('CALCU_AREAS_FORMATO', 'json')
+
+RUTAS_POR_FORMATO = {
+    'json': ARCHIVO_JSON,
+    'jsonl': ARCHIVO_JSONL,
+    'sqlite': ARCHIVO_SQLITE
+}
+
+
+def configurar_historial(formato: str) -> None:
+    '''
+    Cambia el formato del historial en tiempo de ejecución.
+
+    :param formato: 'json', 'jsonl' o 'sqlite'
+    :type formato: str
+    '''
+    global FORMATO_HISTORIAL
+    if formato not in RUTAS_POR_FORMATO:
+        raise ValueError(f'Formato {formato} no valido. Usa: {", ".join(RUTAS_POR_FORMATO.keys())}')
+    FORMATO_HISTORIAL = formato
+    _cache_global.invalidar()
+
+
+def ruta_historial() -> Path:
+    ''' Retorna la ruta del historial según el formato configurado '''
+    return RUTAS_POR_FORMATO.get(FORMATO_HISTORIAL, ARCHIVO_JSON)
+
+
+def es_jsonl(ruta: Path) -> bool:
+    ''' Indica si la ruta corresponde a un historial JSON Lines '''
+    return ruta.suffix == '.jsonl'
+
+
+####################################
+###### VISTAS DE SOLO LECTURA ######
+####################################
+
+class RegistroSoloLectura(Mapping):
+    '''
+    Vista inmutable de un registro del historial.
+    No copia el diccionario: envuelve el original y también envuelve, al
+    acceder, los diccionarios anidados (como 'parametros').
+    '''
+
+    __slots__ = ('_dato',)
+
+    def __init__(self, dato: Dict):
+        self._dato = dato
+
+    def __getitem__(self, clave: str) -> Any:
+        valor = self._dato[clave]
+        return RegistroSoloLectura(valor) if isinstance(valor, dict) else valor
+
+    def __iter__(self):
+        return iter(self._dato)
+
+    def __len__(self) -> int:
+        return len(self._dato)
+
+    def __repr__(self) -> str:
+        return f'RegistroSoloLectura({self._dato!r})'
+
+    def a_dict(self) -> Dict:
+        ''' Copia mutable (profunda) del registro '''
+        return json.loads(json.dumps(self._dato))
+
+
+class HistorialSoloLectura(Sequence):
+    '''
+    Vista inmutable sobre la lista del historial guardada en caché.
+    Comparte la lista sin copiarla y fija su longitud al crearse, así que
+    los registros que se añadan después al caché no aparecen en la vista.
+    '''
+
+    __slots__ = ('_datos', '_inicio', '_fin')
+
+    def __init__(self, datos: List[Dict], inicio: int=0, fin: Optional[int]=None):
+        self._datos = datos
+        self._inicio = inicio
+        self._fin = len(datos) if fin is None else fin
+
+    def __len__(self) -> int:
+        return self._fin - self._inicio
+
+    def __getitem__(self, indice: Union[int, slice]) -> Any:
+        if isinstance(indice, slice):
+            inicio, fin, paso = indice.indices(len(self))
+            if paso == 1:
+                return HistorialSoloLectura(self._datos, self._inicio + inicio, self._inicio + max(inicio, fin))
+            return [self[i] for i in range(inicio, fin, paso)]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError('índice fuera del historial')
+        return RegistroSoloLectura(self._datos[self._inicio + indice])
+
+    def __iter__(self):
+        for i in range(self._inicio, self._fin):
+            yield RegistroSoloLectura(self._datos[i])
+
+    def __repr__(self) -> str:
+        return f'HistorialSoloLectura({len(self)} registros)'
+
+    def a_lista(self) -> List[Dict]:
+        ''' Copia mutable de los registros de la vista '''
+        return [RegistroSoloLectura(d).a_dict() for d in self._datos[self._inicio:self._fin]]
 
 
 ##############################
@@ -21,14 +153,34 @@ ARCHIVO_JSON = Path('areas.json')
 ##############################
 
 class CacheJSON:
-    ''' Sistema de caché para evitar lecturas repetidas del archivo JSON '''
+    '''
+    Sistema de caché para evitar lecturas repetidas del archivo JSON.
+
+    Recuerda hasta qué posición del archivo ha leído (byte del ']' final en
+    JSON, fin de la última línea completa en JSON Lines, último id en SQLite).
+    Si el archivo solo ha crecido, extender() lee únicamente lo nuevo; si se
+    truncó o se reescribió, se vuelve a cargar entero.
+
+    Cuenta las consultas de cargar_json que se sirven del caché (aciertos),
+    leyendo solo lo añadido (incrementales) o del archivo entero (fallos).
+    '''
+
+    _TAM_FIRMA = 32  # bytes previos a la posición que deben seguir iguales
 
     def __init__(self):
         self._cache: Optional[List[Dict]] = None
         self._timestamp: Optional[float] = None
-        self._file_mtime: Optional[float] = None
+        self._file_mtime: Optional[int] = None
+        self._ruta: Optional[Path] = None
+        self._posicion: int = 0
+        self._tamano: Optional[int] = None
+        self._inodo: Optional[int] = None
+        self._firma: bytes = b''
         self._lock = threading.Lock()
         self._cache_duration = 60 # segundo (ajustable)
+        self.aciertos = 0
+        self.incrementales = 0
+        self.fallos = 0
 
     
     def invalidar(self):
@@ -37,89 +189,775 @@ class CacheJSON:
             self._cache = None
             self._timestamp = None
             self._file_mtime = None
+            self._ruta = None
+            self._posicion = 0
+            self._tamano = None
+            self._inodo = None
+            self._firma = b''
+
+
+    def _vigente(self, ruta: Path) -> bool:
+        ''' Hay caché para esta ruta y no ha expirado '''
+        if self._cache is None or self._timestamp is None:
+            return False
+
+        # Verificar que el caché corresponde al mismo archivo
+        if self._ruta != ruta:
+            return False
+
+        # Verificar si el caché ha expirado
+        tiempo_transcurrido = datetime.now().timestamp() - self._timestamp
+        return tiempo_transcurrido < self._cache_duration
 
 
     def is_valid(self, ruta: Path) -> bool:
         ''' Verifica si el caché es válido '''
-        if self._cache is None or self._timestamp is None:
+        if not self._vigente(ruta):
             return False
         
         # Verificar si el archivo ha cambiado
         if ruta.exists():
-            current_mtime = ruta.stat().st_mtime
-            if self._file_mtime != current_mtime:
+            st = ruta.stat()
+            if self._file_mtime != st.st_mtime_ns or self._tamano != st.st_size:
                 return False
         
-        # Verificar si el caché ha expirado
-        tiempo_transcurrido = datetime.now().timestamp() - self._timestamp
-        return tiempo_transcurrido < self._cache_duration
+        return True
     
 
-    def get(self, ruta: Path) -> Optional[List[Dict]]:
-        ''' Obtiene datos del caché si es válido '''
+    def get(self, ruta: Path, solo_lectura: bool=False) -> Optional[Union[List[Dict], HistorialSoloLectura]]:
+        '''
+        Obtiene datos del caché si es válido.
+        Con solo_lectura=True devuelve una vista sin copiar la lista.
+        '''
         with self._lock:
             if self.is_valid(ruta):
-                return self._cache.copy() if self._cache else None
+                if not self._cache:
+                    return None
+                if solo_lectura:
+                    return HistorialSoloLectura(self._cache)
+                return self._cache.copy()
             return None
         
 
-    def set(self, ruta: Path, datos: List[Dict]):
-        ''' Guarda datos en el caché '''
+    def set(self, ruta: Path, datos: List[Dict], copiar: bool=True, posicion: int=0, st: Optional[os.stat_result]=None):
+        '''
+        Guarda datos en el caché.
+        Con copiar=False se adopta la lista tal cual (el llamador no debe modificarla).
+
+        :param posicion: Hasta dónde se ha leído el archivo (ver la clase)
+        :param st: stat del archivo tomado antes de leerlo
+        '''
+        with self._lock:
+            if not datos:
+                self._cache = []
+            else:
+                self._cache = datos.copy() if copiar else datos
+            self._timestamp = datetime.now().timestamp()
+            self._ruta = ruta
+            self._posicion = posicion
+            self._registrar_estado(ruta, st)
+
+
+    def _registrar_estado(self, ruta: Path, st: Optional[os.stat_result]) -> None:
+        ''' Guarda tamaño, mtime, inodo y firma del archivo leído '''
+        if st is None and ruta.exists():
+            st = ruta.stat()
+        if st is None:
+            self._file_mtime = self._tamano = self._inodo = None
+            self._firma = b''
+            return
+        self._file_mtime = st.st_mtime_ns
+        self._tamano = st.st_size
+        self._inodo = st.st_ino
+        self._firma = self._leer_firma(ruta)
+
+
+    def _leer_firma(self, ruta: Path) -> bytes:
+        ''' Bytes justo antes de la posición leída (vacío en SQLite) '''
+        if es_sqlite(ruta) or self._posicion <= 0:
+            return b''
+        inicio = max(0, self._posicion - self._TAM_FIRMA)
+        with ruta.open('rb') as f:
+            f.seek(inicio)
+            return f.read(self._posicion - inicio)
+
+
+    def extender(self, ruta: Path) -> bool:
+        '''
+        Si el archivo solo ha crecido desde la última lectura, lee lo nuevo
+        y lo añade al caché. Retorna False si hace falta una carga completa.
+        '''
         with self._lock:
-            self._cache = datos.copy() if datos else []
+            if not self._vigente(ruta) or self._tamano is None or not ruta.exists():
+                return False
+
+            st = ruta.stat()
+            if st.st_ino != self._inodo or st.st_size < self._tamano:
+                return False    # reescrito o truncado
+            if self._leer_firma(ruta) != self._firma:
+                return False    # el contenido ya leído ha cambiado
+
+            resultado = leer_incremento(ruta, self._posicion)
+            if resultado is None:
+                return False
+
+            nuevos, self._posicion = resultado
+            self._cache.extend(nuevos)
             self._timestamp = datetime.now().timestamp()
-            if ruta.exists():
-                self._file_mtime = ruta.stat().st_mtime
+            self._registrar_estado(ruta, st)
+            return True
+
+
+    def anotar(self, resultado: str) -> None:
+        ''' Cuenta una consulta: 'acierto', 'incremental' o 'fallo' '''
+        with self._lock:
+            if resultado == 'acierto':
+                self.aciertos += 1
+            elif resultado == 'incremental':
+                self.incrementales += 1
+            else:
+                self.fallos += 1
+
+
+    def tasa_aciertos(self) -> float:
+        ''' Fracción de consultas servidas sin leer el archivo entero '''
+        total = self.aciertos + self.incrementales + self.fallos
+        return (self.aciertos + self.incrementales) / total if total else 0.0
+
+
+    def indicadores(self) -> Dict[str, float]:
+        ''' Contadores del caché para el volcado de métricas '''
+        return {
+            'cache_historial_aciertos': self.aciertos,
+            'cache_historial_incrementales': self.incrementales,
+            'cache_historial_fallos': self.fallos,
+            'cache_historial_tasa_aciertos': self.tasa_aciertos(),
+            'cache_historial_registros': len(self._cache) if self._cache is not None else 0
+        }
 
 
 # Instancia global del caché
 _cache_global = CacheJSON()
+registrar_indicador('cache_historial', _cache_global.indicadores)
 
 
 ################################
 ###### FUNCION DE LECTURA ######
 ################################
 
-def cargar_json(ruta: Path=ARCHIVO_JSON, default=None, usar_cache: bool=True) -> List[Dict]:
+@cronometrado('historial_segundos', operacion='carga')
+def cargar_json(
+        ruta: Optional[Path]=None,
+        default=None,
+        usar_cache: bool=True,
+        solo_lectura: bool=False) -> Union[List[Dict], HistorialSoloLectura]:
     '''
-    Carga datos desde un archivo JSON con sistema de caché.
+    Carga datos desde el historial (JSON, JSON Lines o SQLite) con sistema de caché.
     
-    :param ruta: Ruta al archivo JSON
-    :type ruta: Path
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
     :param default: Valor por defecto si el archivo no existe.
     :param usar_cache: Si True, usa el sistema de caché.
     :type usar_cache: bool
-    :return: Lista de diccionarios con los datos.
-    :rtype: List[Dict]
+    :param solo_lectura: Si True, devuelve una vista inmutable que comparte los
+        datos del caché sin copiarlos. Usar en las rutas que solo leen.
+    :type solo_lectura: bool
+    :return: Lista de diccionarios con los datos (o vista de solo lectura).
+    :rtype: Union[List[Dict], HistorialSoloLectura]
     '''
+    ruta = ruta or ruta_historial()
 
-    # Intenta obtener del caché primero
+    # Los registros aún en la cola de escritura diferida deben verse al leer
+    if _escritor_global is not None and _escritor_global.pendientes():
+        _escritor_global.flush()
+
+    # Intenta obtener del caché primero (leyendo solo lo nuevo si el archivo creció)
     if usar_cache:
-        datos_cache = _cache_global.get(ruta)
+        resultado = 'acierto'
+        datos_cache = _cache_global.get(ruta, solo_lectura=solo_lectura)
+        if datos_cache is None and _cache_global.extender(ruta):
+            resultado = 'incremental'
+            datos_cache = _cache_global.get(ruta, solo_lectura=solo_lectura)
         if datos_cache is not None:
+            _cache_global.anotar(resultado)
             return datos_cache
-        
+        _cache_global.anotar('fallo')
+
     # Si no hay caché válido, leer del archivo
     if ruta.exists():
         try:
-            with ruta.open('r', encoding='utf-8') as f:
-                datos = json.load(f)
-
-                # Guardar en caché
-                if usar_cache:
-                    _cache_global.set(ruta, datos)
-                
-                return datos
+            st = ruta.stat()
+            if es_jsonl(ruta) or es_sqlite(ruta):
+                datos, posicion = leer_incremento(ruta, 0)
+            else:
+                # El array se reescribe desde el ']' al añadir: no leerlo a medias
+                with bloqueo_historial(ruta, compartido=True):
+                    st = ruta.stat()
+                    with ruta.open('r', encoding='utf-8') as f:
+                        datos = json.load(f)
+                    posicion = posicion_cierre_array(ruta)
+
+            # Guardar en caché (la lista recién leída no necesita copia)
+            if usar_cache and isinstance(datos, list):
+                _cache_global.set(ruta, datos, copiar=False, posicion=posicion, st=st)
+                if solo_lectura:
+                    return HistorialSoloLectura(datos)
+                return datos.copy()
+            
+            return datos
         except json.JSONDecodeError as e:
-            console.print(f'[red]Error al decodificar JSON: {e}[/red]')
+            _avisar(f'[red]Error al decodificar JSON: {e}[/red]')
             return default or []
         except Exception as e:
-            console.print(f'[red]Error al leer el archivo: {e}[/red]')
+            _avisar(f'[red]Error al leer el archivo: {e}[/red]')
             return default or []
     
     return default or []
 
 
+# Historial columnar por ruta: (historial, posición leída, tamaño, inodo, firma)
+_columnar_global: Dict[Path, tuple] = {}
+_columnar_lock = threading.Lock()
+
+
+def cargar_columnar(ruta: Optional[Path]=None) -> HistorialColumnar:
+    '''
+    Carga el historial en representación columnar (ver HistorialColumnar).
+    Se construye en streaming, sin pasar por la lista de diccionarios, y se
+    mantiene en memoria: si el archivo solo creció (y lo ya leído no cambió,
+    ver _firma_indice), se añaden los registros nuevos; si no, se reconstruye.
+    El array JSON se lee con el bloqueo compartido, como en cargar_json.
+
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :rtype: HistorialColumnar
+    '''
+    ruta = ruta or ruta_historial()
+    flush()
+
+    if es_jsonl(ruta) or es_sqlite(ruta):
+        return _cargar_columnar(ruta)
+    # El bloqueo va antes que _columnar_lock, en el mismo orden que en _rotar
+    with bloqueo_historial(ruta, compartido=True):
+        return _cargar_columnar(ruta)
+
+
+def _cargar_columnar(ruta: Path) -> HistorialColumnar:
+    ''' Cuerpo de cargar_columnar '''
+    with _columnar_lock:
+        if not ruta.exists():
+            _columnar_global.pop(ruta, None)
+            return HistorialColumnar()
+
+        st = ruta.stat()
+        entrada = _columnar_global.get(ruta)
+        if entrada is not None:
+            historial, posicion, tamano, inodo, firma = entrada
+            continua = inodo == st.st_ino and tamano <= st.st_size and (
+                es_sqlite(ruta) or _firma_indice(ruta, posicion) == firma
+            )
+            if continua and tamano == st.st_size and not es_sqlite(ruta):
+                return historial
+            if continua:
+                resultado = leer_incremento(ruta, posicion)
+                if resultado is not None:
+                    nuevos, posicion = resultado
+                    historial.extender(nuevos)
+                    _columnar_global[ruta] = (historial, posicion, st.st_size, st.st_ino, _firma_columnar(ruta, posicion))
+                    return historial
+
+        # Construcción completa en streaming, anotando hasta dónde se ha leído
+        historial = HistorialColumnar()
+        if es_jsonl(ruta):
+            posicion = 0
+            for dato, posicion in iterar_jsonl_desde(ruta):
+                if dato is not None:
+                    historial.agregar(dato)
+        elif es_sqlite(ruta):
+            posicion = ultimo_id_sqlite(ruta)
+            historial.extender(iterar_sqlite(ruta, hasta_id=posicion))
+        else:
+            posicion = posicion_cierre_array(ruta)
+            historial.extender(iterar_json_array(ruta))
+        _columnar_global[ruta] = (historial, posicion, st.st_size, st.st_ino, _firma_columnar(ruta, posicion))
+        return historial
+
+
+def _firma_columnar(ruta: Path, posicion: int) -> str:
+    ''' Firma de lo ya leído (en SQLite la posición es un id: no hay bytes que comparar) '''
+    return '' if es_sqlite(ruta) else _firma_indice(ruta, posicion)
+
+
+def posicion_cierre_array(ruta: Path) -> int:
+    ''' Byte donde está el ']' que cierra el array JSON (0 si no se encuentra) '''
+    tam = ruta.stat().st_size
+    with ruta.open('rb') as f:
+        f.seek(max(0, tam - 64))
+        cola = f.read()
+    pos = cola.rfind(b']')
+    return 0 if pos < 0 else tam - len(cola) + pos
+
+
+def iterar_jsonl_desde(ruta: Path, posicion: int=0) -> Iterator[tuple]:
+    '''
+    Recorre un archivo JSON Lines desde un byte dado, solo por líneas completas.
+    Produce (registro, byte tras la línea); registro es None en líneas vacías o inválidas.
+    '''
+    with ruta.open('rb') as f:
+        f.seek(posicion)
+        for linea in f:
+            if not linea.endswith(b'\n'):
+                return   # línea a medio escribir: se leerá la próxima vez
+            posicion += len(linea)
+            dato = None
+            if linea.strip():
+                try:
+                    dato = json.loads(linea)
+                except json.JSONDecodeError:
+                    pass
+            yield dato, posicion
+
+
+def leer_incremento(ruta: Path, posicion: int) -> Optional[tuple]:
+    '''
+    Lee los registros añadidos al historial a partir de una posición.
+
+    - JSON Lines: posicion es un byte; solo se leen líneas completas.
+    - SQLite: posicion es el último id leído.
+    - JSON (array): posicion es el byte del ']' de cierre anterior; lo nuevo
+      debe empezar por ',' y acabar en un nuevo ']'.
+
+    :return: (nuevos registros, nueva posición) o None si el archivo no es
+        una continuación de lo ya leído.
+    :rtype: Optional[tuple]
+    '''
+    if es_sqlite(ruta):
+        conexion = conectar_sqlite(ruta)
+        try:
+            filas = conexion.execute(
+                'SELECT id, fecha, epoch, figura, area, parametros FROM historial WHERE id > ? ORDER BY id',
+                (posicion,)
+            ).fetchall()
+        finally:
+            conexion.close()
+        return [_fila_a_dato(f) for f in filas], (filas[-1]['id'] if filas else posicion)
+
+    if es_jsonl(ruta):
+        nuevos = []
+        for dato, posicion in iterar_jsonl_desde(ruta, posicion):
+            if dato is not None:
+                nuevos.append(dato)
+        return nuevos, posicion
+
+    with ruta.open('rb') as f:
+        f.seek(posicion)
+        cola = f.read()
+
+    # Array JSON: ',\n {...}\n,\n {...}\n]'
+    texto_inicio = cola.lstrip()
+    if texto_inicio.startswith(b']'):
+        return [], posicion
+    if not texto_inicio.startswith(b','):
+        return None
+    cierre = cola.rfind(b']')
+    if cierre < 0:
+        return None
+    try:
+        texto = cola[:cierre].decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
+    decoder = json.JSONDecoder()
+    nuevos = []
+    i = 0
+    while True:
+        while i < len(texto) and texto[i] in ' \t\r\n,':
+            i += 1
+        if i >= len(texto):
+            break
+        try:
+            dato, i = decoder.raw_decode(texto, i)
+        except json.JSONDecodeError:
+            return None
+        nuevos.append(dato)
+    return nuevos, posicion + cierre
+
+
+def registros_con_posicion(ruta: Path, posicion: int=0, destino: Optional[Callable[[int, Dict], Any]]=None) -> Optional[tuple]:
+    '''
+    Como leer_incremento (JSON o JSON Lines), pero junto a cada registro
+    devuelve el byte del archivo donde empieza, para poder leerlo luego con
+    leer_registros_en sin recorrer el resto. Lee por bloques.
+
+    :param destino: Si se indica, se llama destino(byte, registro) por cada
+        registro en lugar de acumularlos (memoria constante)
+    :return: ([(byte, registro), ...], nueva posición) o None si el archivo
+        no es una continuación de lo ya leído. Con destino la lista va vacía.
+    :rtype: Optional[tuple]
+    '''
+    registros = []
+    agregar = destino or (lambda byte, dato: registros.append((byte, dato)))
+
+    if es_jsonl(ruta):
+        inicio = posicion
+        for dato, fin in iterar_jsonl_desde(ruta, posicion):
+            if dato is not None:
+                agregar(inicio, dato)
+            inicio = fin
+        return registros, inicio
+
+    cierre = posicion_cierre_array(ruta) if ruta.stat().st_size else 0
+    if cierre < posicion:
+        return None
+
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    decoder = json.JSONDecoder()
+    separadores = ' \t\r\n,[' if posicion == 0 else ' \t\r\n,'
+    texto, i = '', 0
+    byte = posicion          # byte del archivo donde está texto[i]
+    restante = cierre - posicion
+    primero = True
+
+    with ruta.open('rb') as f:
+        f.seek(posicion)
+        while True:
+            inicio_sep = i
+            while i < len(texto) and texto[i] in separadores:
+                i += 1
+            if primero and i < len(texto):
+                # Comprobar que lo nuevo continúa el array ya leído
+                previo = texto[inicio_sep:i].lstrip()
+                if (posicion == 0 and not previo.startswith('[')) or (posicion > 0 and not previo.startswith(',')):
+                    return None
+                primero = False
+            byte += i - inicio_sep
+
+            fin_datos = restante == 0
+            if i < len(texto):
+                try:
+                    dato, j = decoder.raw_decode(texto, i)
+                except json.JSONDecodeError:
+                    if fin_datos:
+                        return None
+                    dato = None
+                if dato is not None:
+                    agregar(byte, dato)
+                    consumido = texto[i:j]
+                    byte += len(consumido) if consumido.isascii() else len(consumido.encode('utf-8'))
+                    i = j
+                    continue
+            elif fin_datos:
+                break
+
+            # Bloque nuevo: se conserva solo lo que queda sin consumir
+            bloque = f.read(min(1 << 20, restante))
+            restante -= len(bloque)
+            texto = texto[i:] + utf8.decode(bloque, final=restante == 0)
+            i = 0
+
+    return registros, cierre
+
+
+def leer_registros_en(ruta: Path, posiciones: List[int]) -> List[Dict]:
+    '''
+    Lee solo los registros que empiezan en los bytes indicados (ver
+    registros_con_posicion), sin cargar el historial completo.
+
+    :param ruta: Ruta al historial (JSON o JSON Lines)
+    :type ruta: Path
+    :param posiciones: Bytes de inicio de los registros
+    :type posiciones: List[int]
+    :return: Registros en el orden de las posiciones
+    :rtype: List[Dict]
+    '''
+    registros = []
+    decoder = json.JSONDecoder()
+    with ruta.open('rb') as f:
+        for posicion in posiciones:
+            f.seek(posicion)
+            if es_jsonl(ruta):
+                registros.append(json.loads(f.readline()))
+                continue
+            bloque = b''
+            while True:
+                leido = f.read(4096)
+                bloque += leido
+                try:
+                    dato, _ = decoder.raw_decode(bloque.decode('utf-8', errors='ignore'))
+                    break
+                except json.JSONDecodeError:
+                    if not leido:
+                        raise
+            registros.append(dato)
+    return registros
+
+
+class _LectorInverso:
+    '''
+    Lee un archivo binario hacia atrás por bloques. Las posiciones son bytes
+    absolutos del archivo; datos cubre desde inicio y fin marca hasta dónde
+    queda por consumir, así que en memoria solo hay lo aún no leído.
+    '''
+
+    def __init__(self, f, tam_bloque: int=65536):
+        f.seek(0, os.SEEK_END)
+        self.f = f
+        self.tam_bloque = tam_bloque
+        self.inicio = f.tell()
+        self.fin = self.inicio
+        self.datos = b''
+
+
+    def anterior(self) -> bool:
+        ''' Antepone el bloque anterior; False si ya se está al principio '''
+        if self.inicio == 0:
+            return False
+        tam = min(self.tam_bloque, self.inicio)
+        self.inicio -= tam
+        self.f.seek(self.inicio)
+        self.datos = self.f.read(tam) + self.datos[:self.fin - self.inicio - tam]
+        return True
+
+
+    def byte(self, posicion: int) -> int:
+        ''' Byte en una posición anterior a fin, leyendo bloques si hace falta '''
+        while posicion < self.inicio:
+            if not self.anterior():
+                raise ValueError('Posición fuera del archivo')
+        return self.datos[posicion - self.inicio]
+
+
+    def saltar(self, ignorar: bytes) -> Optional[int]:
+        ''' Consume hacia atrás los bytes de 'ignorar'; retorna el siguiente (sin consumirlo) o None al llegar al principio '''
+        while self.fin > 0:
+            b = self.byte(self.fin - 1)
+            if b not in ignorar:
+                return b
+            self.fin -= 1
+        return None
+
+
+def _iterar_jsonl_inverso(f, tam_bloque: int) -> Iterator[Dict]:
+    ''' Registros de un JSON Lines del último al primero (líneas vacías o inválidas se ignoran) '''
+    lector = _LectorInverso(f, tam_bloque)
+    while lector.fin > 0:
+        # Salto de línea anterior al final de la línea actual
+        i = lector.datos.rfind(b'\n', 0, lector.fin - lector.inicio - 1)
+        if i < 0 and lector.anterior():
+            continue
+        linea = lector.datos[i + 1:lector.fin - lector.inicio]
+        lector.fin = lector.inicio + i + 1
+        if linea.strip():
+            try:
+                yield json.loads(linea)
+            except json.JSONDecodeError:
+                continue
+
+
+def _iterar_json_array_inverso(f, tam_bloque: int) -> Iterator[Dict]:
+    '''
+    Elementos de un array JSON del último al primero. Se recorre hacia atrás
+    contando llaves y corchetes (fuera de las cadenas) hasta el '{' que abre
+    cada elemento, y solo ese tramo se decodifica.
+    Lanza ValueError si el archivo no es un array de objetos bien cerrado.
+    '''
+    lector = _LectorInverso(f, tam_bloque)
+    if lector.saltar(b' \t\r\n') != ord(']'):
+        raise ValueError('El historial no termina en ]')
+    lector.fin -= 1
+
+    while True:
+        b = lector.saltar(b' \t\r\n,')
+        if b == ord('['):
+            return
+        if b != ord('}'):
+            raise ValueError('Elemento del historial no reconocido')
+
+        fin = lector.fin
+        posicion = fin - 1
+        profundidad = 0
+        en_cadena = False
+        while True:
+            b = lector.byte(posicion)
+            if en_cadena:
+                if b == 0x22:   # '"' que abre la cadena, salvo que esté escapada
+                    barras = 0
+                    while lector.byte(posicion - barras - 1) == 0x5c:
+                        barras += 1
+                    en_cadena = barras % 2 == 1
+            elif b == 0x22:
+                en_cadena = True
+            elif b in b'}]':
+                profundidad += 1
+            elif b in b'{[':
+                profundidad -= 1
+                if profundidad == 0:
+                    break
+            posicion -= 1
+
+        yield json.loads(lector.datos[posicion - lector.inicio:fin - lector.inicio])
+        lector.fin = posicion
+
+
+def leer_ultimos_registros(ruta: Path, n: int, tam_bloque: int=65536) -> List[Dict]:
+    '''
+    Lee los últimos n registros de un historial JSON o JSON Lines recorriendo
+    el archivo hacia atrás por bloques: el coste depende de n y no del tamaño
+    del historial.
+
+    :param ruta: Ruta al historial (JSON o JSON Lines)
+    :type ruta: Path
+    :param n: Número de registros
+    :type n: int
+    :param tam_bloque: Bytes leídos en cada bloque
+    :type tam_bloque: int
+    :return: Registros en orden cronológico
+    :rtype: List[Dict]
+    :raises ValueError: Si el array JSON no está bien formado
+    '''
+    if n <= 0 or not ruta.exists():
+        return []
+    if es_jsonl(ruta):
+        # Cada append es una línea completa: no hace falta bloquear
+        with ruta.open('rb') as f:
+            ultimos = list(islice(_iterar_jsonl_inverso(f, tam_bloque), n))
+    else:
+        # El append a un array reescribe el ']' final
+        with bloqueo_historial(ruta, compartido=True), ruta.open('rb') as f:
+            ultimos = list(islice(_iterar_json_array_inverso(f, tam_bloque), n))
+    ultimos.reverse()
+    return ultimos
+
+
+####################################
+###### BLOQUEO ENTRE PROCESOS ######
+####################################
+
+# Garantías de escritura (mismo equipo, sistema de archivos local):
+# - Cada llamada a guardar_registros (y a las funciones *_append*) se ejecuta
+#   en exclusiva frente a otros hilos y procesos que usen este módulo: los
+#   registros de un lote quedan contiguos y no se pierde ninguno.
+# - El acumulador de estadísticas (.stats) se actualiza dentro del mismo
+#   bloqueo, así que sigue cuadrando con el historial.
+# - Los lectores de JSON Lines y SQLite no bloquean: solo ven líneas
+#   completas o transacciones confirmadas. La carga completa de un array JSON
+#   toma un bloqueo compartido para no leer el archivo a medio escribir.
+# - Sin fcntl (Windows) solo se protegen los hilos del propio proceso.
+#   flock no es fiable sobre NFS.
+
+class BloqueoHistorial:
+    '''
+    Bloqueo de lectura/escritura de un historial, entre hilos y entre procesos
+    (flock sobre '<historial>.lock'). Se usa un archivo aparte porque el
+    historial se puede reemplazar (migraciones) y el bloqueo va ligado al inodo.
+
+    - Varios hilos del proceso pueden tener a la vez el bloqueo compartido;
+      comparten un único LOCK_SH, que se suelta al salir el último.
+    - El exclusivo espera a que no haya ningún lector ni escritor.
+    - Es reentrante en un mismo hilo. Dentro del exclusivo se puede pedir
+      cualquiera; pedir el exclusivo teniendo solo el compartido lanza
+      RuntimeError (no se puede ampliar sin soltarlo antes).
+    '''
+
+    def __init__(self, ruta: Path):
+        self.ruta = ruta_bloqueo(ruta)
+        self._condicion = threading.Condition()
+        self._lectores = 0          # hilos con el bloqueo compartido
+        self._escritor = None       # hilo con el exclusivo
+        self._hilo = threading.local()    # modo y profundidad en cada hilo
+        self._fd: Optional[int] = None
+
+
+    def adquirir(self, compartido: bool=False) -> None:
+        ''' Toma el bloqueo; solo la primera adquisición del hilo espera '''
+        profundidad = getattr(self._hilo, 'profundidad', 0)
+        if profundidad:
+            if self._hilo.compartido and not compartido:
+                raise RuntimeError(f'No se puede pasar del bloqueo compartido al exclusivo en {self.ruta}')
+            self._hilo.profundidad += 1
+            return
+
+        yo = threading.get_ident()
+        with self._condicion:
+            if compartido:
+                self._condicion.wait_for(lambda: self._escritor is None)
+                if self._lectores == 0:
+                    self._flock(fcntl.LOCK_SH if fcntl is not None else None)
+                self._lectores += 1
+            else:
+                self._condicion.wait_for(lambda: self._escritor is None and self._lectores == 0)
+                self._flock(fcntl.LOCK_EX if fcntl is not None else None)
+                self._escritor = yo
+        self._hilo.compartido = compartido
+        self._hilo.profundidad = 1
+
+
+    def liberar(self) -> None:
+        ''' Suelta el bloqueo tomado con adquirir '''
+        self._hilo.profundidad -= 1
+        if self._hilo.profundidad:
+            return
+        with self._condicion:
+            if self._hilo.compartido:
+                self._lectores -= 1
+                if self._lectores == 0:
+                    self._cerrar_fd()
+            else:
+                self._escritor = None
+                self._cerrar_fd()
+            self._condicion.notify_all()
+
+
+    def _flock(self, modo: Optional[int]) -> None:
+        ''' Toma el flock del proceso (nada sin fcntl) '''
+        if modo is None:
+            return
+        try:
+            self._fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, modo)
+        except OSError:
+            self._cerrar_fd()
+            raise
+
+
+    def _cerrar_fd(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)  # cerrar el descriptor libera el flock
+            self._fd = None
+
+
+_bloqueos: Dict[str, BloqueoHistorial] = {}
+_bloqueos_lock = threading.Lock()
+
+
+def ruta_bloqueo(ruta: Path) -> Path:
+    ''' Archivo de bloqueo de un historial '''
+    return ruta.with_name(ruta.name + '.lock')
+
+
+@contextmanager
+def bloqueo_historial(ruta: Path, compartido: bool=False):
+    '''
+    Context manager que bloquea el historial frente a otros hilos y procesos.
+    Es reentrante dentro de un mismo hilo (ver BloqueoHistorial).
+
+    :param ruta: Ruta al historial
+    :type ruta: Path
+    :param compartido: Bloqueo de lectura (varios lectores a la vez, ningún escritor)
+    :type compartido: bool
+    '''
+    clave = os.path.abspath(ruta)
+    with _bloqueos_lock:
+        bloqueo = _bloqueos.get(clave)
+        if bloqueo is None:
+            bloqueo = _bloqueos[clave] = BloqueoHistorial(ruta)
+    bloqueo.adquirir(compartido)
+    try:
+        yield
+    finally:
+        bloqueo.liberar()
+
+
 ##################################
 ###### FUNCION DE ESCRITURA ######
 ##################################
@@ -136,262 +974,1841 @@ def guardar_json_append(dato: Dict, ruta: Path=ARCHIVO_JSON) -> bool:
     :return: True si se guardo correctamente, False en caso contrario.
     :rtype: bool
     '''
+    return guardar_json_append_lote([dato], ruta)
+
+
+def guardar_json_append_lote(datos: List[Dict], ruta: Path=ARCHIVO_JSON, fsync: bool=False) -> bool:
+    '''
+    Agrega varios registros al final del archivo con una sola búsqueda del ']'.
+    ADVERTENCIA: Requiere que el archivo JSON esté formateado como array.
+    
+    :param datos: Lista de diccionarios a guardar
+    :type datos: List[Dict]
+    :param ruta: Ruta al archivo JSON
+    :type ruta: Path
+    :param fsync: Si True, fuerza la escritura a disco antes de retornar
+    :type fsync: bool
+    :return: True si se guardo correctamente, False en caso contrario.
+    :rtype: bool
+    '''
+    if not datos:
+        return True
 
     try:
-        if not ruta.exists() or ruta.stat().st_size == 0:
-            # Si no existe, crear nuevo archivo
-            with ruta.open('w', encoding='utf-8') as f:
-                json.dump([dato], f, ensure_ascii=False, indent=4)
-        else:
-            # Leer el archivo y agregar al final
-            with ruta.open('r+', encoding='utf-8') as f:
-                # Ir al final del archivo y retroceder para quitar el ']'
-                f.seek(0, 2)  # Ir al final
-                size = f.tell()
+        with bloqueo_historial(ruta):
+            if not ruta.exists() or ruta.stat().st_size == 0:
+                # Si no existe, crear nuevo archivo
+                with ruta.open('w', encoding='utf-8') as f:
+                    json.dump(datos, f, ensure_ascii=False, indent=4)
+                    if fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            else:
+                # Leer el archivo y agregar al final
+                with ruta.open('r+', encoding='utf-8') as f:
+                    # Ir al final del archivo y retroceder para quitar el ']'
+                    f.seek(0, 2)  # Ir al final
+                    size = f.tell()
                 
-                # Retroceder hasta encontrar el ']'
-                f.seek(size - 1)
-                while f.tell() > 0:
-                    char = f.read(1)
-                    if char == ']':
-                        f.seek(f.tell() - 1)
-                        break
-                    f.seek(f.tell() - 2)
+                    # Retroceder hasta encontrar el ']'
+                    f.seek(size - 1)
+                    while f.tell() > 0:
+                        char = f.read(1)
+                        if char == ']':
+                            f.seek(f.tell() - 1)
+                            break
+                        f.seek(f.tell() - 2)
                 
-                # Determinar si necesitamos coma
-                pos = f.tell()
-                if pos > 1:
-                    f.seek(pos - 1)
-                    prev_char = f.read(1)
-                    f.seek(pos)
+                    # Determinar si necesitamos coma
+                    pos = f.tell()
+                    if pos > 1:
+                        f.seek(pos - 1)
+                        prev_char = f.read(1)
+                        f.seek(pos)
                     
-                    if prev_char != '[':
-                        f.write(',\n')
+                        if prev_char != '[':
+                            f.write(',\n')
                 
-                # Escribir el nuevo dato
-                json_str = json.dumps(dato, ensure_ascii=False, indent=4)
-                # Indentar correctamente
-                lines = json_str.split('\n')
-                indented = '\n'.join('    ' + line if line.strip() else line for line in lines)
-                f.write(indented)
-                f.write('\n]')
-
-
-            # Invalidar caché
-            _cache_global.invalidar()
+                    # Escribir los nuevos datos
+                    bloques = []
+                    for dato in datos:
+                        json_str = json.dumps(dato, ensure_ascii=False, indent=4)
+                        # Indentar correctamente
+                        lines = json_str.split('\n')
+                        bloques.append('\n'.join('    ' + line if line.strip() else line for line in lines))
+                    f.write('\n,\n'.join(bloques))
+                    f.write('\n]')
+                    f.truncate()
+
+                    if fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+
+            # No se invalida el caché: al leer detectará que el archivo creció y
+            # leerá solo los registros nuevos
             return True
     except Exception as e:
-        console.print(f'[red]Error en append: {e}[/red]')
+        _avisar(f'[red]Error en append: {e}[/red]')
         return False
-    
 
-#####################################
-###### FUNCIONES CON CACHÉ LRU ######
-#####################################
 
-@lru_cache(maxsize=128)
-def obtener_figura_mas_frecuente_cached(datos_tuple) -> str:
-    '''
-    Versión cacheada de obtener_figura_mas_frecuente    
-    :param datos_tuple: Usa tuple porque las listas no son hashables
-    :return: Descripción
-    :rtype: str
+def guardar_registro(dato: Dict, ruta: Optional[Path]=None) -> bool:
     '''
-    from collections import Counter
-    figuras = [dato['figura'] for dato in datos_tuple if 'figura' in dato]
-    if not figuras:
-        return 'ninguna'
-    contador = Counter(figuras)
-    return contador.most_common(1)[0][0]
-
-@lru_cache(maxsize=128)
-def calcular_estadisticas_cached(datos_tuple) -> Dict:
-    ''' Calcula estadisticas con caché LRU '''
-    datos = list(datos_tuple)
+    Agrega un registro al historial usando el formato que corresponde a la ruta.
 
-    areas = [
-        d.get('area', 0)
-        for d in datos 
-        if isinstance(d.get('area'), (int, float))
-    ]
+    :param dato: Diccionario con los datos a guardar
+    :type dato: Dict
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :return: True si se guardo correctamente, False en caso contrario.
+    :rtype: bool
+    '''
+    return guardar_registros([dato], ruta)
 
-    if not areas:
-        return {
-            'total_calculos': len(datos),
-            'area_promedio': 0,
-            'area_maxima': 0,
-            'area_minima': 0,
-            'figura_mas_calculada': 'ninguna'
-        }
-    
-    return {
-            'total_calculos': len(datos),
-            'area_promedio': sum(areas) / len(areas),
-            'area_maxima': max(areas),
-            'area_minima': min(areas),
-            'figura_mas_calculada': obtener_figura_mas_frecuente_cached(datos_tuple)
-    }
 
+@cronometrado('historial_segundos', operacion='escritura')
+def guardar_registros(datos: List[Dict], ruta: Optional[Path]=None, fsync: bool=False) -> bool:
+    '''
+    Agrega varios registros al historial en una sola operación de escritura.
+
+    :param datos: Lista de diccionarios a guardar
+    :type datos: List[Dict]
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :param fsync: Si True, fuerza la escritura a disco antes de retornar
+    :type fsync: bool
+    :return: True si se guardo correctamente, False en caso contrario.
+    :rtype: bool
+    '''
+    ruta = ruta or ruta_historial()
 
+    # La huella previa, la escritura y las estadísticas van bajo el mismo
+    # bloqueo para que otro proceso no escriba entre medias
+    with bloqueo_historial(ruta):
+        huella_previa = huella_historial(ruta)
 
-##################################
-###### FUNCIONES AUXILIARES ######
-##################################
+        if es_jsonl(ruta):
+            ok = guardar_jsonl_append_lote(datos, ruta, fsync=fsync)
+        elif es_sqlite(ruta):
+            ok = guardar_sqlite_lote(datos, ruta, fsync=fsync)
+        else:
+            ok = guardar_json_append_lote(datos, ruta, fsync=fsync)
 
-def obtener_fecha() -> str:
-    ''' Retorna la fecha y la hora actual formateada '''
-    return datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+        if ok:
+            incrementar('registros_escritos_total', len(datos))
+            _actualizar_estadisticas(datos, ruta, huella_previa)
+            _actualizar_indice(ruta)
+            if (_rotar_bytes is not None or _rotar_diario) and not es_sqlite(ruta):
+                _rotar(ruta, _rotar_bytes, _rotar_diario)
+    return ok
 
 
-def registrar_resultado(**kwargs):
-    ''' Registra un resultado de cálcudo en el JSON '''
-    dato = {'fecha': obtener_fecha(), **kwargs}
-    return guardar_json_append(dato)
+def _nueva_generacion() -> None:
+    ''' Marca que el historial ha cambiado (ver version_historial) '''
+    global _generacion
+    _generacion += 1
 
 
-def datos_a_tuple(datos: List[dict]) -> tuple:
-    ''' Convierte lista de diccionarios a tupla para usar con caché '''
+################################
+###### SISTEMA JSON LINES ######
+################################
 
-    def dict_to_tuple(d):
-        ''' Convierte un diccionario (inclucso con valores anidaddos) a tupla '''
-        items = []
-        for k, v in sorted(d.items()):
-            if isinstance(v, dict):
-                items.append((k, dict_to_tuple(v)))
-            elif isinstance(v, list):
-                items.append((k, tuple(v)))
-            else:
-                items.append((k, v))
-        return tuple(items)
-    
-    try:
-        return tuple(dict_to_tuple(d) for d in datos)
-    except (TypeError, AttributeError):
-        # Si falla la conversión, usar un hash simple basado en el JSON string
-        import hashlib
-        json_str = json.dumps(datos, sort_keys=True)
-        return (hashlib.md5(json_str.encode()).hexdigest(),)
-    
+def guardar_jsonl_append(dato: Dict, ruta: Path=ARCHIVO_JSONL) -> bool:
+    '''
+    Agrega un registro como una línea nueva al final del archivo (O(1)).
 
+    :param dato: Diccionario con los datos a guardar
+    :type dato: Dict
+    :param ruta: Ruta al archivo JSON Lines
+    :type ruta: Path
+    :return: True si se guardo correctamente, False en caso contrario.
+    :rtype: bool
+    '''
+    return guardar_jsonl_append_lote([dato], ruta)
 
-########################################
-###### FUNCIONES DE VISUALIZACIÓN ######
-########################################
 
-def mostrar_json(limite: Optional[int]=None) -> None:
-    '''
-    Muestra todos los datos del JSON con Rich en formato tabla
-    
-    :param limite: Si se especifica, muestra solo los últimos n registros
-    :type limite: Optional[int]
+def guardar_jsonl_append_lote(datos: List[Dict], ruta: Path=ARCHIVO_JSONL, fsync: bool=False) -> bool:
     '''
+    Agrega varios registros, uno por línea, con una única escritura.
 
-    datos = cargar_json()
-
+    :param datos: Lista de diccionarios a guardar
+    :type datos: List[Dict]
+    :param ruta: Ruta al archivo JSON Lines
+    :type ruta: Path
+    :param fsync: Si True, fuerza la escritura a disco antes de retornar
+    :type fsync: bool
+    :return: True si se guardo correctamente, False en caso contrario.
+    :rtype: bool
+    '''
     if not datos:
-        console.print(Panel(
-            '[yellow]📂 No hay datos guardados aún.[/yellow]',
-            title='Historial vacío',
-            border_style='yellow'
-        ))
-        return
-    
-    # Aplicar límite si se especifica
-    if limite and len(datos) > limite:
-        datos_mostrar = datos[-limite:]
-        titulo = f'📊 ÚLTIMOS {limite} CÁLCULOS (de {len(datos)} totales)'
-    else:
-        datos_mostrar = datos
-        titulo = f'📊 HISTORIAL DE CÁLCULOS ({len(datos)} registros)'
-
-    # Crear tabla
-    table = Table(
-        title=titulo,
-        title_style='bold cyan',
-        box=box.ROUNDED,
-        show_header=True,
-        header_style='bold magenta',
-        border_style='cyan',
-        expand=False
-    )
-
-    # Añadir columnas
-    table.add_column('#', style='yellow', justify='right', width=4)
-    table.add_column('Fecha', style='cyan', width=17)
-    table.add_column('Figura', style='green', width=20)
-    table.add_column('Área', style='bold blue',justify='right', width=12)
-    table.add_column('Parámetros', style='magenta', width=40)
-
-    # Añadir filas
-    inicio = len(datos) - len(datos_mostrar) + 1
-    for i, registro in enumerate(datos_mostrar, inicio):
-        fecha = registro.get('fecha', 'N/D')
-        figura = registro.get('figura', 'desconocida')
-        area = registro.get('area', 'N/D')
-        params = registro.get('parametros', {})
-
-        # Formatear parámetros
-        if isinstance(params, dict):
-            params_str = '\n'.join([f'{k}: {v}' for k, v in params.items()])
-        else:
-            params_str = str(params)
-
-        # Formatear área
-        area_str = f'{area:.2f}' if isinstance(area, (int, float)) else str(area)
+        return True
 
-        table.add_row(
-            str(i),
-            fecha,
-            figura.replace('_', ' ').title(),
-            area_str,
-            params_str
+    try:
+        texto = ''.join(
+            json.dumps(dato, ensure_ascii=False, separators=(',', ':')) + '\n'
+            for dato in datos
         )
-    
-    console.print(table)
+        with bloqueo_historial(ruta), ruta.open('a', encoding='utf-8') as f:
+            f.write(texto)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        return True
+    except Exception as e:
+        _avisar(f'[red]Error en append: {e}[/red]')
+        return False
 
-    # Mostrar estadísticas (usando caché)
-    mostrar_estadisticas_resumidas(datos)
 
+def iterar_jsonl(ruta: Path=ARCHIVO_JSONL) -> Iterator[Dict]:
+    '''
+    Lee un archivo JSON Lines registro a registro, sin cargarlo entero en memoria.
+    Las líneas vacías o incompletas (p. ej. una escritura interrumpida) se ignoran.
 
-def mostrar_estadisticas_resumidas(datos: List[Dict]) -> None:
-    ''' Muestras estadísticas resumidas usando caché '''
-    if not datos:
+    :param ruta: Ruta al archivo JSON Lines
+    :type ruta: Path
+    :return: Iterador de diccionarios
+    :rtype: Iterator[Dict]
+    '''
+    if not ruta.exists():
         return
-    
-    try:
-        # Convertir datos a tuple para usar caché
-        datos_tuple = datos_a_tuple(datos)
-        stats = calcular_estadisticas_cached(datos_tuple)
-    except Exception as e:
-        # Si falla el caché, calcular sin caché
-        console.print(f'[dim yellow]Calculando sin caché...[/dim yellow]')
-        stats = calcular_estadisticas_sin_cache(datos)
-
-    # Crear tabla de estadísticas
-    stats_table = Table(
-        title='📈 Estadísticas',
-        box=box.SIMPLE,
-        show_header=False,
-        border_style='green',
-        expand=False
-    )    
+    with ruta.open('r', encoding='utf-8') as f:
+        for linea in f:
+            if not linea.strip():
+                continue
+            try:
+                yield json.loads(linea)
+            except json.JSONDecodeError:
+                continue
 
-    stats_table.add_column(style='cyan')
-    stats_table.add_column(style='yellow', justify='right')
 
-    stats_table.add_row('Total de cálculos:', str(stats['total_calculos']))
-
-    if stats['area_promedio'] > 0:
-        stats_table.add_row('Área promedio:', f'{stats["area_promedio"]:.2f}')
-        stats_table.add_row('Área máxima:', f'{stats["area_maxima"]:.2f}')
-        stats_table.add_row('Área mínima:', f'{stats["area_minima"]:.2f}')
+def iterar_json_array(ruta: Path=ARCHIVO_JSON, tam_bloque: int=65536) -> Iterator[Dict]:
+    '''
+    Lee un archivo con formato de array JSON elemento a elemento, por bloques,
+    sin decodificar el archivo completo de una vez.
 
-    stats_table.add_row(
-        'Figura más calculada',
-        stats['figura_mas_calculada'].replace('_', ' ').title()
-    )
-    console.print('\n')
-    console.print(stats_table)
+    :param ruta: Ruta al archivo JSON
+    :type ruta: Path
+    :param tam_bloque: Tamaño en caracteres de cada bloque leído
+    :type tam_bloque: int
+    :return: Iterador de diccionarios
+    :rtype: Iterator[Dict]
+    '''
+    if not ruta.exists():
+        return
+    decoder = json.JSONDecoder()
+    with ruta.open('r', encoding='utf-8') as f:
+        buffer = ''
+        fin = False
+        while True:
+            # Saltar espacios, comas y los corchetes del array
+            buffer = buffer.lstrip(' \t\r\n,[')
+            if buffer.startswith(']'):
+                return
+            if not buffer:
+                if fin:
+                    return
+                bloque = f.read(tam_bloque)
+                fin = not bloque
+                buffer += bloque
+                continue
+            try:
+                dato, pos = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # Objeto incompleto: leer otro bloque
+                if fin:
+                    return
+                bloque = f.read(tam_bloque)
+                fin = not bloque
+                buffer += bloque
+                continue
+            buffer = buffer[pos:]
+            yield dato
+
+
+def iterar_historial(ruta: Optional[Path]=None) -> Iterator[Dict]:
+    '''
+    Recorre el historial en streaming, sea cual sea su formato.
+
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :return: Iterador de diccionarios
+    :rtype: Iterator[Dict]
+    '''
+    ruta = ruta or ruta_historial()
+    if es_jsonl(ruta):
+        return iterar_jsonl(ruta)
+    if es_sqlite(ruta):
+        return iterar_sqlite(ruta)
+    return iterar_json_array(ruta)
+
+
+def migrar_json_a_jsonl(origen: Path=ARCHIVO_JSON, destino: Path=ARCHIVO_JSONL, sobrescribir: bool=False) -> int:
+    '''
+    Convierte un historial en formato array JSON a JSON Lines en una sola pasada.
+    Escribe en un archivo temporal y lo renombra al terminar, de modo que el
+    destino nunca queda a medias.
+
+    :param origen: Historial en formato array JSON
+    :type origen: Path
+    :param destino: Archivo JSON Lines a crear
+    :type destino: Path
+    :param sobrescribir: Si False y el destino ya tiene datos, lanza FileExistsError
+    :type sobrescribir: bool
+    :return: Número de registros migrados
+    :rtype: int
+    '''
+    if not origen.exists():
+        raise FileNotFoundError(f'No existe el historial {origen}')
+    if destino.exists() and destino.stat().st_size > 0 and not sobrescribir:
+        raise FileExistsError(f'El destino {destino} ya contiene datos')
+
+    # Con el bloqueo compartido: un escritor no puede reescribir el array a mitad de la lectura
+    flush()
+    temporal = destino.with_name(destino.name + '.tmp')
+    total = 0
+    with bloqueo_historial(origen, compartido=True), temporal.open('w', encoding='utf-8') as f:
+        for dato in iterar_json_array(origen):
+            f.write(json.dumps(dato, ensure_ascii=False, separators=(',', ':')) + '\n')
+            total += 1
+    os.replace(temporal, destino)
+    _cache_global.invalidar()
+    _nueva_generacion()
+    return total
+
+
+def migrar_historial(origen: Path, destino: Path, tam_lote: int=10000) -> int:
+    '''
+    Copia un historial a otro formato (JSON, JSON Lines o SQLite) en streaming.
+    El formato de cada lado se deduce de la extensión de la ruta.
+
+    :param origen: Historial de origen
+    :type origen: Path
+    :param destino: Historial de destino (se agregan los registros al final)
+    :type destino: Path
+    :param tam_lote: Registros por escritura
+    :type tam_lote: int
+    :return: Número de registros migrados
+    :rtype: int
+    '''
+    if not origen.exists():
+        raise FileNotFoundError(f'No existe el historial {origen}')
+    if os.path.abspath(origen) == os.path.abspath(destino):
+        raise ValueError(f'El origen y el destino son el mismo historial: {origen}')
+
+    flush()
+    total = 0
+    lote: List[Dict] = []
+    with bloqueo_historial(origen, compartido=True):
+        for dato in iterar_historial(origen):
+            lote.append(dato)
+            if len(lote) >= tam_lote:
+                guardar_registros(lote, destino)
+                total += len(lote)
+                lote = []
+        guardar_registros(lote, destino)
+    total += len(lote)
+    return total
+
+
+def _con_epoch(dato: Any) -> Optional[Dict]:
+    ''' Copia del registro con 'epoch' justo después de 'fecha', o None si ya lo tiene o la fecha no es válida '''
+    if not isinstance(dato, Mapping) or isinstance(dato.get('epoch'), (int, float)):
+        return None
+    epoch = fecha_a_epoch(dato.get('fecha'))
+    if math.isnan(epoch):
+        return None
+    nuevo = {}
+    for clave, valor in dato.items():
+        nuevo[clave] = valor
+        if clave == 'fecha':
+            nuevo['epoch'] = int(epoch)
+    return nuevo
+
+
+def migrar_epoch(ruta: Optional[Path]=None) -> int:
+    '''
+    Añade la columna 'epoch' a los registros anteriores a ella, calculada una
+    sola vez a partir de su fecha. 'fecha' se conserva para mostrarla.
+
+    JSON y JSON Lines se reescriben en streaming a un archivo temporal que
+    reemplaza al historial, con el bloqueo tomado; en JSON Lines las líneas
+    que no cambian (o no se pueden leer) se copian tal cual. SQLite se migra
+    solo al conectar (ver conectar_sqlite). Los segmentos archivados no se
+    reescriben: sus registros sin epoch se siguen convirtiendo al leerlos.
+
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :return: Número de registros actualizados
+    :rtype: int
+    '''
+    ruta = ruta or ruta_historial()
+    if not ruta.exists():
+        raise FileNotFoundError(f'No existe el historial {ruta}')
+    flush()
+
+    if es_sqlite(ruta):
+        _sqlite_con_epoch.add(ruta)     # la migración se hace aquí y no al conectar
+        conexion = conectar_sqlite(ruta)
+        try:
+            actualizados = _migrar_epoch_sqlite(conexion)
+        finally:
+            conexion.close()
+        _cache_global.invalidar()
+        _nueva_generacion()
+        return actualizados
+
+    actualizados = 0
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    # Las estadísticas se recalculan con los registros leídos bajo el bloqueo:
+    # obtener_estadisticas haría flush(), y el escritor diferido necesita este bloqueo
+    stats = EstadisticasIncrementales()
+    with bloqueo_historial(ruta):
+        with temporal.open('w', encoding='utf-8') as f:
+            if es_jsonl(ruta):
+                with ruta.open('r', encoding='utf-8') as origen:
+                    for linea in origen:
+                        nuevo = None
+                        if linea.strip():
+                            try:
+                                dato = json.loads(linea)
+                            except json.JSONDecodeError:
+                                pass
+                            else:
+                                stats.agregar(dato)
+                                nuevo = _con_epoch(dato)
+                        if nuevo is None:
+                            f.write(linea)
+                            continue
+                        f.write(json.dumps(nuevo, ensure_ascii=False, separators=(',', ':')) + '\n')
+                        actualizados += 1
+            else:
+                # Mismo formato que json.dump(datos, indent=4), pero sin cargar el historial
+                separador = '[\n'
+                for dato in iterar_json_array(ruta):
+                    stats.agregar(dato)
+                    nuevo = _con_epoch(dato)
+                    if nuevo is not None:
+                        dato = nuevo
+                        actualizados += 1
+                    texto = json.dumps(dato, ensure_ascii=False, indent=4)
+                    f.write(separador + '\n'.join('    ' + linea for linea in texto.split('\n')))
+                    separador = ',\n'
+                f.write('\n]' if separador == ',\n' else '[]')
+
+        if not actualizados:
+            temporal.unlink()
+            return 0
+        os.replace(temporal, ruta)
+
+        # Cambian las posiciones pero no el contenido: las estadísticas se conservan
+        _cache_global.invalidar()
+        with _columnar_lock:
+            _columnar_global.pop(ruta, None)
+        descartar_indice(ruta)
+        huella = huella_historial(ruta)
+        with _estadisticas_lock:
+            _estadisticas_global[ruta] = (stats, huella)
+            _guardar_estadisticas(stats, ruta, huella)
+        _nueva_generacion()
+    return actualizados
+
+
+############################
+###### SISTEMA SQLITE ######
+############################
+
+# Columnas propias; el resto de campos del registro se guardan en 'parametros'
+_SQL_ESQUEMA = (
+    '''CREATE TABLE IF NOT EXISTS historial (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fecha TEXT,
+        epoch INTEGER,
+        figura TEXT,
+        area REAL,
+        parametros TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_historial_figura ON historial (figura)',
+    'CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial (fecha)',
+    'CREATE INDEX IF NOT EXISTS idx_historial_area ON historial (area)',
+)
+
+# Bases de datos ya comprobadas (o migradas) con la columna epoch en este proceso
+_sqlite_con_epoch: set = set()
+
+
+def es_sqlite(ruta: Path) -> bool:
+    ''' Indica si la ruta corresponde a un historial SQLite '''
+    return ruta.suffix in ('.db', '.sqlite', '.sqlite3')
+
+
+def conectar_sqlite(ruta: Path=ARCHIVO_SQLITE):
+    '''
+    Abre una conexión al historial SQLite, creando tabla e índices si faltan.
+
+    :param ruta: Ruta a la base de datos
+    :type ruta: Path
+    :return: Conexión con row_factory sqlite3.Row
+    :rtype: sqlite3.Connection
+    '''
+    import sqlite3
+
+    conexion = sqlite3.connect(str(ruta))
+    conexion.row_factory = sqlite3.Row
+    for sentencia in _SQL_ESQUEMA:
+        conexion.execute(sentencia)
+    if ruta not in _sqlite_con_epoch:
+        _migrar_epoch_sqlite(conexion)
+        _sqlite_con_epoch.add(ruta)
+    return conexion
+
+
+def _migrar_epoch_sqlite(conexion) -> int:
+    '''
+    Añade la columna epoch a una base de datos anterior a ella y la rellena
+    a partir de la fecha (una sola vez). Retorna cuántas filas rellenó.
+    '''
+    columnas = {fila['name'] for fila in conexion.execute('PRAGMA table_info(historial)')}
+    rellenadas = 0
+    with conexion:
+        if 'epoch' not in columnas:
+            conexion.execute('ALTER TABLE historial ADD COLUMN epoch INTEGER')
+        pendientes = conexion.execute('SELECT id, fecha FROM historial WHERE epoch IS NULL').fetchall()
+        cambios = []
+        for fila in pendientes:
+            epoch = fecha_a_epoch(fila['fecha'])
+            if not math.isnan(epoch):
+                cambios.append((int(epoch), fila['id']))
+        if cambios:
+            conexion.executemany('UPDATE historial SET epoch = ? WHERE id = ?', cambios)
+            rellenadas = len(cambios)
+        conexion.execute('CREATE INDEX IF NOT EXISTS idx_historial_epoch ON historial (epoch)')
+    return rellenadas
+
+
+def _fila_a_dato(fila) -> Dict:
+    ''' Convierte una fila de SQLite al diccionario usado en el historial '''
+    dato = {'fecha': fila['fecha']}
+    if fila['epoch'] is not None:
+        dato['epoch'] = fila['epoch']
+    dato.update({
+        'figura': fila['figura'],
+        'area': fila['area'],
+        'parametros': json.loads(fila['parametros']) if fila['parametros'] else {}
+    })
+    return dato
+
+
+def _epoch_columna(dato: Dict) -> Optional[int]:
+    ''' Valor de la columna epoch para un registro (None si no tiene fecha válida) '''
+    epoch = epoch_registro(dato)
+    return None if math.isnan(epoch) else int(epoch)
+
+
+def guardar_sqlite_lote(datos: List[Dict], ruta: Path=ARCHIVO_SQLITE, fsync: bool=False) -> bool:
+    '''
+    Inserta varios registros en una única transacción.
+
+    :param datos: Lista de diccionarios a guardar
+    :type datos: List[Dict]
+    :param ruta: Ruta a la base de datos
+    :type ruta: Path
+    :param fsync: Si True, usa synchronous=FULL; si no, NORMAL
+    :type fsync: bool
+    :return: True si se guardo correctamente, False en caso contrario.
+    :rtype: bool
+    '''
+    if not datos:
+        return True
+
+    try:
+        conexion = conectar_sqlite(ruta)
+        try:
+            conexion.execute(f'PRAGMA synchronous = {"FULL" if fsync else "NORMAL"}')
+            with conexion:
+                conexion.executemany(
+                    'INSERT INTO historial (fecha, epoch, figura, area, parametros) VALUES (?, ?, ?, ?, ?)',
+                    [
+                        (
+                            dato.get('fecha'),
+                            _epoch_columna(dato),
+                            dato.get('figura'),
+                            dato.get('area'),
+                            json.dumps(dato.get('parametros', {}), ensure_ascii=False)
+                        )
+                        for dato in datos
+                    ]
+                )
+        finally:
+            conexion.close()
+        return True
+    except Exception as e:
+        _avisar(f'[red]Error en append: {e}[/red]')
+        return False
+
+
+def iterar_sqlite(ruta: Path=ARCHIVO_SQLITE, hasta_id: Optional[int]=None) -> Iterator[Dict]:
+    '''
+    Recorre el historial SQLite en orden de inserción sin cargarlo entero.
+
+    :param ruta: Ruta a la base de datos
+    :type ruta: Path
+    :param hasta_id: Si se indica, solo hasta ese id (incluido)
+    :type hasta_id: Optional[int]
+    :return: Iterador de diccionarios
+    :rtype: Iterator[Dict]
+    '''
+    if not ruta.exists():
+        return
+    conexion = conectar_sqlite(ruta)
+    try:
+        if hasta_id is None:
+            filas = conexion.execute('SELECT fecha, epoch, figura, area, parametros FROM historial ORDER BY id')
+        else:
+            filas = conexion.execute(
+                'SELECT fecha, epoch, figura, area, parametros FROM historial WHERE id <= ? ORDER BY id', (hasta_id,)
+            )
+        for fila in filas:
+            yield _fila_a_dato(fila)
+    finally:
+        conexion.close()
+
+
+def ultimo_id_sqlite(ruta: Path=ARCHIVO_SQLITE) -> int:
+    ''' Id del último registro (0 si está vacío) '''
+    conexion = conectar_sqlite(ruta)
+    try:
+        return conexion.execute('SELECT MAX(id) FROM historial').fetchone()[0] or 0
+    finally:
+        conexion.close()
+
+
+##########################################
+###### CONSULTAS SOBRE EL HISTORIAL ######
+##########################################
+
+# Con SQLite las resuelve la base de datos usando los índices; con JSON y
+# JSON Lines se calculan sobre la lista cargada por cargar_json o, en las
+# búsquedas, con el índice del historial (ver obtener_indice). Los últimos
+# registros se leen desde el final del archivo (leer_ultimos_registros).
+
+@cronometrado('historial_segundos', operacion='conteo')
+def contar_registros(ruta: Optional[Path]=None) -> int:
+    ''' Número total de registros del historial '''
+    ruta = ruta or ruta_historial()
+    flush()
+    if es_sqlite(ruta):
+        if not ruta.exists():
+            return 0
+        conexion = conectar_sqlite(ruta)
+        try:
+            return conexion.execute('SELECT COUNT(*) FROM historial').fetchone()[0]
+        finally:
+            conexion.close()
+    archivados = sum(e['registros'] for e in cargar_manifiesto(ruta) if not e['compactado'])
+    if not ruta.exists():
+        return archivados
+    return archivados + len(obtener_indice(ruta))
+
+
+@cronometrado('historial_segundos', operacion='pagina')
+def leer_pagina(inicio: int, cantidad: int, ruta: Optional[Path]=None) -> List[Dict]:
+    '''
+    Registros número inicio..inicio+cantidad-1 (desde 0, en orden cronológico).
+    Solo lee esos registros: con JSON y JSON Lines salta a su posición en el
+    archivo usando el índice; con SQLite usa LIMIT/OFFSET. Los segmentos
+    archivados (ver rotar_historial) van antes que el historial activo y se
+    leen en streaming hasta la página, porque gzip no permite saltar.
+
+    :param inicio: Número del primer registro
+    :type inicio: int
+    :param cantidad: Número de registros
+    :type cantidad: int
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :rtype: List[Dict]
+    '''
+    ruta = ruta or ruta_historial()
+    flush()
+    if cantidad <= 0:
+        return []
+    inicio = max(0, inicio)
+    if es_sqlite(ruta):
+        if not ruta.exists():
+            return []
+        conexion = conectar_sqlite(ruta)
+        try:
+            filas = conexion.execute(
+                'SELECT fecha, epoch, figura, area, parametros FROM historial ORDER BY id LIMIT ? OFFSET ?',
+                (cantidad, inicio)
+            ).fetchall()
+        finally:
+            conexion.close()
+        return [_fila_a_dato(fila) for fila in filas]
+
+    registros = []
+    for entrada in cargar_manifiesto(ruta):
+        if entrada['compactado']:
+            continue
+        if inicio < entrada['registros'] and len(registros) < cantidad:
+            registros += islice(iterar_segmento(ruta, entrada), inicio, inicio + cantidad - len(registros))
+        inicio = max(0, inicio - entrada['registros'])
+    if len(registros) < cantidad and ruta.exists():
+        fin = inicio + cantidad - len(registros)
+        registros += leer_registros_en(ruta, obtener_indice(ruta).posiciones(inicio, fin))
+    return registros
+
+
+@cronometrado('historial_segundos', operacion='ultimos')
+def ultimos_registros(n: int, ruta: Optional[Path]=None) -> Sequence:
+    ''' Los últimos n registros del historial, en orden cronológico (solo lectura) '''
+    ruta = ruta or ruta_historial()
+    flush()
+    if n <= 0:
+        return []
+    if es_sqlite(ruta):
+        if not ruta.exists():
+            return []
+        conexion = conectar_sqlite(ruta)
+        try:
+            filas = conexion.execute(
+                'SELECT fecha, epoch, figura, area, parametros FROM historial ORDER BY id DESC LIMIT ?', (n,)
+            ).fetchall()
+        finally:
+            conexion.close()
+        return [_fila_a_dato(fila) for fila in reversed(filas)]
+    try:
+        ultimos = leer_ultimos_registros(ruta, n)
+    except ValueError:
+        # Array dañado o a medio reparar: cargar_json sabe recuperarlo
+        ultimos = list(cargar_json(ruta, solo_lectura=True)[-n:])
+
+    # Si el historial activo no llega a n, se completa con los segmentos archivados
+    for entrada in reversed(cargar_manifiesto(ruta)):
+        if len(ultimos) >= n:
+            break
+        ultimos = ultimos_de_segmento(ruta, entrada, n - len(ultimos)) + ultimos
+    return ultimos
+
+
+def buscar_registros(figura: str, ruta: Optional[Path]=None) -> List[Dict]:
+    ''' Registros de una figura concreta, en orden cronológico '''
+    return consultar_historial(figura=figura, ruta=ruta)
+
+
+def _a_epoch(momento: Union[datetime, float, str, None]) -> Optional[float]:
+    '''
+    Segundos epoch de un límite de fecha: datetime, número o texto
+    ('dd/mm/aaaa', 'dd/mm/aaaa HH:MM:SS' o ISO 'aaaa-mm-dd[THH:MM:SS]').
+    '''
+    if isinstance(momento, datetime):
+        return momento.timestamp()
+    if isinstance(momento, str):
+        texto = momento.strip()
+        for formato in (FORMATO_FECHA, '%d/%m/%Y'):
+            try:
+                return datetime.strptime(texto, formato).timestamp()
+            except ValueError:
+                pass
+        try:
+            return datetime.fromisoformat(texto).timestamp()
+        except ValueError:
+            raise ValueError(f'Fecha no válida: {momento!r}. Usa dd/mm/aaaa [HH:MM:SS] o aaaa-mm-dd') from None
+    return momento
+
+
+@cronometrado('historial_segundos', operacion='consulta')
+def consultar_historial(
+        figura: Optional[str]=None,
+        area_min: Optional[float]=None,
+        area_max: Optional[float]=None,
+        desde: Union[datetime, float, str, None]=None,
+        hasta: Union[datetime, float, str, None]=None,
+        ruta: Optional[Path]=None) -> List[Dict]:
+    '''
+    Registros que cumplen todos los filtros indicados, en orden cronológico.
+    Por ejemplo, los círculos con área entre 100 y 500 de la última semana:
+
+        consultar_historial('circulo', 100, 500, desde=datetime.now() - timedelta(days=7))
+
+    Con JSON y JSON Lines usa el índice del historial (búsqueda binaria) y
+    lee del archivo solo los registros encontrados; con SQLite, sus índices.
+    Los segmentos archivados se recorren solo si su rango de fechas, áreas y
+    figuras (guardado en el manifiesto) puede contener resultados.
+
+    :param figura: Nombre de la figura
+    :param area_min: Área mínima (incluida)
+    :param area_max: Área máxima (incluida)
+    :param desde: Fecha mínima (datetime, segundos epoch o texto, ver _a_epoch)
+    :param hasta: Fecha máxima (datetime, segundos epoch o texto, ver _a_epoch)
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :rtype: List[Dict]
+    '''
+    ruta = ruta or ruta_historial()
+    flush()
+    figura = figura.lower().strip() if figura is not None else None
+    desde, hasta = _a_epoch(desde), _a_epoch(hasta)
+
+    if es_sqlite(ruta):
+        if not ruta.exists():
+            return []
+        condiciones, valores = [], []
+        for condicion, valor in (
+                ('figura = ?', figura), ('area >= ?', area_min), ('area <= ?', area_max),
+                ('epoch >= ?', desde), ('epoch <= ?', hasta)):
+            if valor is not None:
+                condiciones.append(condicion)
+                valores.append(valor)
+        where = f'WHERE {" AND ".join(condiciones)}' if condiciones else ''
+        conexion = conectar_sqlite(ruta)
+        try:
+            filas = conexion.execute(
+                f'SELECT fecha, epoch, figura, area, parametros FROM historial {where} ORDER BY id', valores
+            ).fetchall()
+        finally:
+            conexion.close()
+        return [_fila_a_dato(fila) for fila in filas]
+
+    filtros = (figura, area_min, area_max, desde, hasta)
+    resultados = []
+    for entrada in cargar_manifiesto(ruta):
+        if puede_contener(entrada, *filtros):
+            resultados += (r for r in iterar_segmento(ruta, entrada) if _cumple_filtros(r, *filtros))
+    if not ruta.exists():
+        return resultados
+
+    try:
+        # IndiceHistorial.consultar es lo que importa NumPy
+        posiciones = obtener_indice(ruta).consultar(*filtros)
+    except ImportError:     # sin NumPy: recorrido completo
+        posiciones = None
+    if posiciones is not None:
+        return resultados + leer_registros_en(ruta, posiciones)
+
+    resultados += (r for r in iterar_historial(ruta) if _cumple_filtros(r, *filtros))
+    return resultados
+
+
+def _cumple_filtros(
+        registro: Any,
+        figura: Optional[str],
+        area_min: Optional[float],
+        area_max: Optional[float],
+        desde: Optional[float],
+        hasta: Optional[float]) -> bool:
+    ''' Comprobación registro a registro de los filtros de consultar_historial '''
+    if not isinstance(registro, Mapping):
+        return False
+    area = registro.get('area')
+    if figura is not None and str(registro.get('figura', '')).lower() != figura:
+        return False
+    if (area_min is not None or area_max is not None) and not isinstance(area, (int, float)):
+        return False
+    if (area_min is not None and area < area_min) or (area_max is not None and area > area_max):
+        return False
+    if (desde is not None or hasta is not None) and not _en_ventana(epoch_registro(registro), desde, hasta):
+        return False
+    return True
+
+
+def _en_ventana(epoch: float, desde: Optional[float], hasta: Optional[float]) -> bool:
+    ''' Si una fecha (epoch, NaN si no es válida) cae entre desde y hasta '''
+    return not ((desde is not None and not epoch >= desde) or (hasta is not None and not epoch <= hasta))
+
+
+def estadisticas_historial(ruta: Optional[Path]=None) -> Dict:
+    ''' Estadísticas resumidas del historial (mismas claves que calcular_estadisticas_cached) '''
+    ruta = ruta or ruta_historial()
+    if not es_sqlite(ruta):
+        if cargar_manifiesto(ruta):
+            return estadisticas_completas(ruta).resumen()
+        return cargar_columnar(ruta).estadisticas()
+
+    vacio = {
+        'total_calculos': 0,
+        'area_promedio': 0,
+        'area_maxima': 0,
+        'area_minima': 0,
+        'figura_mas_calculada': 'ninguna'
+    }
+    if not ruta.exists():
+        return vacio
+
+    conexion = conectar_sqlite(ruta)
+    try:
+        total, promedio, maxima, minima = conexion.execute(
+            'SELECT COUNT(*), AVG(area), MAX(area), MIN(area) FROM historial'
+        ).fetchone()
+        fila = conexion.execute(
+            'SELECT figura FROM historial WHERE figura IS NOT NULL '
+            'GROUP BY figura ORDER BY COUNT(*) DESC, MIN(id) LIMIT 1'
+        ).fetchone()
+    finally:
+        conexion.close()
+
+    if not total:
+        return vacio
+    return {
+        'total_calculos': total,
+        'area_promedio': promedio or 0,
+        'area_maxima': maxima or 0,
+        'area_minima': minima or 0,
+        'figura_mas_calculada': fila[0] if fila else 'ninguna'
+    }
+
+
+################################
+###### ESCRITURA DIFERIDA ######
+################################
+
+class EscritorDiferido:
+    '''
+    Cola de escritura diferida para el historial.
+
+    Los registros se encolan y un hilo en segundo plano los escribe por lotes
+    cuando se alcanza tam_lote, cuando pasan intervalo segundos desde el primer
+    registro pendiente, al llamar a flush() o al terminar el intérprete.
+    Si la cola está llena, agregar() bloquea (contrapresión) hasta que haya hueco.
+    '''
+
+    _FLUSH = object()
+    _CERRAR = object()
+
+    def __init__(
+            self,
+            ruta: Optional[Path]=None,
+            tam_lote: int=500,
+            intervalo: float=1.0,
+            max_pendientes: int=10000,
+            fsync: bool=False):
+        import atexit
+        import queue
+
+        self.ruta = ruta
+        self.tam_lote = tam_lote
+        self.intervalo = intervalo
+        self.fsync = fsync
+        self.escritos = 0
+        self.errores = 0
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._cerrado = False
+        self._hilo = threading.Thread(target=self._bucle, name='escritor-historial', daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+
+    def agregar(self, dato: Dict, timeout: Optional[float]=None) -> None:
+        '''
+        Encola un registro. Bloquea si la cola está llena.
+
+        :param timeout: Segundos máximos de espera; si se agotan lanza queue.Full
+        '''
+        if self._cerrado:
+            raise RuntimeError('El escritor diferido está cerrado')
+        self._cola.put(dato, timeout=timeout)
+
+
+    def pendientes(self) -> int:
+        ''' Número aproximado de registros en cola '''
+        return self._cola.qsize()
+
+
+    def flush(self) -> None:
+        ''' Escribe todo lo pendiente y espera a que termine '''
+        if self._cerrado:
+            return
+        self._cola.put(self._FLUSH)
+        self._cola.join()
+
+
+    def cerrar(self) -> None:
+        ''' Escribe lo pendiente y detiene el hilo '''
+        if self._cerrado:
+            return
+        self._cola.put(self._CERRAR)
+        self._cola.join()
+        self._cerrado = True
+        self._hilo.join()
+
+
+    def _escribir(self, lote: List[Dict]) -> None:
+        '''
+        Escribe un lote y marca sus elementos como procesados, aunque la
+        escritura falle: si el hilo muriera, flush() y cerrar() no volverían nunca.
+        '''
+        try:
+            if lote:
+                if guardar_registros(lote, self.ruta, fsync=self.fsync):
+                    self.escritos += len(lote)
+                else:
+                    self.errores += len(lote)
+        except Exception as e:
+            self.errores += len(lote)
+            _avisar(f'[red]Error en la escritura diferida: {e}[/red]')
+        finally:
+            for _ in lote:
+                self._cola.task_done()
+            lote.clear()
+
+
+    def _bucle(self) -> None:
+        ''' Hilo de fondo: agrupa registros y los escribe por lotes '''
+        import queue
+        import time
+
+        lote: List[Dict] = []
+        limite = None
+        while True:
+            espera = None if limite is None else max(0.0, limite - time.monotonic())
+            try:
+                dato = self._cola.get(timeout=espera)
+            except queue.Empty:
+                # Se cumplió el intervalo desde el primer registro pendiente
+                self._escribir(lote)
+                limite = None
+                continue
+
+            if dato is self._FLUSH or dato is self._CERRAR:
+                self._escribir(lote)
+                limite = None
+                self._cola.task_done()
+                if dato is self._CERRAR:
+                    return
+                continue
+
+            lote.append(dato)
+            if limite is None:
+                limite = time.monotonic() + self.intervalo
+            if len(lote) >= self.tam_lote:
+                self._escribir(lote)
+                limite = None
+
+
+# Escritor diferido global (None = escritura síncrona)
+_escritor_global: Optional[EscritorDiferido] = None
+
+
+def activar_escritura_diferida(**opciones) -> EscritorDiferido:
+    '''
+    Activa la escritura diferida para registrar_resultado.
+
+    :param opciones: Argumentos de EscritorDiferido (tam_lote, intervalo, max_pendientes, fsync, ruta)
+    :return: El escritor activo
+    :rtype: EscritorDiferido
+    '''
+    global _escritor_global
+    desactivar_escritura_diferida()
+    _escritor_global = EscritorDiferido(**opciones)
+    return _escritor_global
+
+
+def desactivar_escritura_diferida() -> None:
+    ''' Escribe lo pendiente y vuelve a la escritura síncrona '''
+    global _escritor_global
+    if _escritor_global is not None:
+        _escritor_global.cerrar()
+        _escritor_global = None
+
+
+def flush() -> None:
+    ''' Fuerza la escritura de los registros pendientes, si los hay '''
+    if _escritor_global is not None:
+        _escritor_global.flush()
+
+
+if os.environ.get('CALCU_AREAS_ESCRITURA_DIFERIDA') == '1':
+    activar_escritura_diferida(fsync=os.environ.get('CALCU_AREAS_FSYNC') == '1')
+
+
+########################################
+###### ESTADÍSTICAS INCREMENTALES ######
+########################################
+
+# Generación del historial: aumenta con cada escritura hecha por este proceso
+_generacion = 0
+
+# Estadísticas por historial: (acumulador, huella del archivo al que corresponden)
+_estadisticas_global: Dict[Path, tuple] = {}
+_estadisticas_lock = threading.Lock()
+
+
+def ruta_estadisticas(ruta: Path) -> Path:
+    ''' Archivo donde se persisten las estadísticas de un historial '''
+    return ruta.with_name(ruta.name + '.stats')
+
+
+def huella_historial(ruta: Path) -> Optional[List[int]]:
+    '''
+    Tamaño y mtime (ns) del historial, o None si no existe.
+    En SQLite se añade el último id, porque el tamaño no cambia en cada inserción.
+    '''
+    try:
+        st = ruta.stat()
+    except FileNotFoundError:
+        return None
+    huella = [st.st_size, st.st_mtime_ns]
+    if es_sqlite(ruta):
+        huella.append(ultimo_id_sqlite(ruta))
+    return huella
+
+
+def _guardar_estadisticas(stats: EstadisticasIncrementales, ruta: Path, huella: Optional[List[int]]) -> None:
+    ''' Persiste el acumulador junto al historial (reemplazo atómico) '''
+    destino = ruta_estadisticas(ruta)
+    temporal = destino.with_name(destino.name + '.tmp')
+    try:
+        with temporal.open('w', encoding='utf-8') as f:
+            json.dump({'huella': huella, 'estadisticas': stats.a_dict()}, f)
+        os.replace(temporal, destino)
+    except OSError as e:
+        _avisar(f'[dim yellow]No se pudieron guardar las estadísticas: {e}[/dim yellow]')
+
+
+def _cargar_estadisticas(ruta: Path) -> Optional[tuple]:
+    ''' Lee el acumulador persistido: (stats, huella) o None '''
+    origen = ruta_estadisticas(ruta)
+    if not origen.exists():
+        return None
+    try:
+        with origen.open('r', encoding='utf-8') as f:
+            contenido = json.load(f)
+        return EstadisticasIncrementales.desde_dict(contenido['estadisticas']), contenido.get('huella')
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _actualizar_estadisticas(datos: List[Dict], ruta: Path, huella_previa: Optional[List[int]]) -> None:
+    '''
+    Suma los registros recién escritos al acumulador en O(len(datos)).
+    Solo se actualiza si el acumulador correspondía al archivo antes de escribir;
+    si no, se deja y se reconstruirá la próxima vez que se consulte.
+    '''
+    _nueva_generacion()
+    with _estadisticas_lock:
+        entrada = _estadisticas_global.get(ruta)
+        if entrada is None or entrada[1] != huella_previa:
+            # Otro proceso pudo escribir (y actualizar el .stats) desde entonces
+            entrada = _cargar_estadisticas(ruta)
+        if huella_previa is None:
+            stats = EstadisticasIncrementales()
+        elif entrada is not None and entrada[1] == huella_previa:
+            stats = entrada[0]
+        else:
+            _estadisticas_global.pop(ruta, None)
+            return
+
+        stats.agregar_varios(datos)
+        huella = huella_historial(ruta)
+        _estadisticas_global[ruta] = (stats, huella)
+        _guardar_estadisticas(stats, ruta, huella)
+
+
+def obtener_estadisticas(ruta: Optional[Path]=None) -> EstadisticasIncrementales:
+    '''
+    Devuelve el acumulador de estadísticas del historial.
+    Normalmente es O(1); solo recorre el historial si el archivo cambió por
+    fuera de esta aplicación (huella distinta) o si no hay estadísticas guardadas.
+
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :rtype: EstadisticasIncrementales
+    '''
+    ruta = ruta or ruta_historial()
+    flush()
+
+    with _estadisticas_lock:
+        huella = huella_historial(ruta)
+        entrada = _estadisticas_global.get(ruta)
+        if entrada is not None and entrada[1] == huella:
+            return entrada[0]
+
+        entrada = _cargar_estadisticas(ruta)
+        if entrada is not None and entrada[1] == huella:
+            _estadisticas_global[ruta] = entrada
+            return entrada[0]
+
+        # Reconstrucción completa (una sola pasada en streaming)
+        stats = EstadisticasIncrementales()
+        stats.agregar_varios(iterar_historial(ruta))
+        _estadisticas_global[ruta] = (stats, huella)
+        if huella is not None:
+            _guardar_estadisticas(stats, ruta, huella)
+        return stats
+
+
+def version_historial(ruta: Optional[Path]=None) -> tuple:
+    '''
+    Clave barata que cambia cada vez que cambia el historial.
+    Combina la ruta, un contador de generación que aumenta con cada escritura
+    de este proceso y la huella (tamaño, mtime) del archivo, que detecta los
+    cambios hechos desde fuera.
+
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :return: Tupla hashable (ruta, generación, huella, huella del manifiesto de segmentos)
+    :rtype: tuple
+    '''
+    ruta = ruta or ruta_historial()
+    flush()
+    return (str(ruta), _generacion, tuple(huella_historial(ruta) or ()), huella_manifiesto(ruta))
+
+
+def descartar_estadisticas(ruta: Path) -> None:
+    ''' Elimina el acumulador de un historial (memoria y disco) '''
+    _nueva_generacion()
+    with _estadisticas_lock:
+        _estadisticas_global.pop(ruta, None)
+        archivo = ruta_estadisticas(ruta)
+        if archivo.exists():
+            archivo.unlink()
+
+
+##################################
+###### ÍNDICE DEL HISTORIAL ######
+##################################
+
+# Índice por historial (JSON y JSON Lines). Se crea con la primera consulta y
+# desde entonces cada escritura lo actualiza leyendo solo lo añadido.
+# En disco: '<historial>.idx' (filas, solo se añade) y '<historial>.idx.json'.
+_indices_global: Dict[Path, IndiceHistorial] = {}
+
+
+def ruta_indice(ruta: Path) -> Path:
+    ''' Archivo con las filas del índice de un historial '''
+    return ruta.with_name(ruta.name + '.idx')
+
+
+def _ruta_meta_indice(ruta: Path) -> Path:
+    return ruta.with_name(ruta.name + '.idx.json')
+
+
+def _firma_indice(ruta: Path, posicion: int) -> str:
+    ''' Bytes previos a la posición indexada, para detectar reescrituras '''
+    with ruta.open('rb') as f:
+        f.seek(max(0, posicion - 32))
+        return f.read(min(posicion, 32)).hex()
+
+
+def _sincronizar_indice(indice: IndiceHistorial, ruta: Path) -> bool:
+    '''
+    Indexa lo añadido al historial desde indice.posicion y lo persiste.
+    Retorna False si el archivo no es una continuación (hay que reconstruir).
+    '''
+    if not ruta.exists():
+        return len(indice) == 0
+    if ruta.stat().st_size < indice.posicion or _firma_indice(ruta, indice.posicion) != indice.firma:
+        return False
+
+    tam_previo = len(indice.filas)
+    resultado = registros_con_posicion(ruta, indice.posicion, destino=indice.agregar)
+    if resultado is None:
+        return False
+    posicion = resultado[1]
+    if len(indice.filas) == tam_previo and posicion == indice.posicion and ruta_indice(ruta).exists():
+        return True
+
+    filas_nuevas = bytes(indice.filas[tam_previo:])
+    indice.posicion = posicion
+    indice.firma = _firma_indice(ruta, posicion)
+    try:
+        archivo = ruta_indice(ruta)
+        with archivo.open('r+b' if archivo.exists() else 'wb') as f:
+            f.truncate(tam_previo)   # descarta filas de una escritura interrumpida
+            f.seek(tam_previo)
+            f.write(filas_nuevas)
+        indice.guardar_meta(_ruta_meta_indice(ruta), huella_historial(ruta))
+    except OSError as e:
+        _avisar(f'[dim yellow]No se pudo guardar el índice: {e}[/dim yellow]')
+    return True
+
+
+def obtener_indice(ruta: Optional[Path]=None, crear: bool=True) -> Optional[IndiceHistorial]:
+    '''
+    Índice del historial, al día con el archivo.
+    Lo toma de memoria o de disco y solo indexa lo añadido desde entonces; la
+    primera vez (o si el archivo se reescribió) lo construye recorriéndolo.
+
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :param crear: Si False, retorna None en lugar de construir un índice que no existe
+    :type crear: bool
+    :return: El índice, o None con SQLite (usa sus propios índices)
+    :rtype: Optional[IndiceHistorial]
+    '''
+    ruta = ruta or ruta_historial()
+    if es_sqlite(ruta):
+        return None
+    flush()
+    return _indice_al_dia(ruta, crear)
+
+
+def _indice_al_dia(ruta: Path, crear: bool=True) -> Optional[IndiceHistorial]:
+    ''' obtener_indice sin vaciar la escritura diferida (se llama desde las escrituras) '''
+    with bloqueo_historial(ruta):
+        indice = _indices_global.get(ruta)
+        archivo = ruta_indice(ruta)
+        # Otro proceso pudo ampliar el índice en disco: recargarlo
+        if indice is None or (archivo.exists() and archivo.stat().st_size > len(indice.filas)):
+            indice = IndiceHistorial.cargar(archivo, _ruta_meta_indice(ruta)) or indice
+        if indice is None and not crear:
+            return None
+
+        if indice is None or not _sincronizar_indice(indice, ruta):
+            indice = IndiceHistorial()
+            _sincronizar_indice(indice, ruta)
+        _indices_global[ruta] = indice
+        return indice
+
+
+def _actualizar_indice(ruta: Path) -> None:
+    ''' Tras escribir: pone al día el índice si el historial ya tiene uno '''
+    if es_sqlite(ruta) or (ruta not in _indices_global and not ruta_indice(ruta).exists()):
+        return
+    try:
+        _indice_al_dia(ruta)
+    except Exception as e:
+        _avisar(f'[dim yellow]No se pudo actualizar el índice: {e}[/dim yellow]')
+
+
+def descartar_indice(ruta: Path) -> None:
+    ''' Elimina el índice de un historial (memoria y disco) '''
+    _indices_global.pop(ruta, None)
+    for archivo in (ruta_indice(ruta), _ruta_meta_indice(ruta)):
+        if archivo.exists():
+            archivo.unlink()
+
+
+#####################################
+###### SEGMENTOS DEL HISTORIAL ######
+#####################################
+
+# Con JSON y JSON Lines el historial activo se puede rotar: sus registros
+# pasan a un segmento comprimido en <historial>.segmentos/ y se empieza un
+# archivo nuevo. Las consultas, estadísticas, páginas y últimos registros
+# leen los segmentos y el historial activo como un único historial.
+
+# Rotación automática tras cada escritura (ver configurar_rotacion):
+# CALCU_AREAS_ROTAR_MB (tamaño del historial activo) y/o
+# CALCU_AREAS_ROTAR_DIARIO=1 (cuando el primer registro es de otro día)
+_rotar_bytes: Optional[int] = (
+    int(float(os.environ['CALCU_AREAS_ROTAR_MB']) * 1024 * 1024)
+    if os.environ.get('CALCU_AREAS_ROTAR_MB') else None
+)
+_rotar_diario = os.environ.get('CALCU_AREAS_ROTAR_DIARIO') == '1'
+
+
+def configurar_rotacion(max_bytes: Optional[int]=None, diario: bool=False) -> None:
+    '''
+    Activa (o desactiva, sin argumentos) la rotación automática del
+    historial activo tras cada escritura.
+
+    :param max_bytes: Rotar al alcanzar este tamaño
+    :type max_bytes: Optional[int]
+    :param diario: Rotar cuando el registro más antiguo del historial activo es de otro día
+    :type diario: bool
+    '''
+    global _rotar_bytes, _rotar_diario
+    _rotar_bytes, _rotar_diario = max_bytes, diario
+
+
+def _debe_rotar(ruta: Path, max_bytes: Optional[int], diario: bool) -> bool:
+    ''' Sin criterios siempre se rota; con ellos, si se cumple alguno '''
+    try:
+        tam = ruta.stat().st_size
+    except FileNotFoundError:
+        return False
+    if max_bytes is None and not diario:
+        return True
+    if max_bytes is not None and tam >= max_bytes:
+        return True
+    if diario:
+        primero = next(iter(iterar_historial(ruta)), None)
+        return isinstance(primero, Mapping) and epoch_a_fecha(epoch_registro(primero))[:10] != obtener_fecha()[:10]
+    return False
+
+
+def _rotar(ruta: Path, max_bytes: Optional[int], diario: bool) -> Optional[Dict]:
+    ''' Rotación con el bloqueo del historial ya tomado o por tomar (es reentrante) '''
+    with bloqueo_historial(ruta):
+        if not _debe_rotar(ruta, max_bytes, diario):
+            return None
+        entrada = archivar_segmento(ruta, iterar_historial(ruta))
+        if entrada is None:
+            return None
+
+        # El segmento ya está en el manifiesto: el historial activo empieza de cero
+        ruta.unlink()
+        _cache_global.invalidar()
+        with _columnar_lock:
+            _columnar_global.pop(ruta, None)
+        descartar_estadisticas(ruta)
+        descartar_indice(ruta)
+        _nueva_generacion()
+    return entrada
+
+
+def rotar_historial(ruta: Optional[Path]=None, max_bytes: Optional[int]=None, diario: bool=False) -> Optional[Dict]:
+    '''
+    Archiva el historial activo como un segmento comprimido (gzip, JSON Lines)
+    y empieza uno vacío. Sin criterios rota siempre; con max_bytes o diario,
+    solo si se cumple alguno.
+
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :param max_bytes: Rotar solo si el historial activo ocupa al menos esto
+    :type max_bytes: Optional[int]
+    :param diario: Rotar solo si el registro más antiguo es de otro día
+    :type diario: bool
+    :return: Entrada del manifiesto del nuevo segmento, o None si no se rotó
+    :rtype: Optional[Dict]
+    :raises ValueError: Si el historial es SQLite
+    '''
+    ruta = ruta or ruta_historial()
+    if es_sqlite(ruta):
+        raise ValueError('La rotación por segmentos solo está disponible para JSON y JSON Lines')
+    flush()
+    return _rotar(ruta, max_bytes, diario)
+
+
+def compactar_historial(dias: float=30, ruta: Optional[Path]=None) -> int:
+    '''
+    Compacta los segmentos archivados cuyos registros tienen todos más de
+    'dias' días: se borran los registros y quedan solo sus estadísticas y el
+    resumen por figura y día. Las estadísticas globales no cambian; las
+    búsquedas y páginas dejan de ver esos registros.
+
+    :param dias: Antigüedad mínima en días
+    :type dias: float
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :return: Número de segmentos compactados
+    :rtype: int
+    '''
+    ruta = ruta or ruta_historial()
+    with bloqueo_historial(ruta):
+        return compactar_segmentos(ruta, datetime.now().timestamp() - dias * 86400)
+
+
+def estadisticas_completas(ruta: Optional[Path]=None) -> EstadisticasIncrementales:
+    '''
+    Estadísticas del historial activo más las de los segmentos archivados
+    (guardadas en el manifiesto, así que tampoco se recorren).
+
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :rtype: EstadisticasIncrementales
+    '''
+    ruta = ruta or ruta_historial()
+    activo = obtener_estadisticas(ruta)
+    if es_sqlite(ruta) or not cargar_manifiesto(ruta):
+        return activo
+    stats = estadisticas_archivadas(ruta)
+    stats.combinar(activo)
+    return stats
+
+
+def resumen_diario(figura: Optional[str]=None, ruta: Optional[Path]=None) -> List[Dict]:
+    '''
+    Registros, área total, media, mínima y máxima por figura y día de todo el
+    historial, incluidos los segmentos compactados. Los segmentos aportan su
+    resumen guardado; solo se recorre el historial activo.
+
+    :param figura: Limitar el resumen a una figura
+    :type figura: Optional[str]
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :return: Filas ordenadas por día y figura
+    :rtype: List[Dict]
+    '''
+    ruta = ruta or ruta_historial()
+    activo = ResumenSegmento()
+    for dato in iterar_historial(ruta):
+        if isinstance(dato, Mapping):
+            activo.agregar(dato)
+    filas = [fila for entrada in cargar_manifiesto(ruta) for fila in entrada['diario']]
+    filas += activo.a_entrada(0, '')['diario']
+
+    combinadas: Dict[tuple, Dict] = {}
+    for fila in filas:
+        if figura is not None and fila['figura'] != figura:
+            continue
+        clave = (fila['figura'], fila['dia'])
+        actual = combinadas.get(clave)
+        if actual is None:
+            combinadas[clave] = dict(fila)
+            continue
+        actual['registros'] += fila['registros']
+        actual['con_area'] += fila['con_area']
+        actual['suma'] += fila['suma']
+        for campo, elegir in (('minimo', min), ('maximo', max)):
+            if fila[campo] is not None:
+                actual[campo] = fila[campo] if actual[campo] is None else elegir(actual[campo], fila[campo])
+
+    def orden(fila: Dict) -> tuple:
+        dia = fila['dia']
+        return (dia[6:10], dia[3:5], dia[0:2], fila['figura'])
+
+    return [
+        {
+            'dia': fila['dia'],
+            'figura': fila['figura'],
+            'registros': fila['registros'],
+            'area_total': fila['suma'],
+            'area_media': fila['suma'] / fila['con_area'] if fila['con_area'] else 0,
+            'area_minima': fila['minimo'],
+            'area_maxima': fila['maximo']
+        }
+        for fila in sorted(combinadas.values(), key=orden)
+    ]
+
+
+#############################################
+###### VENTANAS DE TIEMPO Y AGREGACIÓN ######
+#############################################
+
+# Ambas trabajan sobre la columna numérica 'epoch' (la del índice con JSON y
+# JSON Lines, la de la tabla con SQLite) sin interpretar fechas registro a
+# registro. Los periodos se etiquetan en hora local.
+
+VENTANAS = {'hora': 3600, 'dia': 86400, 'semana': 7 * 86400}
+
+PERIODOS = {
+    'hora': '%Y-%m-%d %H:00',
+    'dia': '%Y-%m-%d',
+    'semana': '%G-W%V',     # semana ISO
+    'mes': '%Y-%m'
+}
+
+# Granularidad con la que se etiquetan las fechas: divide cualquier zona
+# horaria (las hay con desfases de 30 y 45 minutos), así que cada cuarto de
+# hora cae entero en un único periodo
+_CUARTO_HORA = 900
+
+
+def consultar_recientes(
+        ventana: Union[str, float]='dia',
+        figura: Optional[str]=None,
+        ruta: Optional[Path]=None) -> List[Dict]:
+    '''
+    Registros de la última hora, día o semana (o de los últimos N segundos).
+
+    :param ventana: 'hora', 'dia', 'semana' o segundos
+    :type ventana: Union[str, float]
+    :param figura: Limitar a una figura
+    :type figura: Optional[str]
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :rtype: List[Dict]
+    :raises ValueError: Si la ventana no es válida
+    '''
+    if isinstance(ventana, str):
+        if ventana not in VENTANAS:
+            raise ValueError(f'Ventana {ventana} no válida. Usa: {", ".join(VENTANAS)} o segundos')
+        ventana = VENTANAS[ventana]
+    ahora = datetime.now().timestamp()
+    return consultar_historial(figura=figura, desde=ahora - ventana, hasta=ahora, ruta=ruta)
+
+
+def _columnas_tiempo(
+        ruta: Path,
+        figura: Optional[str],
+        desde: Optional[float],
+        hasta: Optional[float]) -> List[tuple]:
+    '''
+    Columnas (epoch, área, id de figura, nombres de figura) de cada parte del
+    historial que puede tener registros en la ventana: la tabla SQLite, o los
+    segmentos sin compactar y el índice del historial activo.
+    '''
+    import numpy as np
+
+    partes = []
+    if es_sqlite(ruta):
+        if not ruta.exists():
+            return partes
+        condiciones, valores = [], []
+        for condicion, valor in (('figura = ?', figura), ('epoch >= ?', desde), ('epoch <= ?', hasta)):
+            if valor is not None:
+                condiciones.append(condicion)
+                valores.append(valor)
+        where = f'WHERE {" AND ".join(condiciones)}' if condiciones else ''
+        conexion = conectar_sqlite(ruta)
+        try:
+            filas = conexion.execute(f'SELECT epoch, area, figura FROM historial {where}', valores).fetchall()
+        finally:
+            conexion.close()
+        nombres = sorted({f[2] or 'desconocida' for f in filas})
+        ids = {nombre: i for i, nombre in enumerate(nombres)}
+        partes.append((
+            np.array([np.nan if f[0] is None else f[0] for f in filas], dtype=np.float64),
+            np.array([f[1] if isinstance(f[1], (int, float)) else np.nan for f in filas], dtype=np.float64),
+            np.array([ids[f[2] or 'desconocida'] for f in filas], dtype=np.int64),
+            nombres
+        ))
+        return partes
+
+    for entrada in cargar_manifiesto(ruta):
+        if not puede_contener(entrada, figura, None, None, desde, hasta):
+            continue
+        registros = [r for r in iterar_segmento(ruta, entrada) if isinstance(r, Mapping)]
+        nombres = sorted({str(r.get('figura') or 'desconocida') for r in registros})
+        ids = {nombre: i for i, nombre in enumerate(nombres)}
+        partes.append((
+            np.array([epoch_registro(r) for r in registros], dtype=np.float64),
+            np.array([r['area'] if isinstance(r.get('area'), (int, float)) else np.nan for r in registros], dtype=np.float64),
+            np.array([ids[str(r.get('figura') or 'desconocida')] for r in registros], dtype=np.int64),
+            nombres
+        ))
+
+    if ruta.exists():
+        indice = obtener_indice(ruta)
+        columnas = indice.columnas()
+        partes.append((columnas['fecha'], columnas['area'], columnas['figura'].astype(np.int64), list(indice.figuras)))
+    return partes
+
+
+def agregar_por_periodo(
+        periodo: str='dia',
+        figura: Optional[str]=None,
+        desde: Union[datetime, float, str, None]=None,
+        hasta: Union[datetime, float, str, None]=None,
+        por_figura: bool=False,
+        ruta: Optional[Path]=None) -> List[Dict]:
+    '''
+    Registros y área total, media, mínima y máxima por hora, día, semana o
+    mes (opcionalmente también por figura), vectorizado sobre la columna epoch.
+
+    Los segmentos compactados aportan su resumen por figura y día a los
+    periodos de un día o más, solo con los días que caen enteros en la ventana;
+    no aparecen por horas.
+
+    :param periodo: 'hora', 'dia', 'semana' (ISO) o 'mes'
+    :type periodo: str
+    :param figura: Limitar a una figura
+    :type figura: Optional[str]
+    :param desde: Fecha mínima (datetime, segundos epoch o texto)
+    :param hasta: Fecha máxima (datetime, segundos epoch o texto)
+    :param por_figura: Si True, una fila por periodo y figura
+    :type por_figura: bool
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :return: Filas ordenadas por periodo (y figura)
+    :rtype: List[Dict]
+    :raises ValueError: Si el periodo no es válido
+    '''
+    import numpy as np
+
+    if periodo not in PERIODOS:
+        raise ValueError(f'Periodo {periodo} no válido. Usa: {", ".join(PERIODOS)}')
+    ruta = ruta or ruta_historial()
+    figura = figura.lower().strip() if figura is not None else None
+    desde, hasta = _a_epoch(desde), _a_epoch(hasta)
+    flush()
+
+    # Todas las partes en columnas comunes, con los ids de figura unificados
+    nombres: List[str] = []
+    ids: Dict[str, int] = {}
+    epochs, areas, figuras = [], [], []
+    for epoch, area, fid, nombres_parte in _columnas_tiempo(ruta, figura, desde, hasta):
+        mapa = np.array([ids.setdefault(n, len(ids)) for n in nombres_parte] or [0], dtype=np.int64)
+        epochs.append(epoch)
+        areas.append(area)
+        figuras.append(mapa[fid])
+    nombres = list(ids)
+    epoch = np.concatenate(epochs) if epochs else np.empty(0)
+    area = np.concatenate(areas) if areas else np.empty(0)
+    fid = np.concatenate(figuras) if figuras else np.empty(0, dtype=np.int64)
+
+    mascara = ~np.isnan(epoch)
+    with np.errstate(invalid='ignore'):
+        if desde is not None:
+            mascara &= epoch >= desde
+        if hasta is not None:
+            mascara &= epoch <= hasta
+    if figura is not None:
+        mascara &= fid == ids.get(figura, -1)
+    epoch, area, fid = epoch[mascara], area[mascara], fid[mascara]
+
+    # Etiqueta de cada periodo: solo se formatea una vez por cuarto de hora distinto
+    cuartos, por_cuarto = np.unique((epoch // _CUARTO_HORA).astype(np.int64), return_inverse=True)
+    formato = PERIODOS[periodo]
+    etiquetas_cuarto = [datetime.fromtimestamp(int(c) * _CUARTO_HORA).strftime(formato) for c in cuartos.tolist()]
+    etiquetas, por_etiqueta = np.unique(np.array(etiquetas_cuarto, dtype=str), return_inverse=True)
+    etiquetas = etiquetas.tolist()
+    periodo_fila = por_etiqueta.reshape(-1)[por_cuarto.reshape(-1)] if len(epoch) else np.empty(0, dtype=np.int64)
+
+    # Un grupo por periodo (y figura): conteos y sumas con bincount, extremos con reduceat
+    clave = periodo_fila * len(nombres) + fid if por_figura else periodo_fila
+    grupos, grupo_fila = np.unique(clave, return_inverse=True)
+    grupo_fila = grupo_fila.reshape(-1)
+    con_area = ~np.isnan(area)
+    registros = np.bincount(grupo_fila, minlength=len(grupos))
+    cuantos = np.bincount(grupo_fila, weights=con_area, minlength=len(grupos))
+    sumas = np.bincount(grupo_fila, weights=np.where(con_area, area, 0.0), minlength=len(grupos))
+    minimos = np.full(len(grupos), np.nan)
+    maximos = np.full(len(grupos), np.nan)
+    if con_area.any():
+        orden = np.argsort(grupo_fila[con_area], kind='stable')
+        g, a = grupo_fila[con_area][orden], area[con_area][orden]
+        inicios = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+        minimos[g[inicios]] = np.minimum.reduceat(a, inicios)
+        maximos[g[inicios]] = np.maximum.reduceat(a, inicios)
+
+    combinadas: Dict[tuple, List] = {}
+    for i, grupo in enumerate(grupos.tolist()):
+        if por_figura:
+            clave_fila = (etiquetas[grupo // len(nombres)], nombres[grupo % len(nombres)])
+        else:
+            clave_fila = (etiquetas[grupo], None)
+        combinadas[clave_fila] = [
+            int(registros[i]), int(cuantos[i]), float(sumas[i]),
+            None if np.isnan(minimos[i]) else float(minimos[i]),
+            None if np.isnan(maximos[i]) else float(maximos[i])
+        ]
+
+    # Segmentos compactados: su resumen diario, solo con días enteros dentro de la ventana
+    if periodo != 'hora' and not es_sqlite(ruta):
+        for entrada in cargar_manifiesto(ruta):
+            if not entrada['compactado']:
+                continue
+            for fila in entrada['diario']:
+                if figura is not None and fila['figura'].lower() != figura:
+                    continue
+                try:
+                    dia = datetime.strptime(fila['dia'], '%d/%m/%Y')
+                except ValueError:
+                    continue
+                inicio_dia = dia.timestamp()
+                fin_dia = (dia + timedelta(days=1)).timestamp() - 1
+                if (desde is not None and inicio_dia < desde) or (hasta is not None and fin_dia > hasta):
+                    continue
+                clave_fila = (dia.strftime(formato), fila['figura'] if por_figura else None)
+                actual = combinadas.setdefault(clave_fila, [0, 0, 0.0, None, None])
+                actual[0] += fila['registros']
+                actual[1] += fila['con_area']
+                actual[2] += fila['suma']
+                for k, campo, elegir in ((3, 'minimo', min), (4, 'maximo', max)):
+                    if fila[campo] is not None:
+                        actual[k] = fila[campo] if actual[k] is None else elegir(actual[k], fila[campo])
+
+    resultado = []
+    for (etiqueta, nombre), (total, cuantos_area, suma, minimo, maximo) in sorted(
+            combinadas.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+        fila = {'periodo': etiqueta}
+        if por_figura:
+            fila['figura'] = nombre
+        fila.update({
+            'registros': total,
+            'area_total': suma,
+            'area_media': suma / cuantos_area if cuantos_area else 0,
+            'area_minima': minimo,
+            'area_maxima': maximo
+        })
+        resultado.append(fila)
+    return resultado
+
+
+#####################################
+###### FUNCIONES CON CACHÉ LRU ######
+#####################################
+
+# Las funciones cacheadas se indexan por la versión del historial
+# (ver version_historial), no por su contenido: obtener la clave es O(1).
+
+@lru_cache(maxsize=128)
+def obtener_figura_mas_frecuente_cached(version: tuple) -> str:
+    '''
+    Versión cacheada de obtener_figura_mas_frecuente    
+    :param version: Clave devuelta por version_historial()
+    :return: Nombre de la figura más calculada o 'ninguna'
+    :rtype: str
+    '''
+    return estadisticas_completas(Path(version[0])).figura_mas_calculada()
+
+@lru_cache(maxsize=128)
+def calcular_estadisticas_cached(version: tuple) -> Dict:
+    '''
+    Calcula estadisticas con caché LRU
+    :param version: Clave devuelta por version_historial()
+    '''
+    stats = estadisticas_completas(Path(version[0])).resumen()
+    stats['figura_mas_calculada'] = obtener_figura_mas_frecuente_cached(version)
+    return stats
+
+
+def vaciar_caches() -> None:
+    ''' Vacía el caché del historial, las funciones cacheadas y la memoización de resultados '''
+    _cache_global.invalidar()
+    obtener_figura_mas_frecuente_cached.cache_clear()
+    calcular_estadisticas_cached.cache_clear()
+    if cache_resultados() is not None:
+        cache_resultados().limpiar()
+
+
+def cache_historial() -> CacheJSON:
+    ''' Caché global del historial (con sus contadores de aciertos) '''
+    return _cache_global
+
+
+def registros_en_cache() -> Optional[int]:
+    ''' Registros en el caché global del historial (None si está vacío) '''
+    datos = _cache_global._cache
+    return len(datos) if datos is not None else None
+
+
+
+##################################
+###### FUNCIONES AUXILIARES ######
+##################################
+
+def obtener_fecha() -> str:
+    ''' Retorna la fecha y la hora actual formateada '''
+    return datetime.now().strftime(FORMATO_FECHA)
+
+
+def sello_fecha() -> Dict:
+    '''
+    Fecha de un registro nuevo: 'fecha' para mostrar y 'epoch' (segundos,
+    enteros) para filtrar y agrupar sin volver a interpretar el texto.
+    '''
+    ahora = datetime.now().replace(microsecond=0)
+    return {'fecha': ahora.strftime(FORMATO_FECHA), 'epoch': int(ahora.timestamp())}
+
+
+def registrar_resultado(**kwargs):
+    ''' Registra un resultado de cálcudo en el JSON '''
+    dato = {**sello_fecha(), **kwargs}
+    if _escritor_global is not None:
+        _escritor_global.agregar(dato)
+        return True
+    return guardar_registro(dato)
+
+
+def borrar_historial(ruta: Optional[Path]=None) -> bool:
+    '''
+    Borra el historial activo, sus segmentos archivados, estadísticas e índice.
+
+    :param ruta: Ruta al historial. Si es None, se usa la del formato configurado.
+    :type ruta: Optional[Path]
+    :return: True si había algo que borrar
+    :rtype: bool
+    '''
+    import shutil
+
+    ruta = ruta or ruta_historial()
+    # Lo pendiente en la escritura diferida se escribiría justo después de borrar
+    flush()
+    segmentos = directorio_segmentos(ruta)
+    with bloqueo_historial(ruta):
+        if not ruta.exists() and not segmentos.exists():
+            return False
+        ruta.unlink(missing_ok=True)
+        shutil.rmtree(segmentos, ignore_errors=True)
+        _cache_global.invalidar()
+        with _columnar_lock:
+            _columnar_global.pop(ruta, None)
+        descartar_estadisticas(ruta)
+        descartar_indice(ruta)
+        _nueva_generacion()
+    return True
 
 
 def calcular_estadisticas_sin_cache(datos: List[Dict]) -> Dict:
@@ -424,184 +2841,28 @@ def calcular_estadisticas_sin_cache(datos: List[Dict]) -> Dict:
         }
 
 
-def mostrar_ultimos_calculos(n: int=5) -> None:
-    ''' Muestra los últimos n cálculos realizados '''
-    datos = cargar_json()
-
-    if not datos:
-        console.print(Panel(
-            '[yellow]📂 No hay datos guardados aún.[/yellow]',
-            title='Historial vacío',
-            border_style='yellow'
-        ))
-        return
-    
-    # Tomar los últimos n registros
-    ultimos = datos[-n:] if len(datos) >= n else datos
-
-    table = Table(
-        title=f'🕒 Últimos {len(ultimos)} cálculos (de {len(datos)} totales)',
-        title_style='bold cyan',
-        box=box.ROUNDED,
-        show_header=True,
-        header_style='bold magenta',
-        border_style='cyan',
-        expand=False
-    )
-
-    # Calcular el número inicial (para mostrar la posición real)
-    inicio = len(datos) - len(ultimos) + 1
-
-    for i, registro in enumerate(ultimos, inicio):
-        fecha = registro.get('fecha', 'N/D')
-        figura = registro.get('figura', 'desconocida').replace('_', ' ').title()
-        area = registro.get('area', 'N/D')
-        params = registro.get('parametros', {})
-
-        # Formatear parámetros
-        if isinstance(params, dict):
-            params_str = '\n'.join([f'{k}: {v}' for k, v in params.items()])
-        else:
-            params_str = str(params)
-
-        # Formatear área
-        area_str = f'{area:.2f}' if isinstance(area, (int, float)) else str(area)
-
-        table.add_row(str(i), fecha, figura, area_str, params_str)
-    
-    console.print(table)
+def _avisar(mensaje: str) -> None:
+    ''' Muestra un aviso (con marcado de Rich); Rich solo se importa si hay algo que avisar '''
+    from vista_historial import console
+    console.print(mensaje)
 
 
-def limpiar_historial() -> bool:
-    ''' Elimina todos los registros del historial '''
-    try:
-        if ARCHIVO_JSON.exists():
-            ARCHIVO_JSON.unlink()
-            _cache_global.invalidar()
-            console.print(Panel(
-                '[green]✅ Historial limpiado exitosamente[/green]',
-                border_style='green'
-            ))
-            return True
-        else:
-            console.print(Panel(
-                f'[yellow]⚠️ No hay historial para limpiar[/yellow]',
-                border_style='yellow'
-            ))
-            return False
-    except Exception as e:
-        console.print(Panel(
-                '[yellow]⚠️ No hay historial para limpiar[/yellow]',
-                border_style='yellow'
-            ))
-        return False
+###############################################
+###### PRESENTACIÓN (vista_historial.py) ######
+###############################################
 
-    
-def buscar_por_figura(figura: str, ruta: Path=ARCHIVO_JSON) -> None:
-    ''' Busca y muestra registro de una figura específica '''
-    datos = cargar_json()
-
-    if not isinstance(datos, list):
-        console.print(Panel(
-            '[red]El formato del archivo JSON no es una lista de registros[/red]',
-            title='❌ Error',
-            border_style='red'
-        ))
-        return
-
-    figura = figura.lower().strip()
-
-    # Usar list comprehension
-    resultados = [
-        registro for registro in datos
-        if isinstance(registro, dict) and 
-        registro.get('figura', '').lower() == figura
-    ]
-
-    if not resultados:
-        console.print(Panel(
-            f'[yellow]No se encuentran registros para la figura "[bold]{figura}[/bold]"[/yellow]',
-            title='🔍 Búsqueda sin resultados',
-            border_style='yellow'
-        ))
-        return
-    
-    # Crear tabla de resultados
-    table = Table(
-        title=f'🔍 Resultados para: [bold green]{figura.replace("_", " ")}[/bold green]',
-        title_style='bold cyan',
-        box=box.DOUBLE,
-        show_header=True,
-        header_style='bold magenta',
-        border_style='cyan',
-        expand=False
-    )
-
-    table.add_column('#', style='yellow', justify='right', width=4)
-    table.add_column('Fecha', style='cyan', width=17)
-    table.add_column('Área', style='bold green', justify='right', width=12)
-    table.add_column('Paŕametros', style='blue', width=45)
-
-    for i, res in enumerate(resultados, 1):
-        fecha = res.get('fecha', 'N/D')
-        area = res.get('area', 'N/D')
-        params = res.get('parametros', {})
-
-        params_str = ', '.join([f'{k}: {v}' for k, v in params.items()] if isinstance(params,dict) else str(params))
-        area_str = f'{area:.2f}' if isinstance(area, (int, float)) else str(area)
-
-        table.add_row(str(i), fecha, area_str, params_str)
-
-    console.print(table)
-
-    # Panel con resumen
-    console.print(Panel(
-        f'[bold cyan]Total de registros encontrados:[/bold cyan] [yellow]{len(resultados)}[/yellow]',
-        border_style='green',
-        expand=False
-    ))
-
-
-def limpiar_cache():
-    ''' Limpia manualmente el caché '''
-    _cache_global.invalidar()
-    obtener_figura_mas_frecuente_cached.cache_clear()
-    calcular_estadisticas_cached.cache_clear()
-    console.print('[green]✅ Caché limpiado[/green]')
-
-
-def info_cache():
-    ''' Mostrar información sobre el estado de la caché '''
-    stats_figura = obtener_figura_mas_frecuente_cached.cache_info()
-    stats_estadisticas = calcular_estadisticas_cached.cache_info()
-
-    table = Table(title='📊 Estadísticas de Caché', box=box.SIMPLE)
-    table.add_column('Función', style='cyan')
-    table.add_column('Hits', style='green', justify='right')
-    table.add_column('Misses', style='yellow', justify='right')
-    table.add_column('Tamaño', style='blue', justify='right')
-    
-    table.add_row(
-        'Figura más frecuente',
-        str(stats_figura.hits),
-        str(stats_figura.misses),
-        f'{stats_figura.currsize}/{stats_figura.maxsize}'
-    )
-    
-    table.add_row(
-        'Estadísticas',
-        str(stats_estadisticas.hits),
-        str(stats_estadisticas.misses),
-        f'{stats_estadisticas.currsize}/{stats_estadisticas.maxsize}'
-    )
-    
-    console.print(table)
-    
-    if _cache_global._cache is not None:
-        console.print(f'\n[cyan]Caché global:[/cyan] [green]ACTIVO[/green]')
-        console.print(f'[cyan]Registros en caché:[/cyan] [yellow]{len(_cache_global._cache)}[/yellow]')
-    else:
-        console.print(f'\n[cyan]Caché global:[/cyan] [red]INACTIVO[/red]')
+# Las funciones de visualización viven en vista_historial, que importa Rich.
+# Se siguen pudiendo importar desde aquí, pero solo se carga el módulo (y
+# Rich) al pedir una de ellas.
+_NOMBRES_VISTA = (
+    'console', 'mostrar_json', 'mostrar_registros', 'mostrar_estadisticas_resumidas',
+    'mostrar_ultimos_calculos', 'limpiar_historial', 'buscar_por_figura',
+    'limpiar_cache', 'info_cache', 'mostrar_metricas'
+)
 
 
-    
\ No newline at end of file
+def __getattr__(nombre: str) -> Any:
+    if nombre in _NOMBRES_VISTA:
+        import vista_historial
+        return getattr(vista_historial, nombre)
+    raise AttributeError(f'module {__name__!r} has no attribute {nombre!r}')
@@ -0,0 +1,418 @@
+'''
+Capa de presentación del historial: tablas y paneles con Rich.
+
+utils_json solo calcula y persiste; este módulo (y por tanto Rich) se
+importa la primera vez que se usa una función de visualización.
+'''
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from collections.abc import Mapping
+
+from rich.console import Console, Group
+from rich.table import Table
+from rich.panel import Panel
+from rich import box
+
+import metricas
+from cache_resultados import cache_resultados
+from historial_columnar import fecha_registro
+from utils_json import (
+    borrar_historial, buscar_registros, cache_historial, calcular_estadisticas_cached,
+    calcular_estadisticas_sin_cache, contar_registros,
+    estadisticas_completas, obtener_figura_mas_frecuente_cached,
+    registros_en_cache, ruta_historial, ultimos_registros, vaciar_caches,
+    version_historial
+)
+
+console = Console()
+
+
+########################################
+###### FUNCIONES DE VISUALIZACIÓN ######
+########################################
+
+
+def mostrar_json(limite: Optional[int]=None) -> None:
+    '''
+    Muestra todos los datos del JSON con Rich en formato tabla
+    (sin límite, por páginas: ver menu.navegar_historial)
+    
+    :param limite: Si se especifica, muestra solo los últimos n registros
+    :type limite: Optional[int]
+    '''
+
+    ruta = ruta_historial()
+    total = contar_registros(ruta)
+
+    if not total:
+        console.print(Panel(
+            '[yellow]📂 No hay datos guardados aún.[/yellow]',
+            title='Historial vacío',
+            border_style='yellow'
+        ))
+        return
+    
+    # Aplicar límite si se especifica
+    if limite and total > limite:
+        datos_mostrar = ultimos_registros(limite, ruta)
+        titulo = f'📊 ÚLTIMOS {limite} CÁLCULOS (de {total} totales)'
+        mostrar_registros(datos_mostrar, total - len(datos_mostrar) + 1, titulo)
+    else:
+        # Sin límite, página a página (incluidos los segmentos archivados), para
+        # no cargar el historial entero; menu importa este módulo, de ahí el import local
+        from menu import navegar_historial
+        navegar_historial()
+
+    # Mostrar estadísticas (acumulador incremental, no recorre el historial)
+    mostrar_estadisticas_resumidas()
+
+
+@metricas.cronometrado('vista_segundos', vista='tabla')
+def mostrar_registros(registros: Sequence, numero_inicial: int, titulo: str) -> None:
+    '''
+    Muestra una tabla con registros del historial.
+
+    :param registros: Registros a mostrar (p. ej. una página)
+    :type registros: Sequence
+    :param numero_inicial: Número (desde 1) del primer registro en el historial
+    :type numero_inicial: int
+    :param titulo: Título de la tabla
+    :type titulo: str
+    '''
+    # Crear tabla
+    table = Table(
+        title=titulo,
+        title_style='bold cyan',
+        box=box.ROUNDED,
+        show_header=True,
+        header_style='bold magenta',
+        border_style='cyan',
+        expand=False
+    )
+
+    # Añadir columnas
+    table.add_column('#', style='yellow', justify='right', width=4)
+    table.add_column('Fecha', style='cyan', width=17)
+    table.add_column('Figura', style='green', width=20)
+    table.add_column('Área', style='bold blue',justify='right', width=12)
+    table.add_column('Parámetros', style='magenta', width=40)
+
+    # Añadir filas
+    for i, registro in enumerate(registros, numero_inicial):
+        fecha = fecha_registro(registro)
+        figura = registro.get('figura', 'desconocida')
+        area = registro.get('area', 'N/D')
+        params = registro.get('parametros', {})
+
+        # Formatear parámetros
+        if isinstance(params, Mapping):
+            params_str = '\n'.join([f'{k}: {v}' for k, v in params.items()])
+        else:
+            params_str = str(params)
+
+        # Formatear área
+        area_str = f'{area:.2f}' if isinstance(area, (int, float)) else str(area)
+
+        table.add_row(
+            str(i),
+            fecha,
+            figura.replace('_', ' ').title(),
+            area_str,
+            params_str
+        )
+
+    console.print(table)
+
+
+def mostrar_estadisticas_resumidas(datos: Optional[List[Dict]]=None) -> None:
+    '''
+    Muestras estadísticas resumidas usando caché.
+    Si datos es None, se usan las estadísticas incrementales del historial,
+    cacheadas por versión (O(1)).
+    '''
+    if datos is None:
+        stats = calcular_estadisticas_cached(version_historial())
+        if not stats['total_calculos']:
+            return
+    elif not datos:
+        return
+    else:
+        # Una lista arbitraria no tiene versión: se calcula directamente
+        stats = calcular_estadisticas_sin_cache(datos)
+
+    # Crear tabla de estadísticas
+    stats_table = Table(
+        title='📈 Estadísticas',
+        box=box.SIMPLE,
+        show_header=False,
+        border_style='green',
+        expand=False
+    )    
+
+    stats_table.add_column(style='cyan')
+    stats_table.add_column(style='yellow', justify='right')
+
+    stats_table.add_row('Total de cálculos:', str(stats['total_calculos']))
+
+    if stats['area_promedio'] > 0:
+        stats_table.add_row('Área promedio:', f'{stats["area_promedio"]:.2f}')
+        stats_table.add_row('Área máxima:', f'{stats["area_maxima"]:.2f}')
+        stats_table.add_row('Área mínima:', f'{stats["area_minima"]:.2f}')
+        if 'desviacion_tipica' in stats:
+            stats_table.add_row('Desviación típica:', f'{stats["desviacion_tipica"]:.2f}')
+            stats_table.add_row('Mediana (aprox.):', f'{stats["mediana"]:.2f}')
+            stats_table.add_row('Percentil 95 (aprox.):', f'{stats["percentil_95"]:.2f}')
+
+    stats_table.add_row(
+        'Figura más calculada',
+        stats['figura_mas_calculada'].replace('_', ' ').title()
+    )
+    console.print('\n')
+    console.print(stats_table)
+
+
+def mostrar_ultimos_calculos(n: int=5) -> None:
+    '''
+    Muestra los últimos n cálculos realizados. Los registros se leen desde
+    el final del archivo y el total sale de las estadísticas incrementales,
+    así que no se recorre el historial.
+    '''
+    # Tomar los últimos n registros
+    ultimos = ultimos_registros(n)
+
+    if not ultimos:
+        console.print(Panel(
+            '[yellow]📂 No hay datos guardados aún.[/yellow]',
+            title='Historial vacío',
+            border_style='yellow'
+        ))
+        return
+
+    total = max(estadisticas_completas().total_registros, len(ultimos))
+    mostrar_registros(
+        ultimos,
+        total - len(ultimos) + 1,
+        f'🕒 Últimos {len(ultimos)} cálculos (de {total} totales)'
+    )
+
+
+def limpiar_historial() -> bool:
+    ''' Elimina todos los registros del historial '''
+    try:
+        borrado = borrar_historial()
+    except OSError:
+        borrado = False
+
+    if borrado:
+        console.print(Panel(
+            '[green]✅ Historial limpiado exitosamente[/green]',
+            border_style='green'
+        ))
+    else:
+        console.print(Panel(
+            '[yellow]⚠️ No hay historial para limpiar[/yellow]',
+            border_style='yellow'
+        ))
+    return borrado
+
+
+def buscar_por_figura(figura: str, ruta: Optional[Path]=None) -> None:
+    ''' Busca y muestra registro de una figura específica '''
+    ruta = ruta or ruta_historial()
+
+    figura = figura.lower().strip()
+    try:
+        resultados = buscar_registros(figura, ruta)
+    except (ValueError, OSError):
+        console.print(Panel(
+            '[red]El formato del archivo JSON no es una lista de registros[/red]',
+            title='❌ Error',
+            border_style='red'
+        ))
+        return
+
+    if not resultados:
+        console.print(Panel(
+            f'[yellow]No se encuentran registros para la figura "[bold]{figura}[/bold]"[/yellow]',
+            title='🔍 Búsqueda sin resultados',
+            border_style='yellow'
+        ))
+        return
+    
+    # Crear tabla de resultados
+    table = Table(
+        title=f'🔍 Resultados para: [bold green]{figura.replace("_", " ")}[/bold green]',
+        title_style='bold cyan',
+        box=box.DOUBLE,
+        show_header=True,
+        header_style='bold magenta',
+        border_style='cyan',
+        expand=False
+    )
+
+    table.add_column('#', style='yellow', justify='right', width=4)
+    table.add_column('Fecha', style='cyan', width=17)
+    table.add_column('Área', style='bold green', justify='right', width=12)
+    table.add_column('Paŕametros', style='blue', width=45)
+
+    for i, res in enumerate(resultados, 1):
+        fecha = fecha_registro(res)
+        area = res.get('area', 'N/D')
+        params = res.get('parametros', {})
+
+        params_str = ', '.join([f'{k}: {v}' for k, v in params.items()] if isinstance(params, Mapping) else str(params))
+        area_str = f'{area:.2f}' if isinstance(area, (int, float)) else str(area)
+
+        table.add_row(str(i), fecha, area_str, params_str)
+
+    console.print(table)
+
+    # Panel con resumen
+    console.print(Panel(
+        f'[bold cyan]Total de registros encontrados:[/bold cyan] [yellow]{len(resultados)}[/yellow]',
+        border_style='green',
+        expand=False
+    ))
+
+
+def limpiar_cache():
+    ''' Limpia manualmente el caché '''
+    vaciar_caches()
+    console.print('[green]✅ Caché limpiado[/green]')
+
+
+def info_cache():
+    ''' Mostrar información sobre el estado de la caché '''
+    stats_figura = obtener_figura_mas_frecuente_cached.cache_info()
+    stats_estadisticas = calcular_estadisticas_cached.cache_info()
+
+    table = Table(title='📊 Estadísticas de Caché', box=box.SIMPLE)
+    table.add_column('Función', style='cyan')
+    table.add_column('Hits', style='green', justify='right')
+    table.add_column('Misses', style='yellow', justify='right')
+    table.add_column('Tamaño', style='blue', justify='right')
+    
+    table.add_row(
+        'Figura más frecuente',
+        str(stats_figura.hits),
+        str(stats_figura.misses),
+        f'{stats_figura.currsize}/{stats_figura.maxsize}'
+    )
+    
+    historial = cache_historial()
+    table.add_row(
+        'Historial (cargar_json)',
+        f'{historial.aciertos} (+{historial.incrementales})',
+        str(historial.fallos),
+        str(registros_en_cache() or 0)
+    )
+
+    table.add_row(
+        'Estadísticas',
+        str(stats_estadisticas.hits),
+        str(stats_estadisticas.misses),
+        f'{stats_estadisticas.currsize}/{stats_estadisticas.maxsize}'
+    )
+    
+    memo = cache_resultados()
+    if memo is not None:
+        stats_memo = memo.cache_info()
+        table.add_row(
+            'Resultados (calcular_area)',
+            str(stats_memo.hits),
+            str(stats_memo.misses),
+            f'{stats_memo.currsize}/{stats_memo.maxsize}'
+        )
+
+    console.print(table)
+
+    if memo is not None:
+        total = stats_memo.hits + stats_memo.misses
+        ratio = stats_memo.hits / total * 100 if total else 0
+        console.print(f'[cyan]Memoización:[/cyan] [green]ACTIVA[/green] ({ratio:.1f}% aciertos, '
+                      f'TTL: {memo.ttl or "sin caducidad"}, aciertos al historial: {"sí" if memo.registrar_aciertos else "no"})')
+    else:
+        console.print('[cyan]Memoización:[/cyan] [red]INACTIVA[/red]')
+    
+    en_cache = registros_en_cache()
+    if en_cache is not None:
+        console.print(f'\n[cyan]Caché global:[/cyan] [green]ACTIVO[/green]')
+        console.print(f'[cyan]Registros en caché:[/cyan] [yellow]{en_cache}[/yellow]')
+    else:
+        console.print(f'\n[cyan]Caché global:[/cyan] [red]INACTIVO[/red]')
+
+
+def _segundos(valor: Optional[float]) -> str:
+    ''' Duración legible (µs, ms o s) '''
+    if valor is None:
+        return '-'
+    if valor == float('inf'):
+        return '> 10 s'
+    if valor < 0.001:
+        return f'{valor * 1e6:.0f} µs'
+    if valor < 1:
+        return f'{valor * 1e3:.1f} ms'
+    return f'{valor:.2f} s'
+
+
+def tabla_metricas() -> Group:
+    ''' Tablas con latencias, contadores e indicadores de las métricas internas '''
+    instantanea = metricas.registro_metricas().instantanea()
+    estado = '[green]ACTIVAS[/green]' if instantanea['activas'] else '[red]INACTIVAS[/red]'
+
+    def etiquetas(diccionario: Dict) -> str:
+        return '/'.join(str(v) for v in diccionario.values())
+
+    latencias = Table(title=f'📈 Latencias ({estado})', box=box.SIMPLE)
+    latencias.add_column('Métrica', style='cyan')
+    latencias.add_column('Etiquetas', style='magenta')
+    latencias.add_column('Cuenta', style='yellow', justify='right')
+    for columna in ('Media', 'p50', 'p95', 'p99'):
+        latencias.add_column(columna, style='green', justify='right')
+    for h in instantanea['histogramas']:
+        latencias.add_row(
+            h['nombre'].removesuffix('_segundos'), etiquetas(h['etiquetas']), str(h['cuenta']),
+            _segundos(h['media_s']), _segundos(h['p50_s']), _segundos(h['p95_s']), _segundos(h['p99_s'])
+        )
+
+    contadores = Table(title='🔢 Contadores', box=box.SIMPLE)
+    contadores.add_column('Métrica', style='cyan')
+    contadores.add_column('Etiquetas', style='magenta')
+    contadores.add_column('Valor', style='yellow', justify='right')
+    for c in instantanea['contadores']:
+        contadores.add_row(c['nombre'], etiquetas(c['etiquetas']), f'{c["valor"]:g}')
+
+    indicadores = Table(title='🗄️ Cachés', box=box.SIMPLE)
+    indicadores.add_column('Indicador', style='cyan')
+    indicadores.add_column('Valor', style='yellow', justify='right')
+    for nombre, valor in instantanea['indicadores'].items():
+        texto = f'{valor * 100:.1f}%' if nombre.endswith('tasa_aciertos') else f'{valor:g}'
+        indicadores.add_row(nombre, texto)
+
+    return Group(latencias, contadores, indicadores)
+
+
+def mostrar_metricas(en_vivo: bool=True, intervalo: float=1.0) -> None:
+    '''
+    Muestra las métricas internas (ver metricas.py).
+
+    :param en_vivo: Si True, la tabla se actualiza cada 'intervalo' segundos hasta Ctrl+C
+    :type en_vivo: bool
+    :param intervalo: Segundos entre actualizaciones
+    :type intervalo: float
+    '''
+    if not en_vivo:
+        console.print(tabla_metricas())
+        return
+
+    import time
+    from rich.live import Live
+
+    console.print('[dim]Actualizando cada segundo. Ctrl+C para volver.[/dim]')
+    try:
+        with Live(tabla_metricas(), console=console, refresh_per_second=4) as live:
+            while True:
+                time.sleep(intervalo)
+                live.update(tabla_metricas())
+    except KeyboardInterrupt:
+        pass